@@ -1,11 +1,34 @@
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
+# matplotlib and plot_target are imported inside the report functions, so
+# get_match_number stays cheap to import for the app's cold start
 import io
 import re
-from PIL import Image
+import time
+from contextlib import contextmanager
+from typing import Dict
 
-from plot_target import plot_target_with_scores
+# Marker/label size of targets in a report subplot relative to the 8x8 app plot
+REPORT_PLOT_SCALE = 0.6
+
+
+class StageTimer:
+    """Wall time of the named stages of one app run, for the debug sidebar."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block; repeated stages add up."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def total(self) -> float:
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self.started
 
 
 def get_match_number(string):
@@ -13,8 +36,8 @@ def get_match_number(string):
     Extract match number from a string dict for sorting purposes.
     Returns the match number as an int, or 999 if not found.
     """
-    match_val = None
-    if 'data' in string and 'match' in string['data'].columns:
+    match_val = string.get('match')
+    if match_val is None and 'data' in string and 'match' in string['data'].columns:
         # Get the first match value from the DataFrame (all rows should have the same match)
         match_vals = string['data']['match'].dropna().unique()
         if len(match_vals) > 0:
@@ -32,37 +55,47 @@ def get_match_number(string):
         return 999
 
 
-def _to_int_score(s):
-    """
-    Convert a score value to an integer for calculations.
-    Treats 'x' or 'X' as 10, handles NaN and other edge cases.
-    """
-    if pd.isna(s):
-        return 0
-    if isinstance(s, str) and s.strip().lower() == 'x':
-        return 10
-    try:
-        return int(float(s))
-    except Exception:
-        return 0
+def _report_subplot_title(string, get_match_number_func):
+    """Title of one target in a shooter report: match, stage, course, rifle and score."""
+    match_num = get_match_number_func(string)
+    match_display = f"Match {match_num}" if match_num != 999 else "Match Unknown"
+    return (f"{match_display} - {string['stage']}\n"
+            f"{string['course']} | {string['rifle']}\nScore: {string['score']}")
 
 
-def _display_score(s):
+def build_shooter_report_figure(shooter_name, strings, get_match_number_func):
     """
-    Convert a score value to a display string.
-    Preserves 'X' for x values, converts numbers to strings.
+    Build the shooter report as a single off-screen figure (Agg canvas, not
+    registered with pyplot), with every target drawn straight into its subplot.
+    Returns the Figure, or None if there are no strings.
     """
-    if pd.isna(s):
-        return ''
-    if isinstance(s, str) and s.strip().lower() == 'x':
-        return 'X'
-    try:
-        return str(int(float(s)))
-    except Exception:
-        return str(s)
+    num_strings = len(strings)
+    if num_strings == 0:
+        return None
+
+    # Calculate grid dimensions (prefer wider layout, max 3 columns)
+    cols = min(3, num_strings)
+    rows = (num_strings + cols - 1) // cols
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from plot_target import plot_target_with_scores
+
+    fig = Figure(figsize=(cols * 5, rows * 5))
+    FigureCanvasAgg(fig)
+    fig.suptitle(f"Shooter Report: {shooter_name}", fontsize=16, weight='bold', y=0.995)
+
+    for idx, string in enumerate(strings):
+        ax = fig.add_subplot(rows, cols, idx + 1)
+        # subplots are 5in instead of 8in, so shrink markers and labels to match
+        plot_target_with_scores(string, ax=ax, scale=REPORT_PLOT_SCALE)
+        ax.set_title(_report_subplot_title(string, get_match_number_func), fontsize=9, pad=5)
 
+    fig.tight_layout(rect=[0, 0, 1, 0.98])  # Leave space for main title
+    return fig
 
-def create_shooter_report(shooter_name, strings, get_match_number_func):
+
+def create_shooter_report(shooter_name, strings, get_match_number_func, fig=None):
     """
     Create a combined PNG report for a shooter with all their matches.
     Returns a BytesIO buffer containing the PNG image.
@@ -71,63 +104,44 @@ def create_shooter_report(shooter_name, strings, get_match_number_func):
         shooter_name: Name of the shooter
         strings: List of string dicts for this shooter
         get_match_number_func: Function to extract match number from a string dict
+        fig: The figure from build_shooter_report_figure, if already built
     
     Returns:
         BytesIO buffer containing the PNG image, or None if no strings
     """
-    num_strings = len(strings)
-    if num_strings == 0:
+    if fig is None:
+        fig = build_shooter_report_figure(shooter_name, strings, get_match_number_func)
+    if fig is None:
         return None
-    
-    # Calculate grid dimensions (prefer wider layout, max 3 columns)
-    cols = min(3, num_strings)
-    rows = (num_strings + cols - 1) // cols
-    
-    # Create figure with subplots
-    fig = plt.figure(figsize=(cols * 5, rows * 5))
-    fig.suptitle(f"Shooter Report: {shooter_name}", fontsize=16, weight='bold', y=0.995)
-    
-    # Store individual plot images as numpy arrays
-    plot_images = []
-    
-    for string in strings:
-        # Create individual plot
-        result = plot_target_with_scores(string)
-        plot_fig = result[0] if isinstance(result, tuple) else result
-        
-        # Convert plot to image and convert to numpy array before closing buffer
-        plot_buf = io.BytesIO()
-        plot_fig.savefig(plot_buf, format='png', dpi=100, bbox_inches='tight', pad_inches=0.2)
-        plot_buf.seek(0)
-        plot_img = Image.open(plot_buf)
-        # Convert to numpy array so it doesn't depend on the buffer
-        plot_img_array = np.array(plot_img)
-        plot_images.append(plot_img_array)
-        
-        plt.close(plot_fig)  # Close the individual plot to free memory
-        plot_buf.close()
-    
-    # Arrange images in grid
-    for idx, (string, plot_img) in enumerate(zip(strings, plot_images)):
-        ax = fig.add_subplot(rows, cols, idx + 1)
-        
-        # Display image in subplot
-        ax.imshow(plot_img)
-        ax.axis('off')
-        
-        # Add match info as title
-        match_num = get_match_number_func(string)
-        match_display = f"Match {match_num}" if match_num != 999 else "Match Unknown"
-        ax.set_title(f"{match_display} - {string['stage']}\nScore: {string['score']}", 
-                    fontsize=9, pad=5)
-    
-    plt.tight_layout(rect=[0, 0, 1, 0.98])  # Leave space for main title
-    
-    # Save to buffer
+
+    # Save to buffer; the targets are vector artists in the figure, so they are rasterized once
     buf = io.BytesIO()
     fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
     buf.seek(0)
-    plt.close(fig)
-    
     return buf
 
+
+def write_shooter_report_pdf(path, shooter_name, strings, get_match_number_func, fig=None):
+    """
+    Write a multipage PDF report for a shooter: the combined report on the first
+    page (fig, when already built for the PNG), then one full-size target per
+    page. Returns the number of pages written.
+    """
+    if fig is None:
+        fig = build_shooter_report_figure(shooter_name, strings, get_match_number_func)
+    if fig is None:
+        return 0
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    from plot_target import plot_target_with_scores
+
+    with PdfPages(path) as pdf:
+        pdf.savefig(fig)
+        for string in strings:
+            page = Figure(figsize=(8, 8))
+            FigureCanvasAgg(page)
+            plot_target_with_scores(string, ax=page.add_subplot(1, 1, 1))
+            pdf.savefig(page)
+    return 1 + len(strings)
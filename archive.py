@@ -0,0 +1,462 @@
+# archive.py
+"""
+Persistent shot archive: parsed strings and enriched scores as Parquet.
+
+Layout under the archive root:
+    strings/date=2023-10-14/match=1/part-<id>.parquet   one row per string
+    shots/date=2023-10-14/match=1/part-<id>.parquet     the shots of those strings
+    scores/date=2023-10-14/match=1/part-<id>.parquet    enriched score rows, in their string's partition
+
+Every append writes new part files only, so existing partitions are never
+rewritten. Strings are de-duplicated on unique_id and score rows on uniq_id
+against everything already archived. A strings part and the shots part with
+the same name belong together: the strings rows carry the [start, stop) row
+range of their shots within that part.
+
+Loading reads every part memory-mapped, keeps the shot text columns
+dictionary-encoded (they become categoricals without decoding each value)
+and returns one ShotStore. Loaded parts are compacted into a snapshot, two
+Arrow files under _snapshot named by a manifest that is replaced last, so
+another process sees either the old snapshot and part list or the new ones.
+Rewriting the snapshot costs a write of the whole archive, so it is only
+done once the parts written after it hold SNAPSHOT_COMPACT_FRACTION of its
+shots or number SNAPSHOT_COMPACT_PARTS; until then they are read next to it.
+
+Command line:
+    python archive.py ARCHIVE_DIR add EXPORT... [--scores scores.csv]
+    python archive.py ARCHIVE_DIR info
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from shot_store import ShotStore, SHOT_CATEGORICAL_COLUMNS, SCORE_LABEL_COLUMN, add_score_columns, text_columns_to_object
+
+# Environment variable naming the archive directory used by the app
+ARCHIVE_DIR_ENV = "MRPC_ARCHIVE_DIR"
+# The snapshot is rewritten once the parts written after it hold this share
+# of its shots, or are this many files
+SNAPSHOT_COMPACT_FRACTION = 0.25
+SNAPSHOT_COMPACT_PARTS = 1000
+
+_SAFE_VALUE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _partition_date(date_text: Any) -> str:
+    """ISO date for a ShotMarker header date such as 'Oct 14 2023'."""
+    text = str(date_text or "").strip()
+    for fmt in ("%b %d %Y", "%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return _SAFE_VALUE_RE.sub("_", text) or "unknown"
+
+
+def _partition_value(value: Any) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "unknown"
+    return _SAFE_VALUE_RE.sub("_", str(value)) or "unknown"
+
+
+def _partition(date: Any, match: Any) -> str:
+    """Partition directory of a string, relative to strings/, shots/ or scores/."""
+    return os.path.join(f"date={_partition_date(date)}", f"match={_partition_value(match)}")
+
+
+def _part_name() -> str:
+    # time first so parts sort in the order they were written
+    return f"part-{time.time_ns():x}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _write_part(table, path: str) -> None:
+    """Write a Parquet part under a temporary name and rename it, so readers never see half a file."""
+    import pyarrow.parquet as pq
+
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+class ShotArchive:
+    """Append-only Parquet archive of strings, shots and scores under one directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._known_ids: Optional[Set[str]] = None
+        # partition of each known unique_id, where its score rows go too
+        self._id_partitions: Dict[str, str] = {}
+        # strings parts and snapshot the known ids were read from
+        self._known_parts: Set[str] = set()
+        self._known_snapshot: Optional[str] = None
+        self._known_score_ids: Optional[Set[str]] = None
+        self._loaded_key = None
+        self._loaded_store: Optional[ShotStore] = None
+
+    def _dir(self, kind: str) -> str:
+        return os.path.join(self.root, kind)
+
+    def _parts(self, kind: str) -> List[str]:
+        """Part files of one kind, relative to its directory, in write order."""
+        base = self._dir(kind)
+        parts = []
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if name.endswith(".parquet"):
+                    parts.append(os.path.relpath(os.path.join(dirpath, name), base))
+        return sorted(parts, key=lambda p: (os.path.basename(p), p))
+
+    # Strings and shots -------------------------------------------------------
+
+    def known_ids(self) -> Set[str]:
+        """
+        unique_ids already archived. Read from the snapshot and the parts
+        written after it, again whenever the snapshot manifest changes; parts
+        other processes added since the last call are read on the next one.
+        """
+        import pyarrow.parquet as pq
+
+        manifest = self._manifest()
+        name = manifest["snapshot"] if manifest else None
+        if self._known_ids is None or name != self._known_snapshot:
+            partitions, parts = {}, set()
+            if manifest:
+                try:
+                    table = self._read_snapshot(manifest, "strings")
+                    partitions = self._snapshot_partitions(table)
+                    parts = set(manifest["parts"])
+                except OSError:
+                    # replaced by another process meanwhile: read the parts instead
+                    partitions = {}
+            self._id_partitions = partitions
+            self._known_ids = set(partitions)
+            self._known_parts, self._known_snapshot = parts, name
+        for part in self._parts("strings"):
+            if part in self._known_parts:
+                continue
+            table = pq.read_table(os.path.join(self._dir("strings"), part),
+                                  columns=["unique_id"], memory_map=True)
+            ids = table.column("unique_id").to_pylist()
+            self._known_ids.update(ids)
+            self._id_partitions.update(dict.fromkeys(ids, os.path.dirname(part)))
+            self._known_parts.add(part)
+        return self._known_ids
+
+    @staticmethod
+    def _snapshot_partitions(table) -> Dict[str, str]:
+        """unique_id -> partition of the strings in a snapshot strings table."""
+        frame = table.select([c for c in ("unique_id", "date", "match") if c in table.column_names]).to_pandas()
+        for col in ("date", "match"):
+            if col not in frame.columns:
+                frame[col] = None
+        groups = frame.groupby(["date", "match"], dropna=False, sort=False)
+        # head(1) keeps the first row of each group in order of appearance, as ngroup numbers them
+        labels = np.array([_partition(d, m) for d, m in zip(*(groups.head(1)[c] for c in ("date", "match")))],
+                          dtype=object)
+        return dict(zip(frame["unique_id"], labels[groups.ngroup().to_numpy()]))
+
+    def append_store(self, store: ShotStore) -> int:
+        """
+        Archive the strings of a ShotStore that are not archived yet, one new
+        part per (date, match) partition. Returns the number of strings written.
+        """
+        import pyarrow as pa
+
+        if len(store) == 0:
+            return 0
+        known = self.known_ids()
+        strings = store.strings
+        ids = strings["unique_id"].to_numpy(dtype=object)
+        # new strings only, and the first of any repeated unique_id in this store
+        fresh = ~pd.Series(ids).isin(known).to_numpy() & ~pd.Series(ids).duplicated().to_numpy()
+        if not fresh.any():
+            return 0
+
+        strings = strings[fresh]
+        partitions = pd.DataFrame({
+            "date": [_partition_date(d) for d in strings["date"]],
+            "match": [_partition_value(m) for m in strings["match"]],
+        }, index=strings.index)
+
+        written = 0
+        for (date, match), rows in partitions.groupby(["date", "match"], sort=False):
+            part_strings = strings.loc[rows.index].copy()
+            starts = part_strings["start"].to_numpy()
+            stops = part_strings["stop"].to_numpy()
+            counts = stops - starts
+            rows_idx = np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])
+            part_shots = store.shots.take(rows_idx)
+            part_strings["stop"] = np.cumsum(counts)
+            part_strings["start"] = part_strings["stop"].to_numpy() - counts
+
+            # text columns are written as plain strings; Parquet dictionary-encodes
+            # them per file and load() reads them back as dictionaries
+            shots_table = pa.Table.from_pandas(part_shots, preserve_index=False)
+            shots_table = shots_table.cast(pa.schema([
+                pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f
+                for f in shots_table.schema
+            ]))
+            strings_table = pa.Table.from_pandas(part_strings, preserve_index=False)
+
+            name = _part_name()
+            partition = os.path.join(f"date={date}", f"match={match}")
+            self._id_partitions.update(dict.fromkeys(part_strings["unique_id"], partition))
+            for kind, table in (("shots", shots_table), ("strings", strings_table)):
+                os.makedirs(os.path.join(self._dir(kind), partition), exist_ok=True)
+            # shots first: a strings part marks a complete pair
+            _write_part(shots_table, os.path.join(self._dir("shots"), partition, name))
+            _write_part(strings_table, os.path.join(self._dir("strings"), partition, name))
+            known.update(part_strings["unique_id"])
+            self._known_parts.add(os.path.join(partition, name))
+            written += len(part_strings)
+        return written
+
+    # Snapshot: every part loaded so far in one Arrow IPC file per table, so
+    # opening the archive memory-maps two files instead of reading every part.
+    # Each snapshot gets new file names; manifest.json names the current one
+    # and its strings parts, and replacing it is what switches readers over.
+    # It is derived data; deleting the _snapshot directory only costs one slow load.
+
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(self.root, "_snapshot", name)
+
+    def _manifest(self) -> Optional[Dict[str, Any]]:
+        """The current snapshot's name and strings parts, or None when there is none."""
+        try:
+            with open(self._snapshot_path("manifest.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _read_snapshot(self, manifest: Dict[str, Any], kind: str):
+        import pyarrow as pa
+
+        with pa.memory_map(self._snapshot_path(f"{manifest['snapshot']}.{kind}.arrow")) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write_snapshot(self, parts: List[str], strings, shots) -> None:
+        import pyarrow as pa
+
+        os.makedirs(self._snapshot_path(""), exist_ok=True)
+        previous = self._manifest()
+        name = f"snapshot-{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+        for kind, table in (("strings", strings), ("shots", shots)):
+            tmp = self._snapshot_path(f"{name}.{kind}.arrow.tmp")
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, self._snapshot_path(f"{name}.{kind}.arrow"))
+        # the manifest goes last: it is what makes the new tables count
+        tmp = self._snapshot_path(f"manifest.json.{name}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"snapshot": name, "parts": parts}, f)
+        os.replace(tmp, self._snapshot_path("manifest.json"))
+
+        # older snapshots (and the parts.txt of the unversioned layout) go;
+        # the previous one stays for readers that opened its manifest just
+        # before this one replaced it
+        keep = {name} | ({previous["snapshot"]} if previous else set())
+        for entry in os.listdir(self._snapshot_path("")):
+            if not (entry.endswith(".arrow") or entry == "parts.txt") or entry.split(".", 1)[0] in keep:
+                continue
+            try:
+                os.remove(self._snapshot_path(entry))
+            except OSError:
+                # still mapped by a reader on platforms that lock open files
+                pass
+
+    def load_store(self) -> ShotStore:
+        """
+        Every archived string as one ShotStore. The snapshot is memory-mapped,
+        only parts written after it are read, and the result is reused until
+        a part is added. The snapshot is written when there is none and
+        rewritten with the newer parts once they pass the compaction limits.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        parts = self._parts("strings")
+        if self._loaded_store is not None and self._loaded_key == parts:
+            return self._loaded_store
+
+        strings_tables, shots_tables = [], []
+        included = []
+        manifest = self._manifest()
+        snapshot = set(manifest["parts"]) if manifest else set()
+        if snapshot and snapshot.issubset(parts):
+            try:
+                strings_tables.append(self._read_snapshot(manifest, "strings"))
+                shots_tables.append(self._read_snapshot(manifest, "shots"))
+                included = [p for p in parts if p in snapshot]
+            except OSError:
+                # replaced by another process meanwhile: read the parts instead
+                strings_tables, shots_tables = [], []
+                snapshot = set()
+        else:
+            snapshot = set()
+
+        offset = shots_tables[0].num_rows if shots_tables else 0
+        for part in parts:
+            shots_path = os.path.join(self._dir("shots"), part)
+            if part in snapshot or not os.path.exists(shots_path):
+                continue
+            shots = pq.read_table(shots_path, memory_map=True,
+                                  read_dictionary=SHOT_CATEGORICAL_COLUMNS + [SCORE_LABEL_COLUMN])
+            strings = pq.read_table(os.path.join(self._dir("strings"), part), memory_map=True)
+            # shift each part's row ranges to the combined shot table
+            for col in ("start", "stop"):
+                idx = strings.schema.get_field_index(col)
+                strings = strings.set_column(idx, col, pc.add(strings.column(col), offset))
+            offset += shots.num_rows
+            strings_tables.append(strings)
+            shots_tables.append(shots)
+            included.append(part)
+
+        if not strings_tables:
+            self._loaded_store = ShotStore(pd.DataFrame(columns=["start", "stop"]), pd.DataFrame())
+            self._loaded_key = parts
+            return self._loaded_store
+
+        strings = pa.concat_tables(strings_tables, promote_options="permissive")
+        shots = pa.concat_tables(shots_tables, promote_options="permissive")
+        pending = len(included) - len(snapshot)
+        snapshot_shots = shots_tables[0].num_rows if snapshot else 0
+        if pending and (not snapshot or pending >= SNAPSHOT_COMPACT_PARTS
+                        or shots.num_rows - snapshot_shots >= SNAPSHOT_COMPACT_FRACTION * snapshot_shots):
+            # one chunk and one dictionary per column, as the IPC file format wants
+            shots = shots.unify_dictionaries().combine_chunks()
+            strings = strings.combine_chunks()
+            self._write_snapshot(included, strings, shots)
+        # parts archived before the score label existed are decoded here
+        self._loaded_store = ShotStore(text_columns_to_object(strings.to_pandas()), add_score_columns(shots.to_pandas()))
+        self._loaded_key = parts
+        return self._loaded_store
+
+    # Scores ------------------------------------------------------------------
+
+    def known_score_ids(self) -> Set[str]:
+        """uniq_ids of the archived score rows."""
+        if self._known_score_ids is None:
+            import pyarrow.parquet as pq
+
+            ids = set()
+            for part in self._parts("scores"):
+                table = pq.read_table(os.path.join(self._dir("scores"), part),
+                                      columns=["uniq_id"], memory_map=True)
+                ids.update(table.column("uniq_id").to_pylist())
+            self._known_score_ids = ids
+        return self._known_score_ids
+
+    def append_scores(self, df_scores: pd.DataFrame) -> int:
+        """
+        Archive score rows whose uniq_id is not archived yet, one new part per
+        (date, match) partition; returns the number written. A row linked to an
+        archived string (matching.link_scores) goes to that string's
+        partition, any other to date=unknown and its match.
+        """
+        if df_scores is None or len(df_scores) == 0 or "uniq_id" not in df_scores.columns:
+            return 0
+        known = self.known_score_ids()
+        fresh = df_scores[~df_scores["uniq_id"].isin(known)].drop_duplicates("uniq_id")
+        if len(fresh) == 0:
+            return 0
+        fresh = fresh.copy()
+        for col in fresh.columns:
+            if fresh[col].dtype == object:
+                # scores CSVs can mix numbers and text in one column
+                fresh[col] = fresh[col].map(lambda v: None if pd.isna(v) else str(v))
+
+        self.known_ids()
+        match = fresh["match_id"] if "match_id" in fresh.columns else fresh["match"]
+        partitions = [self._id_partitions.get(uniq_id) or _partition(None, m)
+                      for uniq_id, m in zip(fresh["uniq_id"], match)]
+        for partition, rows in fresh.groupby(pd.Series(partitions, index=fresh.index), sort=False):
+            os.makedirs(os.path.join(self._dir("scores"), partition), exist_ok=True)
+            path = os.path.join(self._dir("scores"), partition, _part_name())
+            rows.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+        known.update(fresh["uniq_id"])
+        return len(fresh)
+
+    def load_scores(self) -> Optional[pd.DataFrame]:
+        """All archived score rows, or None when there are none."""
+        parts = self._parts("scores")
+        if not parts:
+            return None
+        frames = [pd.read_parquet(os.path.join(self._dir("scores"), p), memory_map=True) for p in parts]
+        return text_columns_to_object(pd.concat(frames, ignore_index=True))
+
+
+_default_archive: Optional[ShotArchive] = None
+
+
+def get_archive() -> Optional[ShotArchive]:
+    """
+    Process-wide archive in MRPC_ARCHIVE_DIR, or None when the variable is
+    unset or pyarrow is not installed.
+    """
+    global _default_archive
+    root = os.environ.get(ARCHIVE_DIR_ENV)
+    if not root:
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    if _default_archive is None or _default_archive.root != root:
+        _default_archive = ShotArchive(root)
+    return _default_archive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add ShotMarker exports to a Parquet archive or time loading it.")
+    parser.add_argument("archive_dir", help="archive directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="parse exports and append new strings")
+    add.add_argument("paths", nargs="+", help="ShotMarker CSV/XLSX exports")
+    add.add_argument("--scores", help="scores CSV to enrich and append")
+    sub.add_parser("info", help="load the archive and report its size and load time")
+    args = parser.parse_args(argv)
+
+    archive = ShotArchive(args.archive_dir)
+    if args.command == "add":
+        from ingest import parse_stores
+
+        contents = []
+        for path in args.paths:
+            with open(path, "rb") as f:
+                contents.append(f.read())
+        stores = parse_stores(contents)
+        written = sum(archive.append_store(store) for store in stores)
+        print(f"{written} new strings archived from {len(stores)} files")
+        if args.scores:
+            from enrichment import enrich_scores, strings_index
+            from matching import link_scores
+            from score_parser import parse_scores_csv
+
+            with open(args.scores, "rb") as f:
+                df_scores = parse_scores_csv(f)
+            strings = [s for store in stores for s in store.to_strings()]
+            df_scores, _ = link_scores(strings, df_scores)
+            df_scores = enrich_scores(df_scores, strings_index(strings))
+            print(f"{archive.append_scores(df_scores)} new score rows archived")
+    else:
+        t0 = time.perf_counter()
+        store = archive.load_store()
+        elapsed = time.perf_counter() - t0
+        print(f"{len(store)} strings, {len(store.shots)} shots loaded in {elapsed:.3f} s "
+              f"({store.nbytes()['total'] / 1e6:.1f} MB in memory)")
+        scores = archive.load_scores()
+        print(f"{0 if scores is None else len(scores)} score rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# batch_report.py
+"""
+Headless per-shooter report generator for a whole match.
+
+Parses every ShotMarker export in a directory (in parallel, see ingest.py),
+takes shooter names from an optional scores CSV, and writes one PNG and one
+multipage PDF report per shooter, rendering shooters across a process pool.
+
+Command line:
+    python batch_report.py EXPORT_DIR [--scores scores.csv] [--out reports] [--workers N]
+"""
+import argparse
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from app_utils import build_shooter_report_figure, create_shooter_report, get_match_number, write_shooter_report_pdf
+from enrichment import find_user_column
+from ingest import default_workers, parse_files
+from matching import link_scores
+
+EXPORT_EXTENSIONS = (".csv", ".xlsx")
+
+
+def find_exports(export_dir: str) -> List[str]:
+    """ShotMarker exports in a directory, sorted by file name."""
+    return sorted(
+        os.path.join(export_dir, name)
+        for name in os.listdir(export_dir)
+        if name.lower().endswith(EXPORT_EXTENSIONS)
+    )
+
+
+def _user_mapping(strings: List[Dict[str, Any]], scores_path: Optional[str]) -> Dict[str, str]:
+    """Map string unique_id -> user from the scores CSV, or an empty dict without one."""
+    if not scores_path:
+        return {}
+    from score_parser import parse_scores_csv
+
+    with open(scores_path, "rb") as f:
+        df_scores = parse_scores_csv(f)
+    user_col = find_user_column(df_scores)
+    if user_col is None:
+        return {}
+    # uniq_id now names the linked string where the ids differed in formatting
+    df_scores, _ = link_scores(strings, df_scores)
+    return dict(zip(df_scores['uniq_id'], df_scores[user_col]))
+
+
+def group_by_shooter(strings: List[Dict[str, Any]], user_mapping: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group strings by shooter, preferring the user name from the scores CSV,
+    with each shooter's strings sorted by match number.
+    """
+    by_shooter: Dict[str, List[Dict[str, Any]]] = {}
+    for string in strings:
+        user = user_mapping.get(string.get('unique_id', ''))
+        if user:
+            string['shooter'] = user
+        by_shooter.setdefault(string.get('shooter') or 'Unknown', []).append(string)
+    for shooter_strings in by_shooter.values():
+        shooter_strings.sort(key=get_match_number)
+    return by_shooter
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'Unknown'
+
+
+def report_names(shooters: List[str]) -> Dict[str, str]:
+    """
+    File name stem of each shooter's report. Names that sanitize to the same
+    stem ('J. Smith', 'J Smith') each get a short hash of the full name, so
+    no report overwrites another.
+    """
+    stems: Dict[str, List[str]] = {}
+    for shooter in shooters:
+        stems.setdefault(_safe_name(shooter), []).append(shooter)
+    names = {}
+    for stem, owners in stems.items():
+        for shooter in owners:
+            if len(owners) > 1:
+                digest = hashlib.blake2b(shooter.encode("utf-8"), digest_size=3).hexdigest()
+                names[shooter] = f"shooter_report_{stem}_{digest}"
+            else:
+                names[shooter] = f"shooter_report_{stem}"
+    return names
+
+
+def write_shooter_report(out_dir: str, shooter: str, strings: List[Dict[str, Any]],
+                         name: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Worker entry point: write one shooter's PNG and PDF (named name, by
+    default from the shooter's name); returns (shooter, seconds). The
+    combined figure is built once for both.
+    """
+    t0 = time.perf_counter()
+    base = os.path.join(out_dir, name or f"shooter_report_{_safe_name(shooter)}")
+    fig = build_shooter_report_figure(shooter, strings, get_match_number)
+    if fig is None:
+        return shooter, time.perf_counter() - t0
+    buf = create_shooter_report(shooter, strings, get_match_number, fig=fig)
+    with open(base + ".png", "wb") as f:
+        f.write(buf.getvalue())
+    buf.close()
+    write_shooter_report_pdf(base + ".pdf", shooter, strings, get_match_number, fig=fig)
+    return shooter, time.perf_counter() - t0
+
+
+def generate_reports(export_dir: str, scores_path: Optional[str] = None, out_dir: str = "reports",
+                     max_workers: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Write reports for every shooter found in export_dir; returns (shooter, seconds) per shooter."""
+    paths = find_exports(export_dir)
+    contents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    strings = [s for file_strings in parse_files(contents, max_workers=max_workers) for s in file_strings]
+    by_shooter = group_by_shooter(strings, _user_mapping(strings, scores_path))
+
+    os.makedirs(out_dir, exist_ok=True)
+    shooters = sorted(by_shooter)
+    names = report_names(shooters)
+    workers = min(max_workers or default_workers(), len(shooters))
+    if workers <= 1:
+        return [write_shooter_report(out_dir, s, by_shooter[s], names[s]) for s in shooters]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(write_shooter_report, [out_dir] * len(shooters),
+                                 shooters, [by_shooter[s] for s in shooters], [names[s] for s in shooters]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write per-shooter PNG and PDF reports for a match.")
+    parser.add_argument("export_dir", help="directory of ShotMarker CSV/XLSX exports")
+    parser.add_argument("--scores", help="scores CSV used to name shooters")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    timings = generate_reports(args.export_dir, args.scores, args.out, args.workers)
+    for shooter, seconds in timings:
+        print(f"{shooter:30s} {seconds:7.2f} s")
+    print(f"{len(timings)} shooters in {time.perf_counter() - t0:.2f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_archive.py
+"""
+Opening a shot archive of about a million shots: the first load reads every
+Parquet part and writes the snapshot, later loads memory-map the snapshot and
+read only the parts appended since. One appended export stays below the
+compaction limits, so loading after it does not rewrite the snapshot.
+
+Run from the repository root:
+    python -m benchmarks.bench_archive [n_shots] [n_exports]
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from archive import ShotArchive
+from benchmarks.synthetic import make_export
+from ingest import parse_stores
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main(n_shots=1_000_000, n_exports=20):
+    root = tempfile.mkdtemp(prefix="shot-archive-")
+    try:
+        archive = ShotArchive(root)
+        t_append = 0.0
+        for seed in range(n_exports):
+            [store] = parse_stores([make_export(n_shots // n_exports, seed=seed).encode()], max_workers=1)
+            _, elapsed = _timed(lambda: archive.append_store(store))
+            t_append += elapsed
+        n_parts = len(archive._parts("strings"))
+        print(f"appended {n_exports} exports as {n_parts} partition parts in {t_append:.2f} s")
+
+        store, elapsed = _timed(ShotArchive(root).load_store)
+        print(f"first load (all parts, writes snapshot): {elapsed:6.3f} s  "
+              f"{len(store)} strings, {len(store.shots)} shots")
+        store, elapsed = _timed(ShotArchive(root).load_store)
+        print(f"load from snapshot:                      {elapsed:6.3f} s")
+
+        [extra] = parse_stores([make_export(n_shots // n_exports, seed=n_exports).encode()], max_workers=1)
+        archive.append_store(extra)
+        store, elapsed = _timed(ShotArchive(root).load_store)
+        print(f"snapshot + one appended export:          {elapsed:6.3f} s  {len(store.shots)} shots")
+        store, elapsed = _timed(ShotArchive(root).load_store)
+        print(f"again (snapshot not rewritten):          {elapsed:6.3f} s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,96 @@
+# benchmarks/bench_density.py
+"""
+Density rendering of a million shots: binning (np.bincount against
+np.histogram2d, which must agree), the FFT-smoothed KDE grid, and the full
+PNG over the cached target background, against drawing the shots as scatter
+markers (timed on SCATTER_SHOTS and scaled up). Exits non-zero when the
+density PNG takes longer than RENDER_BUDGET_S.
+
+Run from the repository root:
+    python -m benchmarks.bench_density [n_shots]
+"""
+import sys
+import time
+
+import numpy as np
+
+from density import density_grid, histogram
+from render_cache import RenderCache
+
+# The density PNG of a million shots must render within this time
+RENDER_BUDGET_S = 1.0
+SCATTER_SHOTS = 100_000
+TARGET_TYPE = "NRA SR at 200y"
+
+
+def best_of(fn, runs=3):
+    best, result = None, None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def scatter_png(x, y):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    import io
+
+    fig = Figure(figsize=(8, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.scatter(x, y, s=500, c="red", alpha=0.8, edgecolors="black")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    return buf.getvalue()
+
+
+def main(n_shots=1_000_000):
+    rng = np.random.default_rng(0)
+    # a shooter's season: a few groups with different zeros, plus some wild shots
+    centres = rng.normal(0, 15, (20, 2))
+    pick = rng.integers(0, len(centres), n_shots)
+    x = centres[pick, 0] + rng.normal(0, 35, n_shots)
+    y = centres[pick, 1] + rng.normal(0, 35, n_shots)
+    wild = rng.random(n_shots) < 0.001
+    x[wild] *= 6
+    shots = {"x": x, "y": y, "target_type": TARGET_TYPE}
+    print(f"{n_shots:,} shots")
+
+    grid = density_grid(x, y, kde=False)
+    h = grid.half_width_mm
+    bin_s, (counts, _) = best_of(lambda: histogram(x, y, h))
+    h2d_s, (reference, _, _) = best_of(lambda: np.histogram2d(y, x, bins=counts.shape[0], range=[[-h, h], [-h, h]]))
+    kde_s, kde = best_of(lambda: density_grid(x, y))
+    print(f"  bincount binning     {bin_s * 1000:8.1f} ms   (np.histogram2d {h2d_s * 1000:.1f} ms, "
+          f"same counts: {np.array_equal(counts, reference)})")
+    print(f"  KDE grid             {kde_s * 1000:8.1f} ms   ({kde.values.shape[0]}x{kde.values.shape[1]} cells, "
+          f"bandwidth {kde.bandwidth_mm:.1f} mm, target {kde.target_size_mm} mm, "
+          f"mass kept {kde.values.sum() / kde.shots:.4f})")
+
+    cache = RenderCache()
+    t0 = time.perf_counter()
+    cache.density_png(shots, "warm-up, with the target background")
+    cold_s = time.perf_counter() - t0
+    # a new title is a new cache entry, so each run renders
+    runs = iter(range(100))
+    render_s, png = best_of(lambda: cache.density_png(shots, f"Season {next(runs)}"))
+    hit_s, _ = best_of(lambda: cache.density_png(shots, "Season 0"))
+    print(f"  density PNG          {render_s * 1000:8.1f} ms   (first, with background: {cold_s * 1000:.1f} ms; "
+          f"cached: {hit_s * 1000:.1f} ms; {len(png) / 1000:.0f} kB)")
+
+    scatter_s, _ = best_of(lambda: scatter_png(x[:SCATTER_SHOTS], y[:SCATTER_SHOTS]), runs=1)
+    print(f"  scatter markers      {scatter_s * 1000:8.1f} ms for {SCATTER_SHOTS:,} shots "
+          f"(~{scatter_s * n_shots / SCATTER_SHOTS:.1f} s for all)")
+
+    if render_s > RENDER_BUDGET_S:
+        print(f"FAIL: density PNG took {render_s:.2f} s (budget {RENDER_BUDGET_S:.1f} s)")
+        return 1
+    print("OK: within the render budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,120 @@
+# benchmarks/bench_drift.py
+"""
+Wind / elevation drift reconstruction (drift.py) over a million shots. The
+synthetic export has no conditions, so a wind and an elevation wave, one per
+relay, are added to every shot first. Then it times store_drift and checks
+that the relay conditions it reports follow the added waves while the shooter
+part does not. Also checks the running median against pandas'
+rolling().median() per string, timed on SERIES_STRINGS strings and scaled up.
+Last, it feeds a smaller export to a LiveStore line by line, times
+LiveDrift.update after each shot and compares the final result with a batch
+run over the whole export.
+
+Run from the repository root:
+    python -m benchmarks.bench_drift [n_shots]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_export
+from drift import LiveDrift, relay_keys, rolling_median, shot_seconds, store_drift
+from group_stats import moa_by_target
+from ingest import parse_stores
+from live_feed import LiveStore
+from shot_store import ShotStore
+
+# Amplitudes (MOA) and period (s) of the added conditions
+WIND_MOA = 1.0
+ELEVATION_MOA = 0.5
+PERIOD_S = 600.0
+SERIES_STRINGS = 2_000
+LIVE_SHOTS = 2_000
+
+
+def with_conditions(store: ShotStore):
+    """The store with a wind and elevation wave per relay added to x_mm / y_mm, and the added MOA per shot."""
+    counts = (store.strings["stop"] - store.strings["start"]).to_numpy()
+    codes, _ = pd.factorize(pd.Series(relay_keys(store.strings), dtype=object))
+    phase = np.random.default_rng(1).uniform(0, 2 * np.pi, codes.max() + 1)[np.repeat(codes, counts)]
+    t = shot_seconds(store.shots["time"])
+    wind = WIND_MOA * np.sin(2 * np.pi * t / PERIOD_S + phase)
+    elevation = ELEVATION_MOA * np.cos(2 * np.pi * t / PERIOD_S + phase)
+    target_types = store.shots["target_info"].take(store.strings["start"].to_numpy()).astype(object)
+    mm_per_moa = np.repeat(moa_by_target(target_types.reset_index(drop=True)), counts)
+    shots = store.shots.assign(x_mm=(store.shots["x_mm"].to_numpy(np.float64) + wind * mm_per_moa).astype(np.float32),
+                               y_mm=(store.shots["y_mm"].to_numpy(np.float64) + elevation * mm_per_moa).astype(np.float32))
+    return ShotStore(store.strings, shots), wind, elevation
+
+
+def centred(values, group):
+    """values minus their string's mean."""
+    n = np.bincount(group)
+    return values - (np.bincount(group, values) / np.maximum(n, 1))[group]
+
+
+def _is_shot_line(line):
+    fields = line.split(",")
+    return len(fields) >= 13 and fields[0] == "" and fields[6].strip().lstrip("-").replace(".", "", 1).isdigit()
+
+
+def main(n_shots=1_000_000):
+    store, wind, elevation = with_conditions(parse_stores([make_export(n_shots, seed=0).encode()], max_workers=1)[0])
+    print(f"{len(store)} strings, {len(store.shots):,} shots")
+
+    t0 = time.perf_counter()
+    result = store_drift(store, include_sighters=True)
+    drift_s = time.perf_counter() - t0
+    shots = result.shots
+    print(f"  store_drift                {drift_s * 1000:8.1f} ms   ({len(store.shots) / drift_s / 1e6:.1f} M shots/s, "
+          f"{len(result.conditions):,} relay buckets)")
+
+    group = shots["string"].to_numpy()
+    added_wind, added_elevation = centred(wind, group), centred(elevation, group)
+    known = np.isfinite(shots["relay_wind_moa"].to_numpy())
+
+    def corr(a, b):
+        return float(np.corrcoef(a[known], b[known])[0, 1])
+
+    print(f"  relay wind follows the added wind:           r = {corr(shots['relay_wind_moa'].to_numpy(), added_wind):.3f}")
+    print(f"  relay elevation follows the added elevation: r = "
+          f"{corr(shots['relay_elevation_moa'].to_numpy(), added_elevation):.3f}")
+    print(f"  shooter wind against the added wind:         r = "
+          f"{corr(shots['shooter_wind_moa'].to_numpy(), added_wind):.3f}")
+
+    x = shots["x_moa"].to_numpy()
+    head = group < SERIES_STRINGS
+    t0 = time.perf_counter()
+    reference = np.concatenate([pd.Series(x[head & (group == g)]).rolling(5, center=True, min_periods=1).median()
+                                for g in range(min(SERIES_STRINGS, len(store)))])
+    series_s = (time.perf_counter() - t0) * len(store) / min(SERIES_STRINGS, len(store))
+    t0 = time.perf_counter()
+    median = rolling_median(x, group)
+    median_s = time.perf_counter() - t0
+    print(f"  running median, batched    {median_s * 1000:8.1f} ms   (pandas per string: ~{series_s * 1000:.0f} ms, "
+          f"same values: {np.allclose(median[head], reference, equal_nan=True)})")
+
+    export = make_export(LIVE_SHOTS, seed=2)
+    lines = export.splitlines()
+    live, tracker, times = LiveStore(), LiveDrift(), []
+    for line in lines:
+        live.apply("bench", [line])
+        if _is_shot_line(line):
+            t0 = time.perf_counter()
+            tracker.update(live)
+            times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    print(f"  live update after a shot   median {np.median(times):.2f} ms   95% {np.percentile(times, 95):.2f} ms   "
+          f"({len(times)} shots, {len(tracker.result().strings)} strings)")
+    batch = store_drift(parse_stores([export.encode()], max_workers=1)[0]).strings
+    merged = tracker.result().strings.merge(batch, on="unique_id", suffixes=("", "_batch"))
+    same = len(merged) == len(batch) and all(
+        np.allclose(merged[c].to_numpy(float), merged[c + "_batch"].to_numpy(float), equal_nan=True)
+        for c in ("wind_sd_moa", "elevation_sd_moa", "wind_corr", "elevation_corr"))
+    print(f"live result equals a batch run: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
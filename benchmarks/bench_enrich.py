@@ -0,0 +1,120 @@
+# benchmarks/bench_enrich.py
+"""
+Match-day reconciliation of ~1000 strings with a scores table: the per-row
+apply / iterrows / per-string merge the app used to do, against enrichment.py.
+Also checks both produce the same scores table and shot data.
+
+Run from the repository root:
+    python -m benchmarks.bench_enrich [n_strings]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_export
+from enrichment import attach_scores, enrich_scores, strings_index
+from shotmarker_parser import parse_shotmarker_csv
+
+
+def make_scores(strings):
+    """A scores table in parse_scores_csv form matching every other string."""
+    rows = []
+    for i, string in enumerate(strings[::2]):
+        total, shots = string['unique_id'].split(',', 1)
+        rows.append({'match': str(i % 6 + 1), 'user': f"Shooter {i % 40}", 'total': total, 'shots': shots})
+    df = pd.DataFrame(rows)
+    df['uniq_id'] = df['total'].astype(str) + "," + df['shots'].astype(str)
+    for col in ['relay', 'match_id', 'target']:
+        df[col] = ''
+    return df
+
+
+def legacy_enrich(all_strings, df_scores):
+    """STEP 1-3 of streamlit_app.py before enrichment.py."""
+    shotmarker_metadata = {}
+    for string in all_strings:
+        unique_id = string.get('unique_id', '')
+        if not unique_id:
+            continue
+        # the app read these from the shot data before they became string-level
+        relay = string.get('relay')
+        match_id = string.get('match')
+        shotmarker_metadata[unique_id] = {
+            'relay': relay,
+            'match_id': match_id,
+            'target': string.get('rifle', ''),
+            'shooter': string.get('shooter', ''),
+        }
+
+    def get_metadata_value(uniq_id, key):
+        return shotmarker_metadata.get(uniq_id, {}).get(key, '')
+
+    df_scores['relay'] = df_scores['uniq_id'].apply(lambda x: get_metadata_value(x, 'relay') or '')
+    df_scores['match_id'] = df_scores['uniq_id'].apply(lambda x: get_metadata_value(x, 'match_id') or '')
+    df_scores['target'] = df_scores['uniq_id'].apply(lambda x: get_metadata_value(x, 'target') or '')
+    df_scores['match_id'] = df_scores['match_id'].replace('', pd.NA)
+    df_scores['match_id'] = df_scores.groupby('match')['match_id'].ffill().bfill()
+    df_scores['match_id'] = df_scores['match_id'].fillna('')
+    for col in ['relay', 'target']:
+        df_scores[col] = df_scores[col].replace('', pd.NA)
+        df_scores[col] = df_scores.groupby('user')[col].ffill().bfill()
+        df_scores[col] = df_scores[col].fillna('')
+
+    scores_lookup = {}
+    for _, row in df_scores.iterrows():
+        if row['uniq_id']:
+            scores_lookup[row['uniq_id']] = row.to_dict()
+    for string in all_strings:
+        unique_id = string.get('unique_id', '')
+        if not unique_id or unique_id not in scores_lookup:
+            continue
+        scores_row = scores_lookup[unique_id]
+        user_from_scores = scores_row.get('user', '')
+        if user_from_scores:
+            string['shooter'] = user_from_scores
+            string['shooter_name'] = f"{user_from_scores} {string.get('rifle', '')}".strip()
+        df_shotmarker = string['data'].copy()
+        df_shotmarker['unique_id'] = unique_id
+        df_scores_row = pd.DataFrame([scores_row]).rename(columns={'uniq_id': 'unique_id'})
+        string['data'] = pd.merge(df_shotmarker, df_scores_row, on='unique_id', how='left', suffixes=('', '_scores'))
+    return df_scores
+
+
+def _as_text(df):
+    """Categorical and string columns as plain object columns, to compare values only."""
+    return df.astype({c: object for c in df.columns
+                      if isinstance(df[c].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[c].dtype)})
+
+
+def new_enrich(all_strings, df_scores):
+    df_scores = enrich_scores(df_scores, strings_index(all_strings))
+    attach_scores(all_strings, df_scores)
+    return df_scores
+
+
+def main(n_strings=1000):
+    text = make_export(n_strings * 22, shots_per_string=20, sighters=2)
+    df_scores = make_scores(parse_shotmarker_csv(text.encode()))
+
+    results = {}
+    for name, func in (("legacy", legacy_enrich), ("enrichment", new_enrich)):
+        strings = parse_shotmarker_csv(text.encode())
+        t0 = time.perf_counter()
+        scores = func(strings, df_scores.copy())
+        elapsed = time.perf_counter() - t0
+        results[name] = (scores, strings)
+        print(f"{name:12s} {len(strings)} strings, {len(scores)} score rows: {elapsed * 1000:8.1f} ms")
+
+    (old_scores, old_strings), (new_scores, new_strings) = results["legacy"], results["enrichment"]
+    pd.testing.assert_frame_equal(new_scores, old_scores, check_dtype=False)
+    for a, b in zip(new_strings, old_strings):
+        assert a['shooter'] == b['shooter']
+        assert a.get('shooter_name') == b.get('shooter_name')
+        pd.testing.assert_frame_equal(_as_text(a['data']), _as_text(b['data']), check_dtype=False)
+    print("outputs match")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
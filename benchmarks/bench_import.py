@@ -0,0 +1,124 @@
+# benchmarks/bench_import.py
+"""
+Cold-start import time of the Streamlit entry point, measured with
+python -X importtime in fresh interpreters.
+
+The module-level imports of streamlit_app.py are read from its source (so
+the app itself is not run) and imported in the same order in a new
+process. The best of several runs is reported, split into third-party
+packages and this repository's modules, with the slowest imports listed.
+
+Exits non-zero when the regression checks fail:
+  - a module that must load lazily (LAZY_MODULES) was imported at startup;
+  - the repository's own modules took more than REPO_BUDGET_MS;
+  - everything together took more than TOTAL_BUDGET_MS.
+
+Run from the repository root:
+    python -m benchmarks.bench_import [runs] [--total-budget-ms MS] [--repo-budget-ms MS]
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from typing import List, Dict, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = os.path.join(REPO_ROOT, "streamlit_app.py")
+
+# Imported only when the first target is drawn or a report is built
+LAZY_MODULES = ("matplotlib", "PIL", "plot_target", "render_cache", "openpyxl")
+# Time this repository's modules may add on top of streamlit / NumPy / pandas
+REPO_BUDGET_MS = 150.0
+# Time for all of the app's imports, third-party packages included
+TOTAL_BUDGET_MS = 2500.0
+SLOWEST_SHOWN = 12
+
+
+def app_imports(path: str = APP_SCRIPT) -> List[str]:
+    """Top-level module names imported at module level by a script, in order."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def repo_modules() -> set:
+    """Names of the .py modules at the repository root."""
+    return {name[:-3] for name in os.listdir(REPO_ROOT) if name.endswith(".py")}
+
+
+def measure(modules: List[str]) -> List[Tuple[int, str, int, int]]:
+    """
+    Import modules in a fresh interpreter with -X importtime. Returns
+    (depth, name, self_us, cumulative_us) per imported module.
+    """
+    code = "; ".join(f"import {name}" for name in modules)
+    env = {**os.environ, "MPLBACKEND": "Agg"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(rows, modules: List[str]) -> Dict[str, float]:
+    """Total, repository and third-party milliseconds of the app's top-level imports."""
+    ours = repo_modules()
+    wanted = set(modules)
+    top = {name: cumulative for depth, name, _, cumulative in rows if depth == 0 and name in wanted}
+    total = sum(top.values()) / 1000.0
+    repo = sum(us for name, us in top.items() if name.split(".")[0] in ours) / 1000.0
+    return {"total": total, "repo": repo, "third_party": total - repo}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time budget of streamlit_app.py.")
+    parser.add_argument("runs", nargs="?", type=int, default=5)
+    parser.add_argument("--total-budget-ms", type=float, default=TOTAL_BUDGET_MS)
+    parser.add_argument("--repo-budget-ms", type=float, default=REPO_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    modules = app_imports()
+    print(f"streamlit_app.py imports: {', '.join(modules)}")
+
+    best_rows, best = None, None
+    for _ in range(max(args.runs, 1)):
+        rows = measure(modules)
+        summary = summarize(rows, modules)
+        if best is None or summary["total"] < best["total"]:
+            best_rows, best = rows, summary
+
+    print(f"best of {args.runs}: {best['total']:.0f} ms total "
+          f"({best['third_party']:.0f} ms third-party, {best['repo']:.0f} ms repository modules)")
+    print("slowest imports (self time):")
+    for _, name, self_us, cumulative_us in sorted(best_rows, key=lambda r: -r[2])[:SLOWEST_SHOWN]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:7.1f} ms)  {name}")
+
+    failures = []
+    eager = sorted({name.split(".")[0] for _, name, _, _ in best_rows if name.split(".")[0] in LAZY_MODULES})
+    if eager:
+        failures.append(f"modules that should load lazily were imported at startup: {', '.join(eager)}")
+    if best["repo"] > args.repo_budget_ms:
+        failures.append(f"repository modules took {best['repo']:.0f} ms (budget {args.repo_budget_ms:.0f} ms)")
+    if best["total"] > args.total_budget_ms:
+        failures.append(f"imports took {best['total']:.0f} ms (budget {args.total_budget_ms:.0f} ms)")
+    for message in failures:
+        print(f"FAIL: {message}")
+    if not failures:
+        print("OK: within the import-time budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
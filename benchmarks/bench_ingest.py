@@ -0,0 +1,33 @@
+# benchmarks/bench_ingest.py
+"""
+Files per second for parallel ingestion of a synthetic weekend of exports,
+by worker count. Also checks the parallel output matches the serial parser.
+
+Run from the repository root:
+    python -m benchmarks.bench_ingest [n_files] [shots_per_file]
+"""
+import os
+import sys
+
+from benchmarks.bench_parser import check_same
+from benchmarks.synthetic import make_export
+from ingest import _throughput, parse_files
+from shotmarker_parser import parse_shotmarker_csv
+
+
+def main(n_files=48, shots_per_file=5_000):
+    contents = [make_export(shots_per_file, seed=i).encode() for i in range(n_files)]
+
+    serial = [parse_shotmarker_csv(c) for c in contents[:8]]
+    parallel = parse_files(contents[:8], max_workers=4)
+    for a, b in zip(parallel, serial):
+        check_same(a, b)
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    _throughput(contents, worker_counts)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
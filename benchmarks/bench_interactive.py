@@ -0,0 +1,58 @@
+# benchmarks/bench_interactive.py
+"""
+What the server does per string for the interactive chart against the static
+one: building the interactive_target payload (and its JSON size) against
+rendering the PNG through RenderCache (and its size). A zoom, a tooltip or a
+series toggle costs the static plot another rerun (and a new image, when the
+view changes), and the interactive one nothing.
+Also checks the payload's shot arrays decode back to the string's shots.
+
+Run from the repository root:
+    python -m benchmarks.bench_interactive [n_strings]
+"""
+import base64
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_export
+from ingest import parse_stores
+from interactive_target import target_plot_data
+from render_cache import RenderCache
+
+
+def main(n_strings=200):
+    # the synthetic export has 22 shots per string, sighters included
+    strings = parse_stores([make_export(n_strings * 22, seed=0).encode()], max_workers=1)[0].to_strings()
+    print(f"{len(strings)} strings")
+
+    t0 = time.perf_counter()
+    payloads = [json.dumps(target_plot_data(string)) for string in strings]
+    payload_s = time.perf_counter() - t0
+
+    cache = RenderCache()
+    cache.target_png(strings[0])  # the ring background, drawn once per target type and size
+    t0 = time.perf_counter()
+    pngs = [cache.target_png(string) for string in strings]
+    png_s = time.perf_counter() - t0
+
+    n = len(strings)
+    print(f"  interactive payload  {payload_s / n * 1000:7.2f} ms / string   "
+          f"{sum(map(len, payloads)) / n / 1000:6.1f} kB")
+    print(f"  static PNG           {png_s / n * 1000:7.2f} ms / string   "
+          f"{sum(map(len, pngs)) / n / 1000:6.1f} kB")
+
+    payload = json.loads(payloads[-1])
+    df = strings[-1]["data"]
+    x = np.frombuffer(base64.b64decode(payload["x"]), dtype="<f4")
+    y = np.frombuffer(base64.b64decode(payload["y"]), dtype="<f4")
+    same = (np.array_equal(x, df["x_mm"].to_numpy(dtype=np.float32))
+            and np.array_equal(y, df["y_mm"].to_numpy(dtype=np.float32))
+            and payload["id"].split("\n") == [str(v) for v in df["id"]])
+    print(f"payload decodes to the string's shots: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,59 @@
+# benchmarks/bench_labels.py
+"""
+Per-shot cost of labelling shots: one Annotation per shot versus the single
+PathCollection drawn by plot_target.draw_shot_labels.
+
+Run from the repository root:
+    python -m benchmarks.bench_labels
+"""
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from plot_target import draw_shot_labels
+
+
+def annotate_labels(ax, x, y, labels):
+    """The previous labelling path: one ax.annotate per shot."""
+    return [ax.annotate(str(label), (xi, yi), fontsize=8, ha='center', va='center',
+                        color='white', weight='bold', zorder=6)
+            for xi, yi, label in zip(x, y, labels)]
+
+
+def _time_per_string(label_fn, n_shots, repeat=30):
+    fig = Figure(figsize=(8, 8))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_xlim(-200, 200)
+    ax.set_ylim(-200, 200)
+    canvas.draw()
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(0, 50, n_shots), rng.normal(0, 50, n_shots)
+    labels = [str(i + 1) for i in range(n_shots)]
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        artists = label_fn(ax, x, y, labels)
+        artists = artists if isinstance(artists, list) else [artists]
+        for artist in artists:
+            ax.draw_artist(artist)
+        best = min(best, time.perf_counter() - t0)
+        for artist in artists:
+            artist.remove()
+    return best
+
+
+def main():
+    for name, fn in (("annotate per shot", annotate_labels), ("path collection", draw_shot_labels)):
+        t20 = _time_per_string(fn, 20)
+        t60 = _time_per_string(fn, 60)
+        per_shot = (t60 - t20) / 40
+        print(f"{name:18s} 20 shots {t20 * 1000:6.2f} ms   60 shots {t60 * 1000:6.2f} ms   "
+              f"per shot {per_shot * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
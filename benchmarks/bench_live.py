@@ -0,0 +1,100 @@
+# benchmarks/bench_live.py
+"""
+Latency of the live feed from a shot line being sent to its updated target
+plot. A synthetic export is sent line by line to a LiveFeed over local TCP;
+after each shot line the sender waits until a consumer thread, doing what
+the app's live panel does (changed_since, render the changed strings), has
+drawn the string. Reports the median / 95th percentile / maximum of each
+stage. Then the whole export is sent as fast as possible to measure
+throughput.
+
+Run from the repository root:
+    python -m benchmarks.bench_live [n_shots]
+"""
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_export
+from live_feed import LiveFeed, send_lines
+from render_cache import RenderCache
+
+WAIT_SECONDS = 10.0
+
+
+def _is_shot_line(line):
+    fields = line.split(",")
+    return len(fields) >= 13 and fields[0] == "" and fields[6].strip().lstrip("-").replace(".", "", 1).isdigit()
+
+
+class Consumer(threading.Thread):
+    """Redraws changed strings as the app's live panel does and reports each draw."""
+
+    def __init__(self, store):
+        super().__init__(daemon=True)
+        self.store = store
+        self.cache = RenderCache()
+        self.drawn = threading.Event()
+        self.last = None
+        self.running = True
+
+    def run(self):
+        version = 0
+        while self.running:
+            if not self.store.wait(version, timeout=0.1):
+                continue
+            keys, version = self.store.changed_since(version)
+            for key in keys:
+                self.cache.target_png(self.store.get(key))
+                done = time.monotonic()
+                self.store.record_latency(key, done)
+                self.last = (key, done)
+            self.drawn.set()
+
+
+def main(n_shots=2_000):
+    feed = LiveFeed()
+    port = feed.listen(0)
+    consumer = Consumer(feed.store)
+    consumer.start()
+    # warm up the renderer (fonts, target backgrounds)
+    send_lines(make_export(50, seed=1).splitlines(), port)
+    time.sleep(1.0)
+
+    lines = make_export(n_shots, seed=2).splitlines()
+    stages = []
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        for line in lines:
+            consumer.drawn.clear()
+            sent = time.monotonic()
+            sock.sendall((line + "\n").encode("utf-8"))
+            if not _is_shot_line(line):
+                continue
+            if not consumer.drawn.wait(WAIT_SECONDS):
+                raise RuntimeError("no update after a shot line")
+            key, done = consumer.last
+            received, updated = feed.store.timing(key)
+            stages.append((received - sent, updated - received, done - updated, done - sent))
+    stages = np.array(stages) * 1000.0
+    print(f"{len(stages)} shot lines, one at a time")
+    for name, values in zip(("socket + event loop", "parse", "render", "line to plot"), stages.T):
+        print(f"  {name:20s} median {np.median(values):7.2f} ms   95% {np.percentile(values, 95):7.2f} ms   "
+              f"max {values.max():7.2f} ms")
+
+    consumer.running = False
+    lines = make_export(n_shots * 50, seed=3).splitlines()
+    before = len(feed.store.strings())
+    t0 = time.perf_counter()
+    send_lines(lines, port)
+    expected = before + sum(1 for line in lines if line.startswith("Oct "))
+    while len(feed.store.strings()) < expected and time.perf_counter() - t0 < 120:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - t0
+    print(f"bulk: {len(lines)} lines parsed in {elapsed:.2f} s ({len(lines) / elapsed:,.0f} lines/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
@@ -0,0 +1,64 @@
+# benchmarks/bench_memory.py
+"""
+Bytes per shot held after parsing: the original line-by-line parser (object
+columns, metadata repeated on every row, one DataFrame per string) against
+the shot store (one shared compact table, per-string views).
+
+Python allocations are counted with tracemalloc; Arrow-backed buffers such as
+categorical categories are counted through pyarrow's allocator.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory [n_shots]
+"""
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.bench_parser import legacy_parse
+from benchmarks.synthetic import make_export
+from ingest import parse_stores
+
+
+def _arrow_bytes():
+    try:
+        import pyarrow
+    except ImportError:
+        return 0
+    return pyarrow.total_allocated_bytes()
+
+
+def retained_bytes(fn):
+    """Call fn and return (result, bytes still allocated while the result is alive)."""
+    gc.collect()
+    tracemalloc.start()
+    arrow_before = _arrow_bytes()
+    result = fn()
+    gc.collect()
+    python_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, python_bytes + _arrow_bytes() - arrow_before
+
+
+def main(n_shots=100_000):
+    text = make_export(n_shots)
+    # warm up imports and caches so they are not counted below
+    parse_stores([make_export(1000).encode()], max_workers=1)[0].to_strings()
+
+    store, store_bytes = retained_bytes(lambda: parse_stores([text.encode()], max_workers=1)[0])
+    n = len(store.shots)
+    print(f"{len(store)} strings, {n} shots, raw CSV {len(text.encode()) / n:8.1f} bytes/shot")
+
+    old, old_bytes = retained_bytes(lambda: legacy_parse(text))
+    print(f"line-by-line parser:     {old_bytes / n:8.1f} bytes/shot")
+    del old
+
+    # the parse cache keeps only the store; views are built for each rerun
+    print(f"shot store:              {store_bytes / n:8.1f} bytes/shot  "
+          f"({store.nbytes()['total'] / n:.1f} by DataFrame.memory_usage)  {old_bytes / store_bytes:.1f}x smaller")
+    strings, view_bytes = retained_bytes(store.to_strings)
+    print(f"store + views of all {len(strings)} strings: {(store_bytes + view_bytes) / n:8.1f} bytes/shot  "
+          f"{old_bytes / (store_bytes + view_bytes):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,130 @@
+# benchmarks/bench_parser.py
+"""
+Compare the columnar parse_shotmarker_csv against the original line-by-line parser.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser [n_shots]
+"""
+import re
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_export
+from shot_store import STRING_LEVEL_COLUMNS
+from shotmarker_parser import parse_shotmarker_csv
+
+
+def legacy_parse(text):
+    """Line-by-line reference parser (one dict per shot, one DataFrame per string)."""
+    header_re = re.compile(r'^[A-Z][a-z]{2}\b.*,\s*')
+    all_strings, current_string, current_data = [], None, []
+
+    def finish():
+        current_string["data"] = pd.DataFrame(current_data)
+        stage_text = current_string["shooter_stage"]
+        relay = re.search(r'[Rr](\d+)', stage_text)
+        match = re.search(r'[Mm](\d+)', stage_text)
+        words = current_string["shooter"].split()
+        current_string["data"]["relay"] = relay.group(1) if relay else None
+        current_string["data"]["match"] = match.group(1) if match else None
+        current_string["data"]["shooter_name"] = f"{words[0] if words else ''} {current_string['rifle']}".strip()
+        current_string["unique_id"] = current_string["score"] + "," + ",".join(str(s["score"]) for s in current_data)
+        all_strings.append(current_string)
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("ShotMarker") or line.startswith("Exported"):
+            continue
+        if header_re.match(line):
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) >= 6:
+                if current_string and current_data:
+                    finish()
+                tokens = parts[1].split()
+                rifle = re.search(r'\(([^)]+)\)', parts[2])
+                current_string = {
+                    "date": parts[0],
+                    "shooter": tokens[0] if tokens else "Unknown",
+                    "stage": " ".join(tokens[1:]),
+                    "shooter_stage": parts[1],
+                    "rifle": rifle.group(1) if rifle else parts[2],
+                    "target_info": parts[3],
+                    "course": parts[4],
+                    "score": parts[5],
+                }
+                current_data = []
+                continue
+        if current_string:
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) >= 13 and parts[6] and parts[7]:
+                try:
+                    current_data.append({
+                        "time": parts[1], "tags": parts[2], "id": parts[3], "score": parts[4],
+                        "temp_c": float(parts[5]) if parts[5] else None,
+                        "x_mm": float(parts[6]), "y_mm": float(parts[7]),
+                        "v_fps": float(parts[8]) if parts[8] else None,
+                        "yaw_deg": float(parts[9]) if parts[9] else None,
+                        "pitch_deg": float(parts[10]) if parts[10] else None,
+                        "quality": float(parts[11]) if parts[11] else None,
+                        "xy_err": float(parts[12]) if parts[12] else None,
+                        "target_info": current_string["course"],
+                    })
+                except ValueError:
+                    continue
+    if current_string and current_data:
+        finish()
+    return all_strings
+
+
+def _as_text(df):
+    """Categorical columns as plain object columns."""
+    return df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+
+def check_same(new, old):
+    """Assert both parsers produced the same strings, metadata and shot columns."""
+    assert len(new) == len(old), (len(new), len(old))
+    for a, b in zip(new, old):
+        for key in ("date", "shooter", "stage", "rifle", "course", "score", "unique_id"):
+            assert a[key] == b[key], key
+        # relay, match and shooter_name are string-level in the shot store
+        old_data = b["data"]
+        for key in STRING_LEVEL_COLUMNS:
+            if key not in old_data.columns:
+                assert a[key] == b[key], key
+            elif a[key] is None:
+                assert old_data[key].isna().all(), key
+            else:
+                assert (old_data[key] == a[key]).all(), key
+        old_data = old_data.drop(columns=STRING_LEVEL_COLUMNS, errors="ignore")
+        new_data = a["data"][old_data.columns]
+        # compare values, not storage: categoricals as text, float32 to its precision
+        pd.testing.assert_frame_equal(_as_text(new_data), _as_text(old_data), check_dtype=False, rtol=1e-6)
+
+
+def _best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(n_shots=100_000):
+    text = make_export(n_shots)
+    t_old, old = _best_of(lambda: legacy_parse(text))
+    t_new, new = _best_of(lambda: parse_shotmarker_csv(text))
+    check_same(new, old)
+
+    n = sum(len(s["data"]) for s in new)
+    print(f"{len(new)} strings, {n} shots")
+    print(f"line-by-line: {t_old * 1000:8.1f} ms  ({n / t_old:12,.0f} shots/s)")
+    print(f"columnar:     {t_new * 1000:8.1f} ms  ({n / t_new:12,.0f} shots/s)")
+    print(f"speedup:      {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
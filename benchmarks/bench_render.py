@@ -0,0 +1,38 @@
+# benchmarks/bench_render.py
+"""
+Batch-render target PNGs for a synthetic match, once with a full matplotlib
+figure per string and once on cached per-target background rasters.
+
+Run from the repository root:
+    python -m benchmarks.bench_render [n_strings]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_export
+from render_cache import LayeredTargetRenderer, render_target_png
+from shotmarker_parser import parse_shotmarker_csv
+
+
+def main(n_strings=500):
+    strings = parse_shotmarker_csv(make_export(n_strings * 22))
+
+    t0 = time.perf_counter()
+    for string in strings:
+        render_target_png(string)
+    t_full = time.perf_counter() - t0
+
+    renderer = LayeredTargetRenderer()
+    t0 = time.perf_counter()
+    for string in strings:
+        renderer.render(string)
+    t_layered = time.perf_counter() - t0
+
+    print(f"{len(strings)} strings")
+    print(f"full figure:        {t_full:7.2f} s  ({t_full / len(strings) * 1000:6.1f} ms/string)")
+    print(f"cached backgrounds: {t_layered:7.2f} s  ({t_layered / len(strings) * 1000:6.1f} ms/string)")
+    print(f"speedup:            {t_full / t_layered:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
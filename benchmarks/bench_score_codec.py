@@ -0,0 +1,93 @@
+# benchmarks/bench_score_codec.py
+"""
+Throughput of the score codec (shot_store.decode_scores) on a million shots
+against converting each cell on its own, as the app used to do with
+_to_int_score / _display_score through Series.apply. The codec is timed both
+from raw score text (what ingest does) and from a column that is already
+categorical; reading the labels decoded at ingest (device_score_labels) is
+timed too. Also checks the codec and the per-cell conversion agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_score_codec [n_shots]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import device_score_labels
+from shot_store import SCORE_LABEL_COLUMN, SCORE_POINTS_COLUMN, SCORE_X_COLUMN, decode_scores
+
+# Raw scores as they appear in exports and scores CSVs, with their weights
+SCORE_TEXT = ["X", "x", "V", "10", "10.0", "9", "8", "7", "6", "5", "0", "M", "", None]
+SCORE_WEIGHTS = [0.2, 0.05, 0.02, 0.25, 0.03, 0.2, 0.1, 0.05, 0.03, 0.02, 0.01, 0.01, 0.02, 0.01]
+
+
+def _to_int_score(s):
+    """The per-cell conversion the app used, with 'V' counted as an X like the codec."""
+    if pd.isna(s):
+        return -1, False
+    if isinstance(s, str) and s.strip().lower() in ("x", "v"):
+        return 10, True
+    try:
+        return int(float(s)), False
+    except Exception:
+        return -1, False
+
+
+def _display_score(s):
+    if pd.isna(s):
+        return ""
+    if isinstance(s, str) and s.strip().lower() in ("x", "v"):
+        return "X"
+    try:
+        return str(int(float(s)))
+    except Exception:
+        return str(s)
+
+
+def per_cell(scores: pd.Series):
+    decoded = scores.apply(_to_int_score)
+    points = np.array([p for p, _ in decoded], dtype=np.int8)
+    xs = np.array([x for _, x in decoded], dtype=bool)
+    labels = scores.apply(_display_score).to_numpy(dtype=object)
+    return points, xs, labels
+
+
+def best_of(fn, runs=3):
+    best, result = None, None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(n_shots=1_000_000):
+    rng = np.random.default_rng(0)
+    raw = np.array(SCORE_TEXT, dtype=object)[rng.choice(len(SCORE_TEXT), n_shots, p=SCORE_WEIGHTS)]
+    series = pd.Series(raw, dtype=object)
+    categorical = pd.Categorical(raw)
+
+    cell_s, (cell_points, cell_xs, cell_labels) = best_of(lambda: per_cell(series), runs=1)
+    text_s, (points, xs, labels) = best_of(lambda: decode_scores(raw))
+    cat_s, _ = best_of(lambda: decode_scores(categorical))
+    shots = pd.DataFrame({"score": categorical, SCORE_POINTS_COLUMN: points, SCORE_X_COLUMN: xs,
+                          SCORE_LABEL_COLUMN: labels})
+    read_s, stored = best_of(lambda: device_score_labels(shots))
+
+    print(f"{n_shots:,} shots")
+    for name, seconds in (("per cell (apply)", cell_s), ("codec from text", text_s),
+                          ("codec from categorical", cat_s), ("stored labels", read_s)):
+        print(f"  {name:24s} {seconds * 1000:9.1f} ms   {n_shots / seconds / 1e6:8.1f} M shots/s   "
+              f"{cell_s / seconds:7.1f}x")
+    same = (np.array_equal(points, cell_points) and np.array_equal(xs, cell_xs)
+            and np.array_equal(np.asarray(labels, dtype=object), cell_labels)
+            and np.array_equal(stored, cell_labels))
+    print(f"same points, X flags and labels: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,65 @@
+# benchmarks/bench_scoring.py
+"""
+Geometric scoring of a million shots on mixed target types in one
+score_frame pass, against scoring shot by shot (walk the rings of the
+shot's target) on a sample. Also checks both agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_scoring [n_shots]
+"""
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import AUTO_POINTS_COLUMN, AUTO_X_COLUMN, DEFAULT_BULLET_DIAMETER_MM, score_frame
+from target_registry import get_registry
+
+LOOP_SAMPLE = 100_000
+
+
+def make_shots(n_shots, seed=0):
+    rng = np.random.default_rng(seed)
+    types = get_registry().names()
+    return pd.DataFrame({
+        "x_mm": rng.normal(0, 120, n_shots).astype(np.float32),
+        "y_mm": rng.normal(0, 120, n_shots).astype(np.float32),
+        "target_info": pd.Categorical.from_codes(rng.integers(0, len(types), n_shots), categories=types),
+        "score": pd.Categorical(rng.choice(["X", "10", "9", "8"], n_shots)),
+    })
+
+
+def score_one(x, y, target_type, bullet_diameter_mm=DEFAULT_BULLET_DIAMETER_MM):
+    """Score one shot by walking its target's rings from the centre out."""
+    rings = sorted(get_registry().spec(target_type)["rings"], key=lambda r: r["diameter"])
+    reach = math.hypot(x, y) - bullet_diameter_mm / 2
+    for ring in rings:
+        if reach <= ring["diameter"] / 2:
+            return ring["points"], str(ring["ring"]).upper() == "X"
+    return 0, False
+
+
+def main(n_shots=1_000_000):
+    shots = make_shots(n_shots)
+    t0 = time.perf_counter()
+    scored = score_frame(shots)
+    elapsed = time.perf_counter() - t0
+    print(f"score_frame: {n_shots} shots in {elapsed * 1000:.1f} ms")
+
+    sample = shots.iloc[:LOOP_SAMPLE]
+    t0 = time.perf_counter()
+    expected = [score_one(float(x), float(y), t) for x, y, t in
+                zip(sample["x_mm"], sample["y_mm"], sample["target_info"])]
+    loop_elapsed = time.perf_counter() - t0
+    print(f"shot by shot: {len(sample)} shots in {loop_elapsed * 1000:.1f} ms "
+          f"(~{loop_elapsed * n_shots / len(sample):.1f} s for all)")
+
+    assert scored[AUTO_POINTS_COLUMN].iloc[:LOOP_SAMPLE].tolist() == [p for p, _ in expected]
+    assert scored[AUTO_X_COLUMN].iloc[:LOOP_SAMPLE].tolist() == [x for _, x in expected]
+    print("outputs match")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,72 @@
+# benchmarks/bench_stats.py
+"""
+Group statistics for 100k strings with group_stats.py, against a per-string
+loop (pairwise extreme spread, NumPy moments per string) on a sample of them.
+Also checks both give the same numbers.
+
+Run from the repository root:
+    python -m benchmarks.bench_stats [n_strings]
+"""
+import sys
+import time
+
+import numpy as np
+
+from group_stats import group_stats
+
+LOOP_SAMPLE = 5000
+
+
+def make_shots(n_strings, seed=0):
+    """Flat x/y/v arrays for strings of 5 to 60 shots, as group ids and per-shot values."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(5, 61, n_strings)
+    group = np.repeat(np.arange(n_strings), counts)
+    n = len(group)
+    x = (rng.normal(0, 40, n) + rng.normal(0, 30, n_strings)[group]).astype(np.float32)
+    y = (rng.normal(0, 40, n) + rng.normal(0, 30, n_strings)[group]).astype(np.float32)
+    v = rng.normal(2750, 12, n).astype(np.float32)
+    return x, y, v, group
+
+
+def loop_stats(x, y, v, group, n_groups):
+    """Per-string statistics the straightforward way."""
+    rows = []
+    bounds = np.searchsorted(group, np.arange(n_groups + 1))
+    for g in range(n_groups):
+        gx = x[bounds[g]:bounds[g + 1]].astype(np.float64)
+        gy = y[bounds[g]:bounds[g + 1]].astype(np.float64)
+        gv = v[bounds[g]:bounds[g + 1]].astype(np.float64)
+        cx, cy = gx.mean(), gy.mean()
+        r = np.hypot(gx - cx, gy - cy)
+        es = max(np.hypot(gx[i] - gx[j], gy[i] - gy[j]) for i in range(len(gx)) for j in range(i + 1, len(gx)))
+        rows.append((cx, cy, r.mean(), np.sqrt((r ** 2).sum() / (len(gx) - 1)), es,
+                     gv.mean(), gv.max() - gv.min(), gv.std(ddof=1)))
+    return np.array(rows)
+
+
+def main(n_strings=100_000):
+    x, y, v, group = make_shots(n_strings)
+    t0 = time.perf_counter()
+    stats = group_stats(x, y, group, n_strings, v=v)
+    elapsed = time.perf_counter() - t0
+    print(f"group_stats: {n_strings} strings, {len(x)} shots in {elapsed:.3f} s")
+
+    sample = min(LOOP_SAMPLE, n_strings)
+    in_sample = group < sample
+    t0 = time.perf_counter()
+    expected = loop_stats(x[in_sample], y[in_sample], v[in_sample], group[in_sample], sample)
+    loop_elapsed = time.perf_counter() - t0
+    print(f"per-string loop: {sample} strings in {loop_elapsed:.3f} s "
+          f"(~{loop_elapsed * n_strings / sample:.1f} s for all)")
+
+    got = stats.loc[:sample - 1, ["centroid_x_mm", "centroid_y_mm", "mean_radius_mm", "radial_sd_mm",
+                                  "extreme_spread_mm", "velocity_mean_fps", "velocity_es_fps",
+                                  "velocity_sd_fps"]].to_numpy()
+    np.testing.assert_allclose(got, expected, rtol=1e-6, atol=1e-6)
+    print("outputs match")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
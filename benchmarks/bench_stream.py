@@ -0,0 +1,91 @@
+# benchmarks/bench_stream.py
+"""
+Streaming parse of a large export with iter_shotmarker_strings against
+parse_shotmarker_csv on the whole file: time until the first string is
+available, total time, and peak Python memory (tracemalloc, in a separate
+pass) while the strings are consumed one by one and dropped. Also checks
+both parsers give the same strings.
+
+Run from the repository root:
+    python -m benchmarks.bench_stream [n_shots]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_export
+from shotmarker_parser import iter_shotmarker_strings, parse_shotmarker_csv
+
+
+def consume(make_strings, trace=False):
+    """
+    Consume strings one at a time; returns (seconds to first, seconds total,
+    peak traced bytes or None, count, shots). Timings are only meaningful
+    without tracing, since tracemalloc slows every allocation down.
+    """
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    first = None
+    count = shots = 0
+    for string in make_strings():
+        if first is None:
+            first = time.perf_counter() - t0
+        count += 1
+        shots += len(string["data"])
+    total = time.perf_counter() - t0
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return first, total, peak, count, shots
+
+
+def whole_file(path):
+    with open(path, "rb") as f:
+        return iter(parse_shotmarker_csv(f.read()))
+
+
+def streamed(path):
+    with open(path, "rb") as f:
+        yield from iter_shotmarker_strings(f)
+
+
+def same_strings(path):
+    with open(path, "rb") as f:
+        whole = parse_shotmarker_csv(f.read())
+    with open(path, "rb") as f:
+        stream = list(iter_shotmarker_strings(f))
+    if len(whole) != len(stream):
+        return False
+    for a, b in zip(whole, stream):
+        if {k: v for k, v in a.items() if k != "data"} != {k: v for k, v in b.items() if k != "data"}:
+            return False
+        if not a["data"].reset_index(drop=True).astype(object).equals(b["data"].reset_index(drop=True).astype(object)):
+            return False
+    return True
+
+
+def main(n_shots=600_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_export(n_shots))
+        size_mb = os.path.getsize(path) / 1e6
+        # warm up imports and caches
+        list(iter_shotmarker_strings(make_export(1000).encode()))
+
+        print(f"{size_mb:.1f} MB export")
+        for name, make_strings in (("parse_shotmarker_csv", lambda: whole_file(path)),
+                                   ("iter_shotmarker_strings", lambda: streamed(path))):
+            first, total, _, count, shots = consume(make_strings)
+            peak = consume(make_strings, trace=True)[2]
+            print(f"{name:24s} first string {first * 1000:8.1f} ms   total {total:6.2f} s   "
+                  f"peak {peak / 1e6:7.1f} MB   ({count} strings, {shots} shots)")
+        print(f"same strings: {same_strings(path)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 600_000)
@@ -0,0 +1,94 @@
+# benchmarks/bench_trends.py
+"""
+Shooter trends over a season-sized archive: a synthetic export of a million
+shots (about 45k strings of 40 shooter / rifle pairs) with string dates
+spread over half a year. Times the per-string facts pass, building the
+TrendIndex, one shooter's season query, the summary of all shooters, and
+appending a new upload incrementally. Checks the incremental index against
+one built from scratch and the rolling points per shot against pandas'
+groupby().rolling().
+
+Run from the repository root:
+    python -m benchmarks.bench_trends [n_shots]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_export
+from ingest import parse_stores
+from shot_store import ShotStore
+from trends import TREND_WINDOW, TrendIndex, string_facts
+
+SEASON_DAYS = 180
+QUERIES = 1000
+
+
+def with_season_dates(store: ShotStore, first_day: str = "2024-03-01") -> ShotStore:
+    """The store with its strings' dates spread evenly over SEASON_DAYS."""
+    days = np.arange(len(store)) * SEASON_DAYS // max(len(store), 1)
+    dates = (pd.Timestamp(first_day) + pd.to_timedelta(days, unit="D")).strftime("%b %d %Y")
+    strings = store.strings.copy()
+    strings["date"] = np.asarray(dates, dtype=object)
+    return ShotStore(strings, store.shots)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main(n_shots=1_000_000):
+    store = with_season_dates(parse_stores([make_export(n_shots, seed=0).encode()], max_workers=1)[0])
+    upload = with_season_dates(parse_stores([make_export(1_000, seed=1).encode()], max_workers=1)[0],
+                               first_day="2024-08-28")
+    print(f"{len(store)} strings, {len(store.shots):,} shots")
+
+    facts_s, _ = timed(lambda: string_facts(store))
+    index = TrendIndex()
+    build_s, added = timed(lambda: index.append(store))
+    print(f"  facts (one pass over the shot table) {facts_s * 1000:8.1f} ms")
+    print(f"  build trend index                   {build_s * 1000:8.1f} ms   "
+          f"({added} strings, {len(index.shooters())} shooters)")
+
+    rng = np.random.default_rng(0)
+    shooters = index.shooters()
+    picks = [shooters[i] for i in rng.integers(0, len(shooters), QUERIES)]
+    times = []
+    for name in picks:
+        t0 = time.perf_counter()
+        index.season(name, "2024-04-01", "2024-07-31")
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    season = index.season(picks[0])
+    print(f"  season query (one shooter, {len(season)} strings) median {np.median(times):.3f} ms   "
+          f"max {times.max():.3f} ms")
+    summary_s, _ = timed(index.summary)
+    print(f"  summary of all shooters              {summary_s * 1000:8.1f} ms")
+
+    append_s, added = timed(lambda: index.append(upload))
+    print(f"  append an upload incrementally       {append_s * 1000:8.1f} ms   ({added} new strings)")
+
+    rebuilt = TrendIndex()
+    rebuilt.append(ShotStore(pd.concat([store.strings, upload.strings.assign(
+        start=upload.strings["start"] + len(store.shots), stop=upload.strings["stop"] + len(store.shots))],
+        ignore_index=True), pd.concat([store.shots, upload.shots], ignore_index=True)))
+    same = all(index.season(name).drop(columns="seq").equals(rebuilt.season(name).drop(columns="seq"))
+               for name in rebuilt.shooters())
+    same = same and np.allclose(index.summary().drop(columns=["first_date", "last_date"]).to_numpy(dtype=float),
+                                rebuilt.summary().drop(columns=["first_date", "last_date"]).to_numpy(dtype=float),
+                                equal_nan=True)
+    print(f"incremental index equals a rebuild: {same}")
+
+    season = index.season(picks[0])
+    grouped = season[["points", "shots"]].rolling(TREND_WINDOW, min_periods=1).sum()
+    reference = (grouped["points"] / grouped["shots"]).to_numpy()
+    print(f"rolling points per shot matches pandas rolling: "
+          f"{np.allclose(season['rolling_points_per_shot'].to_numpy(), reference)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,75 @@
+# benchmarks/bench_xlsx.py
+"""
+Parse the same synthetic export as CSV text and as an XLSX workbook, check the
+results match and report time and peak Python memory for both paths.
+
+Run from the repository root:
+    python -m benchmarks.bench_xlsx [n_shots]
+"""
+import datetime
+import io
+import sys
+import time
+import tracemalloc
+
+from openpyxl import Workbook
+
+from benchmarks.bench_parser import check_same
+from benchmarks.synthetic import make_export
+from shotmarker_parser import parse_shotmarker_csv
+
+
+def _cell(text):
+    """Store numeric-looking fields as numbers and shot times as times, like Excel does when opening a CSV."""
+    try:
+        number = float(text)
+    except ValueError:
+        try:
+            return datetime.datetime.strptime(text, "%I:%M:%S %p").time()
+        except ValueError:
+            return text or None
+    return int(number) if number.is_integer() and "." not in text else number
+
+
+def export_to_xlsx(text, days=3):
+    """Write a CSV export into an XLSX workbook, splitting the strings over several sheets."""
+    workbook = Workbook(write_only=True)
+    lines = text.splitlines()
+    per_sheet = len(lines) // days + 1
+    for day in range(days):
+        sheet = workbook.create_sheet(f"Day {day + 1}")
+        for line in lines[day * per_sheet:(day + 1) * per_sheet]:
+            sheet.append([_cell(field) for field in line.split(",")])
+    buf = io.BytesIO()
+    workbook.save(buf)
+    return buf.getvalue()
+
+
+def _measure(fn):
+    """Wall time of one run, then peak traced memory of a second run (tracing slows it down)."""
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main(n_shots=100_000):
+    text = make_export(n_shots)
+    data = export_to_xlsx(text)
+
+    t_csv, m_csv, from_csv = _measure(lambda: parse_shotmarker_csv(text.encode()))
+    t_xlsx, m_xlsx, from_xlsx = _measure(lambda: parse_shotmarker_csv(data))
+    check_same(from_xlsx, from_csv)
+
+    n = sum(len(s["data"]) for s in from_csv)
+    print(f"{len(from_csv)} strings, {n} shots, xlsx {len(data) / 1e6:.1f} MB")
+    print(f"csv:  {t_csv * 1000:8.1f} ms  peak {m_csv / 1e6:7.1f} MB")
+    print(f"xlsx: {t_xlsx * 1000:8.1f} ms  peak {m_xlsx / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,56 @@
+# benchmarks/synthetic.py
+"""Synthetic ShotMarker exports used by the benchmark scripts."""
+import numpy as np
+
+_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi"]
+_COURSES = ["NRA SR at 200y", "NRA SR-3 at 300y", "NRA MR-1 at 600y"]
+COLUMN_TITLES = ",time,tags,id,score,temp C,x mm,y mm,v fps,yaw deg,pitch deg,quality,xy err"
+
+
+def _score_for(radius_mm):
+    """Rough SR ring score for a radius, good enough for synthetic data."""
+    if radius_mm < 38.1:
+        return "X"
+    if radius_mm < 88.9:
+        return "10"
+    return str(max(5, 9 - int((radius_mm - 88.9) // 76.2)))
+
+
+def make_export(n_shots=100_000, shots_per_string=20, sighters=2, seed=0):
+    """
+    Build the text of a ShotMarker CSV export with roughly n_shots shot rows.
+    Strings cycle through shooters, relays and matches so the grouping code has
+    something realistic to chew on.
+    """
+    rng = np.random.default_rng(seed)
+    per_string = shots_per_string + sighters
+    n_strings = max(1, n_shots // per_string)
+    lines = ["ShotMarker Archive", "Exported Oct 14 2023 5:12:09 pm", ""]
+
+    for s in range(n_strings):
+        name = _NAMES[s % len(_NAMES)]
+        relay = 1 + (s // len(_NAMES)) % 3
+        match = 1 + s // (len(_NAMES) * 3)
+        course = _COURSES[s % len(_COURSES)]
+        x = rng.normal(0, 40, per_string)
+        y = rng.normal(0, 40, per_string)
+        scores = [_score_for(r) for r in np.hypot(x, y)]
+        total = sum(10 if sc == "X" else int(sc) for sc in scores[sighters:])
+        xs = sum(1 for sc in scores[sighters:] if sc == "X")
+
+        lines.append(f"Oct 14 2023,{name} R{relay}M{match} prone,Rifle {s % 5} (T{s % 5}),"
+                     f"{course},{course},{total}-{xs}x,")
+        lines.append(COLUMN_TITLES)
+        seconds = 9 * 3600 + s * 60
+        for i in range(per_string):
+            seconds += int(rng.integers(15, 60))
+            hh, mm, ss = seconds // 3600 % 12 or 12, seconds // 60 % 60, seconds % 60
+            tag = "sighter" if i < sighters else ""
+            shot_id = chr(ord("A") + i) if i < sighters else str(i - sighters + 1)
+            lines.append(
+                f",{hh}:{mm:02d}:{ss:02d} am,{tag},{shot_id},{scores[i]},21.5,"
+                f"{x[i]:.1f},{y[i]:.1f},{2650 + rng.normal(0, 8):.0f},"
+                f"{rng.normal(0, 1):.2f},{rng.normal(0, 1):.2f},{rng.uniform(0, 1):.2f},{rng.uniform(0, 3):.1f}"
+            )
+        lines.append("")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,168 @@
+# density.py
+"""
+Shot density over many strings: 2D histograms and Gaussian KDE grids.
+
+For a shooter's season or a whole relay, thousands to millions of shots are
+binned on a regular grid over the plotted target area. Binning is a single
+np.bincount over flat cell indices, which is what np.histogram2d computes for
+uniform bins without its per-axis searchsorted. The KDE is that histogram
+convolved with a Gaussian kernel through a zero-padded FFT, so nothing wraps
+around the edges and the cost depends on the grid size, not on the number of
+shots.
+
+This module only needs NumPy; render_cache draws the grid over the cached
+target background (LayeredTargetRenderer.render_density).
+"""
+import math
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple
+
+import numpy as np
+
+# Cells per side of the density grid
+DENSITY_BINS = 256
+# The plotted target size holds this percentage of the shots, so a few wild
+# shots do not shrink everyone else's
+DENSITY_COVERAGE = 99.5
+# Axis limits are this factor times half the target size (as draw_target_background)
+PLOT_MARGIN = 1.1
+# Gaussian kernels are cut off at this many standard deviations
+_KERNEL_SIGMAS = 4.0
+
+
+class DensityGrid(NamedTuple):
+    """Shot density on a square grid centred on the aim point; values[row, col] with row 0 at the bottom."""
+    values: np.ndarray
+    half_width_mm: float
+    target_size_mm: int
+    bandwidth_mm: float
+    shots: int
+    outside: int
+
+
+def density_target_size(x: np.ndarray, y: np.ndarray, coverage: float = DENSITY_COVERAGE) -> int:
+    """
+    Displayed target size in mm, rounded as plot_target.auto_target_size does,
+    that holds `coverage` percent of the shots.
+    """
+    extent = np.maximum(np.abs(np.asarray(x, dtype=np.float64)), np.abs(np.asarray(y, dtype=np.float64)))
+    extent = extent[np.isfinite(extent)]
+    farthest = float(np.percentile(extent, coverage)) if len(extent) else 0.0
+    return max(50, math.ceil((farthest * 2 + 25) / 50) * 50)
+
+
+def histogram(x: np.ndarray, y: np.ndarray, half_width_mm: float, bins: int = DENSITY_BINS) -> Tuple[np.ndarray, int]:
+    """
+    (bins, bins) shot counts over [-half_width_mm, half_width_mm] on both axes
+    and the number of shots outside it. Shots without a position are ignored.
+    """
+    scale = bins / (2.0 * half_width_mm)
+    ix = np.floor((np.asarray(x, dtype=np.float64) + half_width_mm) * scale)
+    iy = np.floor((np.asarray(y, dtype=np.float64) + half_width_mm) * scale)
+    placed = np.isfinite(ix) & np.isfinite(iy)
+    inside = placed & (ix >= 0) & (ix < bins) & (iy >= 0) & (iy < bins)
+    cells = iy[inside].astype(np.intp) * bins + ix[inside].astype(np.intp)
+    counts = np.bincount(cells, minlength=bins * bins).reshape(bins, bins).astype(np.float64)
+    return counts, int(placed.sum() - inside.sum())
+
+
+def gaussian_smooth(grid: np.ndarray, sigma_cells: float) -> np.ndarray:
+    """A grid convolved with a normalized Gaussian (sigma in cells) through a zero-padded FFT."""
+    if sigma_cells <= 0:
+        return grid
+    radius = max(1, int(math.ceil(_KERNEL_SIGMAS * sigma_cells)))
+    taps = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel_1d = np.exp(-0.5 * (taps / sigma_cells) ** 2)
+    kernel_1d /= kernel_1d.sum()
+    kernel = np.outer(kernel_1d, kernel_1d)
+    # linear, not circular, convolution: pad to the full output size
+    shape = (grid.shape[0] + 2 * radius, grid.shape[1] + 2 * radius)
+    spectrum = np.fft.rfft2(grid, s=shape) * np.fft.rfft2(kernel, s=shape)
+    smoothed = np.fft.irfft2(spectrum, s=shape)[radius:radius + grid.shape[0], radius:radius + grid.shape[1]]
+    # FFT round-off leaves tiny negative values where there are no shots
+    return np.maximum(smoothed, 0.0)
+
+
+def scott_bandwidth(x: np.ndarray, y: np.ndarray) -> float:
+    """Scott's rule bandwidth (mm) for a 2D Gaussian KDE of the shots."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    placed = np.isfinite(x) & np.isfinite(y)
+    n = int(placed.sum())
+    if n < 2:
+        return 0.0
+    sigma = 0.5 * (x[placed].std(ddof=1) + y[placed].std(ddof=1))
+    return float(sigma * n ** (-1.0 / 6.0))
+
+
+def density_grid(x: np.ndarray, y: np.ndarray, target_size_mm: Optional[int] = None,
+                 bins: int = DENSITY_BINS, bandwidth_mm: Optional[float] = None, kde: bool = True) -> DensityGrid:
+    """
+    Density of shots at x, y (mm) over the plotted area of a target of
+    target_size_mm (by default sized to hold DENSITY_COVERAGE percent of
+    them). With kde the histogram is smoothed with a Gaussian of bandwidth_mm
+    (Scott's rule by default, at least one cell); values are shots per cell.
+    """
+    if target_size_mm is None:
+        target_size_mm = density_target_size(x, y)
+    half_width = target_size_mm / 2 * PLOT_MARGIN
+    counts, outside = histogram(x, y, half_width, bins)
+    shots = int(counts.sum())
+    cell_mm = 2 * half_width / bins
+    bandwidth = 0.0
+    if kde:
+        bandwidth = max(scott_bandwidth(x, y) if bandwidth_mm is None else bandwidth_mm, cell_mm)
+        counts = gaussian_smooth(counts, bandwidth / cell_mm)
+    return DensityGrid(counts, half_width, target_size_mm, bandwidth, shots, outside)
+
+
+def strings_shots(strings: List[Dict[str, Any]], include_sighters: bool = False) -> Dict[str, Any]:
+    """
+    Flat x_mm and y_mm arrays of the shots of many string dicts (sighters
+    left out unless include_sighters) and their most common target type,
+    whose rings are drawn under the density.
+    """
+    frames = [string["data"] for string in strings]
+
+    def column(name, dtype, fill):
+        parts = [df[name].to_numpy(dtype=dtype) if name in df.columns else np.full(len(df), fill, dtype=dtype)
+                 for df in frames]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    x, y = column("x_mm", np.float64, np.nan), column("y_mm", np.float64, np.nan)
+    if not include_sighters:
+        keep = column("tags", object, "") != "sighter"
+        x, y = x[keep], y[keep]
+    # a string's shots share its target type, so count shots per string's type
+    shots_by_type: Dict[Any, int] = {}
+    for df in frames:
+        if len(df) and "target_info" in df.columns and df["target_info"].iat[0]:
+            target = df["target_info"].iat[0]
+            shots_by_type[target] = shots_by_type.get(target, 0) + len(df)
+    target_type = max(shots_by_type, key=shots_by_type.get) if shots_by_type else None
+    return {"x": x, "y": y, "target_type": target_type}
+
+
+def store_shots(store, strings_mask: Optional[np.ndarray] = None, include_sighters: bool = False) -> Dict[str, Any]:
+    """
+    As strings_shots, for the strings of a ShotStore where strings_mask is
+    True (all by default), read from the shared shot table without per-string
+    views.
+    """
+    shots = store.shots
+    keep = np.ones(len(shots), dtype=bool)
+    if strings_mask is not None:
+        counts = (store.strings["stop"] - store.strings["start"]).to_numpy()
+        keep = np.repeat(np.asarray(strings_mask, dtype=bool), counts)
+    if not include_sighters and "tags" in shots.columns:
+        keep &= (shots["tags"] != "sighter").to_numpy()
+    target_type = None
+    if "target_info" in shots.columns and keep.any():
+        # the most common category, counted on the categorical codes
+        types = shots["target_info"].astype("category").array
+        codes = types.codes[keep]
+        codes = codes[codes >= 0]
+        if len(codes):
+            target_type = types.categories[np.argmax(np.bincount(codes))]
+    return {"x": shots["x_mm"].to_numpy(dtype=np.float64)[keep],
+            "y": shots["y_mm"].to_numpy(dtype=np.float64)[keep],
+            "target_type": target_type}
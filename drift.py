@@ -0,0 +1,456 @@
+# drift.py
+"""
+Wind and elevation drift through a string, and how much of it the relay shared.
+
+Each string's horizontal and vertical shot positions, converted to MOA with
+its target's distance, are smoothed over the shot sequence with Tukey's
+compound smoother: a running median of DRIFT_WINDOW shots, which ignores
+single wild shots, then a 1-2-1 Hanning pass. The smooth minus the string's
+median position is its drift: where the group was walking as the shots went
+down, in wind (x) and elevation (y).
+
+Shooters on the same relay of the same match fire at the same time under the
+same conditions. Drift they share is conditions; drift only one of them has
+is the shooter (a bad call, position, hold). For every shot, the relay
+conditions are the mean drift of the *other* shooters of its relay within
+CONDITION_BUCKETS time buckets of CONDITION_BUCKET_S seconds either side
+(leave-one-out, so a shooter's own drift never explains itself), and the
+shooter's part is their drift minus that.
+
+Everything runs on flat shot arrays for all strings and relays at once, as in
+group_stats: the running median is a sort of a (shots, DRIFT_WINDOW) window
+matrix and the string medians one argsort. The (relay, time bucket) cells of
+all relays are laid end to end on one axis, so the relay sums are a bincount
+and the neighbouring buckets a cumulative-sum box filter. LiveDrift keeps the
+result for a live feed (live_feed.LiveStore) and only recomputes the relays
+whose strings received shots.
+
+Command line:
+    python drift.py EXPORT... [--sighters] [--conditions]
+prints one row per string (or the relay conditions) and the time taken.
+"""
+import argparse
+import threading
+import time
+from typing import List, Dict, Any, Optional, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from group_stats import moa_by_target
+from shotmarker_parser import TIME_FORMATS
+
+# Shots per running median; odd, centred on the shot
+DRIFT_WINDOW = 5
+# Relay conditions are averaged over time buckets of this many seconds ...
+CONDITION_BUCKET_S = 30
+# ... this many on each side of a shot's own bucket
+CONDITION_BUCKETS = 2
+
+# Per shot, in string and sequence order
+DRIFT_COLUMNS = [
+    "string", "id", "seconds", "x_moa", "y_moa", "wind_moa", "elevation_moa",
+    "relay_wind_moa", "relay_elevation_moa", "shooter_wind_moa", "shooter_elevation_moa",
+]
+# Per string
+DRIFT_SUMMARY_COLUMNS = [
+    "unique_id", "relay_key", "shots", "wind_sd_moa", "elevation_sd_moa", "wind_corr", "elevation_corr",
+    "shooter_wind_sd_moa", "shooter_elevation_sd_moa",
+]
+# Per relay and time bucket
+CONDITION_COLUMNS = ["relay_key", "seconds", "wind_moa", "elevation_moa", "shooters", "shots"]
+
+
+class DriftResult(NamedTuple):
+    """Drift per shot, per string and per relay time bucket (DRIFT_COLUMNS, DRIFT_SUMMARY_COLUMNS, CONDITION_COLUMNS)."""
+    shots: pd.DataFrame
+    strings: pd.DataFrame
+    conditions: pd.DataFrame
+
+
+def shot_seconds(times) -> np.ndarray:
+    """
+    Seconds since midnight of shot time texts ('9:01:13 am', '14:02:09'), NaN
+    where none of the parser's time formats match. Categorical times are
+    parsed once per category.
+    """
+    times = pd.Series(times)
+    if isinstance(times.dtype, pd.CategoricalDtype):
+        codes = times.cat.codes.to_numpy()
+        per_category = shot_seconds(times.cat.categories.astype(object))
+        return np.append(per_category, np.nan)[np.where(codes >= 0, codes, len(per_category))]
+    text = times.astype(object).where(times.notna(), "").astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in TIME_FORMATS:
+        missing = parsed.isna().to_numpy()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+    clock = parsed.dt
+    return (clock.hour * 3600 + clock.minute * 60 + clock.second).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def relay_keys(strings: pd.DataFrame) -> np.ndarray:
+    """'<date> R<relay>M<match>' of each row of a strings table, None where its relay or match is unknown."""
+    def text(name):
+        values = strings[name] if name in strings.columns else pd.Series(None, index=strings.index)
+        return values.astype(object)
+
+    relay, match = text("relay"), text("match")
+    keys = (text("date").fillna("").astype(str) + " R" + relay.astype(str) + "M" + match.astype(str)).str.strip()
+    return np.where((relay.notna() & match.notna()).to_numpy(), keys.to_numpy(dtype=object), None)
+
+
+def rolling_median(values: np.ndarray, group: np.ndarray, window: int = DRIFT_WINDOW) -> np.ndarray:
+    """
+    Centred running median of window values within each group (groups
+    contiguous), shrinking at the group ends; NaN values are ignored.
+    """
+    n = len(values)
+    half = window // 2
+    rows = np.arange(n)
+    idx = rows[:, None] + np.arange(-half, half + 1)
+    inside = (idx >= 0) & (idx < n)
+    idx = np.clip(idx, 0, max(n - 1, 0))
+    inside &= group[idx] == group[:, None]
+    # NaN sorts last, so each row's finite values come first
+    windows = np.sort(np.where(inside, values[idx], np.nan), axis=1)
+    count = np.isfinite(windows).sum(axis=1)
+    lo = np.maximum(count - 1, 0) // 2
+    median = 0.5 * (windows[rows, lo] + windows[rows, count // 2])
+    return np.where(count > 0, median, np.nan)
+
+
+def hanning(values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """1-2-1 weighted mean of each value and its neighbours within its group, ignoring NaN."""
+    n = len(values)
+    total = np.where(np.isfinite(values), values, 0.0) * 2.0
+    weight = np.isfinite(values) * 2.0
+    for shift in (1, -1):
+        idx = np.arange(n) - shift
+        ok = (idx >= 0) & (idx < n)
+        idx = np.clip(idx, 0, max(n - 1, 0))
+        ok &= (group[idx] == group) & np.isfinite(values[idx])
+        total += np.where(ok, values[idx], 0.0)
+        weight += ok
+    with np.errstate(invalid="ignore"):
+        return np.where(weight > 0, total / weight, np.nan)
+
+
+def group_median(values: np.ndarray, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of the finite values of each group, NaN if none."""
+    finite = np.isfinite(values)
+    values, group = values[finite], group[finite]
+    median = np.full(n_groups, np.nan)
+    count = np.bincount(group, minlength=n_groups)
+    start = np.cumsum(count) - count
+    has = count > 0
+    # one sort of all groups by group, then value: each group's values are
+    # shifted past the previous group's
+    span = float(values.max() - values.min()) + 1.0 if len(values) else 1.0
+    order = np.argsort(group * span + (values - (values.min() if len(values) else 0.0)), kind="stable")
+    lo = order[start[has] + (count[has] - 1) // 2]
+    hi = order[start[has] + count[has] // 2]
+    median[has] = 0.5 * (values[lo] + values[hi])
+    return median
+
+
+def _dense_cells(owner: np.ndarray, bucket: np.ndarray, n_owners: int, pad: int):
+    """
+    Index of each shot's (owner, time bucket) cell on one dense axis that lays
+    every owner's range of buckets end to end, each with pad empty cells on
+    both sides. Returns (cells, size, offset, first): the axis size, and each
+    owner's offset on it and first bucket.
+    """
+    first = np.full(n_owners, np.iinfo(np.int64).max)
+    last = np.full(n_owners, -1, dtype=np.int64)
+    np.minimum.at(first, owner, bucket)
+    np.maximum.at(last, owner, bucket)
+    width = np.where(last >= 0, last - first + 1 + 2 * pad, 0)
+    offset = np.cumsum(width) - width
+    return offset[owner] + bucket - first[owner] + pad, int(width.sum()), offset, first
+
+
+def _box_sum(values: np.ndarray, reach: int) -> np.ndarray:
+    """Sum of values[i - reach:i + reach + 1] for every i."""
+    total = np.concatenate([[0.0], np.cumsum(values)])
+    n = len(values)
+    idx = np.arange(n)
+    return total[np.minimum(idx + reach + 1, n)] - total[np.maximum(idx - reach, 0)]
+
+
+def _grouped_sd(values: np.ndarray, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sample standard deviation of the finite values of each group."""
+    finite = np.isfinite(values)
+    v, g = values[finite], group[finite]
+    n = np.bincount(g, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(g, v, n_groups) / n
+        return np.sqrt(np.bincount(g, (v - mean[g]) ** 2, n_groups) / np.where(n > 1, n - 1, np.nan))
+
+
+def _grouped_corr(a: np.ndarray, b: np.ndarray, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """Pearson correlation of a and b within each group, over the shots where both are finite."""
+    both = np.isfinite(a) & np.isfinite(b)
+    a, b, g = a[both], b[both], group[both]
+    n = np.bincount(g, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ma, mb = np.bincount(g, a, n_groups) / n, np.bincount(g, b, n_groups) / n
+        da, db = a - ma[g], b - mb[g]
+        cov = np.bincount(g, da * db, n_groups)
+        return cov / np.sqrt(np.bincount(g, da * da, n_groups) * np.bincount(g, db * db, n_groups))
+
+
+def drift(x_moa: np.ndarray, y_moa: np.ndarray, seconds: np.ndarray, group: np.ndarray, n_groups: int,
+          relay: np.ndarray, window: int = DRIFT_WINDOW, bucket_s: float = CONDITION_BUCKET_S,
+          buckets: int = CONDITION_BUCKETS) -> Dict[str, Any]:
+    """
+    Drift of all strings at once. Shots are given in sequence order with each
+    string's (group's) shots contiguous; relay is each string's relay number
+    (-1 for none). Returns per-shot arrays (wind_moa, elevation_moa,
+    relay_wind_moa, relay_elevation_moa) and the per-string summary arrays
+    and relay conditions of DriftResult.
+    """
+    wind = hanning(rolling_median(x_moa, group, window), group)
+    elevation = hanning(rolling_median(y_moa, group, window), group)
+    wind -= group_median(x_moa, group, n_groups)[group]
+    elevation -= group_median(y_moa, group, n_groups)[group]
+
+    # (relay, time bucket) and (string, time bucket) cells on dense axes,
+    # padded so the sums over neighbouring buckets never reach another relay
+    shot_relay = relay[group]
+    used = (shot_relay >= 0) & np.isfinite(seconds) & np.isfinite(wind) & np.isfinite(elevation)
+    bucket = np.floor(seconds[used] / bucket_s).astype(np.int64)
+    n_relays = int(relay.max()) + 1 if len(relay) else 0
+    relay_cell, relay_size, relay_offset, relay_first = _dense_cells(shot_relay[used], bucket, n_relays, buckets)
+    string_cell, string_size, _, _ = _dense_cells(group[used], bucket, n_groups, buckets)
+
+    def window_sums(cells, size):
+        return [_box_sum(np.bincount(cells, weights, size), buckets)
+                for weights in (None, wind[used], elevation[used])]
+
+    relay_n, relay_wind_sum, relay_elevation_sum = window_sums(relay_cell, relay_size)
+    own_n, own_wind_sum, own_elevation_sum = window_sums(string_cell, string_size)
+    # leave the shooter's own shots out
+    others = relay_n[relay_cell] - own_n[string_cell]
+    relay_wind = np.full(len(group), np.nan)
+    relay_elevation = np.full(len(group), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relay_wind[used] = np.where(others > 0, (relay_wind_sum[relay_cell] - own_wind_sum[string_cell]) / others,
+                                    np.nan)
+        relay_elevation[used] = np.where(others > 0, (relay_elevation_sum[relay_cell]
+                                                      - own_elevation_sum[string_cell]) / others, np.nan)
+
+    # conditions per relay bucket that has shots, over all its shooters
+    shots_in_cell = np.bincount(relay_cell, minlength=relay_size)
+    cells = np.flatnonzero(shots_in_cell)
+    cell_relay = np.searchsorted(relay_offset, cells, side="right") - 1
+    # each string cell lies in one relay cell, so its shooters are its string cells
+    relay_of_string_cell = np.zeros(string_size, dtype=np.int64)
+    relay_of_string_cell[string_cell] = relay_cell
+    occupied = np.flatnonzero(np.bincount(string_cell, minlength=string_size))
+    shooters = np.bincount(relay_of_string_cell[occupied], minlength=relay_size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        conditions = {
+            "relay": cell_relay,
+            "seconds": (cells - relay_offset[cell_relay] - buckets + relay_first[cell_relay] + 0.5) * bucket_s,
+            "wind_moa": relay_wind_sum[cells] / relay_n[cells],
+            "elevation_moa": relay_elevation_sum[cells] / relay_n[cells],
+            "shooters": shooters[cells],
+            "shots": shots_in_cell[cells],
+        }
+
+    shooter_wind = wind - relay_wind
+    shooter_elevation = elevation - relay_elevation
+    finite = np.isfinite(x_moa) & np.isfinite(y_moa)
+    return {
+        "wind_moa": wind, "elevation_moa": elevation,
+        "relay_wind_moa": relay_wind, "relay_elevation_moa": relay_elevation,
+        "shooter_wind_moa": shooter_wind, "shooter_elevation_moa": shooter_elevation,
+        "shots": np.bincount(group[finite], minlength=n_groups),
+        "wind_sd_moa": _grouped_sd(wind, group, n_groups),
+        "elevation_sd_moa": _grouped_sd(elevation, group, n_groups),
+        "wind_corr": _grouped_corr(wind, relay_wind, group, n_groups),
+        "elevation_corr": _grouped_corr(elevation, relay_elevation, group, n_groups),
+        "shooter_wind_sd_moa": _grouped_sd(shooter_wind, group, n_groups),
+        "shooter_elevation_sd_moa": _grouped_sd(shooter_elevation, group, n_groups),
+        "conditions": conditions,
+    }
+
+
+def _result(x_moa, y_moa, seconds, group, ids, unique_ids, keys, **kwargs) -> DriftResult:
+    """DriftResult of the flat shot arrays of strings with the given unique_ids and relay keys."""
+    n_groups = len(unique_ids)
+    relay_codes, relay_names = pd.factorize(pd.Series(keys, dtype=object))
+    arrays = drift(x_moa, y_moa, seconds, group, n_groups, relay_codes, **kwargs)
+
+    ids = ids if isinstance(ids, pd.Categorical) else pd.Series(ids, dtype=object)
+    shots = pd.DataFrame({"string": group, "id": ids, "seconds": seconds, "x_moa": x_moa, "y_moa": y_moa,
+                          **{column: arrays[column] for column in DRIFT_COLUMNS[5:]}}, columns=DRIFT_COLUMNS)
+    strings = pd.DataFrame({"unique_id": pd.Series(unique_ids, dtype=object),
+                            "relay_key": pd.Series(keys, dtype=object),
+                            **{column: arrays[column] for column in DRIFT_SUMMARY_COLUMNS[2:]}},
+                           columns=DRIFT_SUMMARY_COLUMNS)
+    c = arrays["conditions"]
+    conditions = pd.DataFrame({
+        "relay_key": pd.Series(np.asarray(relay_names, dtype=object)[c["relay"]], dtype=object),
+        "seconds": c["seconds"],
+        "wind_moa": c["wind_moa"], "elevation_moa": c["elevation_moa"],
+        "shooters": c["shooters"], "shots": c["shots"],
+    }, columns=CONDITION_COLUMNS)
+    return DriftResult(shots, strings, conditions)
+
+
+def store_drift(store, include_sighters: bool = False, **kwargs) -> DriftResult:
+    """
+    Drift of every string of a ShotStore straight from its shared shot table;
+    strings are numbered by their position in the store. Sighters are left
+    out unless include_sighters; keyword arguments go to drift().
+    """
+    shots = store.shots
+    starts = store.strings["start"].to_numpy()
+    stops = store.strings["stop"].to_numpy()
+    group = np.repeat(np.arange(len(store)), stops - starts)
+    keep = np.ones(len(shots), dtype=bool)
+    if not include_sighters and "tags" in shots.columns:
+        keep = (shots["tags"] != "sighter").to_numpy()
+    if "target_info" in shots.columns and len(shots):
+        target_types = shots["target_info"].take(starts).astype(object).reset_index(drop=True)
+    else:
+        target_types = pd.Series([None] * len(store), dtype=object)
+    mm_per_moa = moa_by_target(target_types)[group[keep]]
+    seconds = shot_seconds(shots["time"])[keep] if "time" in shots.columns else np.full(int(keep.sum()), np.nan)
+    ids = shots["id"].array[keep] if "id" in shots.columns else np.full(int(keep.sum()), "", dtype=object)
+    return _result(shots["x_mm"].to_numpy(dtype=np.float64)[keep] / mm_per_moa,
+                   shots["y_mm"].to_numpy(dtype=np.float64)[keep] / mm_per_moa,
+                   seconds, group[keep], ids, store.strings["unique_id"].to_numpy(dtype=object),
+                   relay_keys(store.strings), **kwargs)
+
+
+def _relay_table(strings: List[Dict[str, Any]]) -> pd.DataFrame:
+    """The date, relay and match of string dicts, as relay_keys takes them."""
+    return pd.DataFrame([{k: string.get(k) for k in ("date", "relay", "match")} for string in strings],
+                        columns=["date", "relay", "match"])
+
+
+def strings_drift(strings: List[Dict[str, Any]], include_sighters: bool = False, **kwargs) -> DriftResult:
+    """As store_drift, for a list of parsed string dicts (numbered by list position)."""
+    frames = [string["data"] for string in strings]
+    counts = np.array([len(df) for df in frames], dtype=np.intp)
+
+    def column(name, fill=np.nan):
+        parts = [df[name].to_numpy(dtype=object) if name in df.columns else np.full(len(df), fill, dtype=object)
+                 for df in frames]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=object)
+
+    group = np.repeat(np.arange(len(frames)), counts)
+    keep = np.ones(len(group), dtype=bool)
+    if not include_sighters:
+        keep = column("tags", "") != "sighter"
+    target_types = pd.Series([df["target_info"].iat[0] if "target_info" in df.columns and len(df) else None
+                              for df in frames], dtype=object)
+    mm_per_moa = moa_by_target(target_types)[group[keep]]
+    return _result(column("x_mm")[keep].astype(np.float64) / mm_per_moa,
+                   column("y_mm")[keep].astype(np.float64) / mm_per_moa,
+                   shot_seconds(column("time", None)[keep]), group[keep], column("id", "")[keep],
+                   np.array([string.get("unique_id", "") for string in strings], dtype=object),
+                   relay_keys(_relay_table(strings)), **kwargs)
+
+
+class LiveDrift:
+    """
+    Drift of the strings of a live feed, kept up to date as shots arrive.
+
+    update() asks the LiveStore which strings changed since the last update
+    and recomputes, in one strings_drift batch, only the relays those strings
+    are on (a string without a relay is a batch of its own). Results are kept
+    per relay. Thread-safe.
+    """
+
+    def __init__(self, include_sighters: bool = False, **kwargs):
+        self.include_sighters = include_sighters
+        self.kwargs = kwargs
+        self.version = 0
+        self._relays: Dict[Any, DriftResult] = {}
+        self._lock = threading.Lock()
+
+    def update(self, live_store) -> List[Any]:
+        """Recompute the relays with changed strings; returns their keys."""
+        with self._lock:
+            changed, version = live_store.changed_since(self.version)
+            strings = live_store.strings()
+            # a string without a relay is a relay of its own
+            relays = [key if key is not None else ("string", string["live_key"])
+                      for key, string in zip(relay_keys(_relay_table(strings)), strings)]
+            changed = set(changed)
+            touched = {relay for relay, string in zip(relays, strings) if string["live_key"] in changed}
+            batch = [i for i, relay in enumerate(relays) if relay in touched]
+            if batch:
+                result = strings_drift([strings[i] for i in batch], self.include_sighters, **self.kwargs)
+                live_keys = np.array([strings[i]["live_key"] for i in batch], dtype=object)
+                # relays by number within the batch (keys of strings without one are tuples)
+                order = {relay: n for n, relay in enumerate(touched)}
+                batch_relays = np.array([order[relays[i]] for i in batch], dtype=np.intp)
+                shot_strings = result.shots["string"].to_numpy()
+                shots = result.shots.assign(live_key=live_keys[shot_strings])
+                strings_table = result.strings.assign(live_key=live_keys)
+                for relay, n in order.items():
+                    conditions = result.conditions.iloc[0:0]
+                    if isinstance(relay, str):
+                        conditions = result.conditions[result.conditions["relay_key"] == relay]
+                    self._relays[relay] = DriftResult(shots[batch_relays[shot_strings] == n],
+                                                      strings_table[batch_relays == n], conditions)
+            # strings dropped from the store (a source started over) take their relay along
+            for relay in set(self._relays) - set(relays):
+                del self._relays[relay]
+            self.version = version
+            return sorted(touched, key=str)
+
+    def result(self) -> DriftResult:
+        """Drift of every live string so far; 'string' numbers a string within its update batch, 'live_key' names it."""
+        with self._lock:
+            parts = list(self._relays.values())
+        if not parts:
+            return DriftResult(pd.DataFrame(columns=DRIFT_COLUMNS + ["live_key"]),
+                               pd.DataFrame(columns=DRIFT_SUMMARY_COLUMNS + ["live_key"]),
+                               pd.DataFrame(columns=CONDITION_COLUMNS))
+        return DriftResult(*(pd.concat([getattr(p, f) for p in parts], ignore_index=True)
+                             for f in DriftResult._fields))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wind and elevation drift of every string of ShotMarker exports.")
+    parser.add_argument("paths", nargs="+", help="ShotMarker CSV/XLSX exports")
+    parser.add_argument("--sighters", action="store_true", help="include sighter shots")
+    parser.add_argument("--conditions", action="store_true", help="print the relay conditions instead")
+    args = parser.parse_args(argv)
+
+    from ingest import parse_stores
+    from target_registry import get_registry
+
+    get_registry().refresh()
+    contents = []
+    for path in args.paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    stores = parse_stores(contents)
+
+    t0 = time.perf_counter()
+    tables = []
+    for store in stores:
+        result = store_drift(store, include_sighters=args.sighters)
+        if args.conditions:
+            tables.append(result.conditions)
+        else:
+            strings = result.strings
+            strings.insert(1, "shooter", store.strings["shooter"].to_numpy())
+            tables.append(strings)
+    table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    elapsed = time.perf_counter() - t0
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.precision", 2):
+        print(table.drop(columns=["unique_id"], errors="ignore"))
+    print(f"{len(table)} rows in {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# enrichment.py
+"""
+Match-day reconciliation of ShotMarker strings with the scores CSV.
+
+Strings and score rows are matched on the string's unique_id (total score
+plus the shot scores), which parse_scores_csv builds as uniq_id. Both
+directions are done as one hash join on that key instead of per-row lookups:
+
+- enrich_scores fills relay, match_id and target on the scores table from a
+  one-row-per-string index of the uploaded strings.
+- attach_scores renames shooters from the scores' user column and adds the
+  score columns to every shot of the matched strings in one pass over the
+  concatenated shot table, without copying each string's data separately.
+"""
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Column names tried, in order, for the shooter name in the scores CSV
+USER_COLUMNS = ['user', 'User', 'USER']
+# Scores columns filled from the ShotMarker strings
+METADATA_COLUMNS = ['relay', 'match_id', 'target']
+
+
+def find_user_column(df_scores: pd.DataFrame) -> Optional[str]:
+    """Name of the user column in the scores table, or None."""
+    for col_name in USER_COLUMNS:
+        if col_name in df_scores.columns:
+            return col_name
+    return None
+
+
+def _first_value(df: pd.DataFrame, col: str):
+    """First non-null value of a column (all rows of a string share it), or None."""
+    if df is None or col not in df.columns or len(df) == 0:
+        return None
+    values = df[col]
+    # the first row nearly always has it; scanning for it costs several times more
+    first = values.iat[0]
+    if not pd.isna(first):
+        return first
+    first = values.first_valid_index()
+    return None if first is None else values.loc[first]
+
+
+def strings_index(strings: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    One row per string with a unique_id: its position in strings, unique_id,
+    relay and match_id, target (the rifle) and shooter. Relay and match come
+    from the string dict, or from the shot data for strings that carry them
+    per shot.
+    """
+    rows = []
+    for i, string in enumerate(strings):
+        unique_id = string.get('unique_id', '')
+        if not unique_id:
+            continue
+        data = string.get('data')
+        relay = string['relay'] if 'relay' in string else _first_value(data, 'relay')
+        match_id = string['match'] if 'match' in string else _first_value(data, 'match')
+        rows.append((i, unique_id, relay, match_id, string.get('rifle', ''), string.get('shooter', '')))
+    return pd.DataFrame(rows, columns=['string', 'unique_id', 'relay', 'match_id', 'target', 'shooter'])
+
+
+def _fill_gaps(df_scores: pd.DataFrame) -> None:
+    """Forward-fill missing values: match_id by match group, relay/target by user group."""
+    if 'match' in df_scores.columns:
+        df_scores['match_id'] = df_scores['match_id'].replace('', pd.NA)
+        df_scores['match_id'] = df_scores.groupby('match')['match_id'].ffill().bfill()
+        df_scores['match_id'] = df_scores['match_id'].fillna('')
+
+    if 'user' in df_scores.columns:
+        for col in ['relay', 'target']:
+            df_scores[col] = df_scores[col].replace('', pd.NA)
+            df_scores[col] = df_scores.groupby('user')[col].ffill().bfill()
+            df_scores[col] = df_scores[col].fillna('')
+
+
+def enrich_scores(df_scores: pd.DataFrame, index: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fill relay, match_id and target on the scores table from a strings_index.
+    Score rows without a matching string get '' before the gaps are filled.
+    When several strings share a unique_id the last one wins.
+    """
+    df_scores = df_scores.copy()
+    meta = index.drop_duplicates('unique_id', keep='last').set_index('unique_id')
+    # one hash lookup of every uniq_id against the strings index
+    pos = meta.index.get_indexer(df_scores['uniq_id'])
+    found = pos >= 0
+    for col in METADATA_COLUMNS:
+        values = np.full(len(df_scores), '', dtype=object)
+        values[found] = meta[col].to_numpy(dtype=object)[pos[found]]
+        values[pd.isna(values)] = ''
+        df_scores[col] = values
+    _fill_gaps(df_scores)
+    return df_scores
+
+
+def scores_table(df_scores: pd.DataFrame) -> pd.DataFrame:
+    """Score rows with a uniq_id, indexed by it; the last row wins on duplicates."""
+    keyed = df_scores[df_scores['uniq_id'].fillna('').astype(bool)]
+    return keyed.drop_duplicates('uniq_id', keep='last').set_index('uniq_id')
+
+
+def scores_by_id(df_scores: Optional[pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+    """uniq_id -> score row as a dict (empty without a scores table)."""
+    if df_scores is None or 'uniq_id' not in df_scores.columns:
+        return {}
+    table = scores_table(df_scores)
+    return dict(zip(table.index, table.reset_index().to_dict('records')))
+
+
+def _repeat_column(values: np.ndarray, owner: np.ndarray):
+    """
+    One value per string repeated for each of its shots. Text becomes a
+    categorical over the per-string values, like the shot store's own columns.
+    """
+    if values.dtype != object:
+        return values[owner]
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes[owner], categories=uniques)
+
+
+def attach_scores(strings: List[Dict[str, Any]], df_scores: Optional[pd.DataFrame]) -> int:
+    """
+    Update matched strings in place and return how many matched.
+
+    Matched strings take their shooter from the scores' user column (and
+    shooter_name becomes "<user> <rifle>"). Their shot data gains a unique_id
+    column plus every score column, suffixed '_scores' where the shot data
+    already has a column of that name, as a left merge per string would.
+    """
+    if df_scores is None or 'uniq_id' not in df_scores.columns or not strings:
+        return 0
+    table = scores_table(df_scores)
+    ids = [string.get('unique_id', '') for string in strings]
+    pos = table.index.get_indexer(ids)
+    matched = np.flatnonzero(pos >= 0)
+    if len(matched) == 0:
+        return 0
+    rows = table.iloc[pos[matched]]
+
+    user_col = find_user_column(df_scores)
+    new_names = np.full(len(matched), None, dtype=object)
+    if user_col:
+        for k, (i, user) in enumerate(zip(matched, rows[user_col].tolist())):
+            if user and not pd.isna(user):
+                strings[i]['shooter'] = user
+                new_names[k] = f"{user} {strings[i].get('rifle', '')}".strip()
+                strings[i]['shooter_name'] = new_names[k]
+
+    with_data = [k for k, i in enumerate(matched) if strings[i].get('data') is not None]
+    if not with_data:
+        return len(matched)
+    frames = [strings[matched[k]]['data'] for k in with_data]
+    counts = np.array([len(frame) for frame in frames])
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    # string (among with_data) that each shot belongs to
+    owner = np.repeat(np.asarray(with_data), counts)
+
+    shots = pd.concat(frames, ignore_index=True)
+    columns = {col: shots[col] for col in shots.columns}
+    for col, dtype in frames[0].dtypes.items():
+        # strings from different exports have different categories, which concat
+        # turns into object columns; re-encode them over the combined values
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(shots[col].dtype, pd.CategoricalDtype):
+            columns[col] = shots[col].astype('category')
+    if 'shooter_name' in columns:
+        # only strings that still carry shooter_name per shot
+        renamed = pd.notna(new_names)[owner]
+        names = shots['shooter_name'].to_numpy(dtype=object).copy()
+        names[renamed] = new_names[owner][renamed]
+        columns['shooter_name'] = pd.Series(names, dtype=object)
+    columns['unique_id'] = _repeat_column(np.asarray(ids, dtype=object)[matched], owner)
+    for col in rows.columns:
+        name = f"{col}_scores" if col in columns else col
+        columns[name] = _repeat_column(rows[col].to_numpy(), owner)
+
+    combined = pd.DataFrame(columns)
+    for k, start, stop in zip(with_data, starts, stops):
+        strings[matched[k]]['data'] = combined.iloc[start:stop].reset_index(drop=True)
+    return len(matched)
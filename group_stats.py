@@ -0,0 +1,405 @@
+# group_stats.py
+"""
+Group statistics for every string at once.
+
+Per string: shot count, centroid (and its offset from the aim point), mean
+radius and radial SD about the centroid, extreme spread (ES), and velocity
+mean / ES / SD from v_fps. Sizes are in mm and, where the target spec gives
+a distance, in MOA.
+
+Everything works on flat shot arrays plus a group id per shot (the string's
+position), so all strings are computed with a few grouped NumPy operations:
+bincount sums for the moments and reduceat min/max for velocities. Extreme
+spread first drops shots inside each string's octagon of extreme points,
+sorts the rest of all strings together (O(n log n)), builds every string's
+convex hull with a monotone chain run in lockstep across strings, and takes
+the largest distance between hull vertices only.
+
+Command line:
+    python group_stats.py EXPORT... [--sighters] [--csv stats.csv]
+prints one row per string.
+"""
+import argparse
+import math
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from shot_store import shot_scores
+from target_registry import get_registry
+
+# Columns of the statistics table, in display order
+STAT_COLUMNS = [
+    "shots", "centroid_x_mm", "centroid_y_mm", "centroid_offset_mm",
+    "mean_radius_mm", "radial_sd_mm", "extreme_spread_mm",
+    "es_moa", "mean_radius_moa", "mm_per_moa",
+    "velocity_shots", "velocity_mean_fps", "velocity_es_fps", "velocity_sd_fps",
+]
+
+# Columns of the groups_summary table
+SUMMARY_COLUMNS = [
+    "strings", "shots", "points", "xs",
+    "mean_es_moa", "best_es_moa", "mean_radius_moa", "velocity_mean_fps",
+]
+
+# pairwise hull distances are computed for this many (string, vertex, vertex) cells at a time
+_PAIRWISE_CELLS = 1 << 22
+
+
+def _monotone_chain(px: np.ndarray, py: np.ndarray):
+    """
+    One half hull (Andrew's monotone chain) for each row of (G, K) point arrays
+    already in sweep order, all rows advanced together. Rows shorter than K
+    are padded by repeating their last point, which never changes the hull.
+    Returns (hx, hy, top) as flat (G * K) arrays: row g's hull vertices are
+    hx[g * K:g * K + top[g]]; every entry of a row is one of that row's points.
+    """
+    n_rows, width = px.shape
+    base = np.arange(n_rows) * width
+    hx = np.repeat(px[:, :1], width, axis=1).ravel()
+    hy = np.repeat(py[:, :1], width, axis=1).ravel()
+    top = np.zeros(n_rows, dtype=np.intp)
+    for k in range(width):
+        x, y = px[:, k], py[:, k]
+        while True:
+            i0 = base + np.maximum(top - 2, 0)
+            i1 = base + np.maximum(top - 1, 0)
+            ax, ay = hx[i0], hy[i0]
+            # pop the last vertex while it does not make a left turn
+            pop = (top >= 2) & ((hx[i1] - ax) * (y - ay) - (hy[i1] - ay) * (x - ax) <= 0)
+            if not pop.any():
+                break
+            top -= pop
+        hx[base + top] = x
+        hy[base + top] = y
+        top += 1
+    return hx, hy, top
+
+
+def _bucket_spread(xs: np.ndarray, ys: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Extreme spread of strings of similar size whose points are xs[start:start+size], sorted by (x, y)."""
+    width = int(sizes.max())
+    steps = np.arange(width)
+    forward = starts[:, None] + np.minimum(steps, sizes[:, None] - 1)
+    backward = starts[:, None] + np.maximum(sizes[:, None] - 1 - steps, 0)
+    halves = [_monotone_chain(xs[forward], ys[forward]), _monotone_chain(xs[backward], ys[backward])]
+    hx = np.concatenate([h[0].reshape(-1, width)[:, :h[2].max()] for h in halves], axis=1)
+    hy = np.concatenate([h[1].reshape(-1, width)[:, :h[2].max()] for h in halves], axis=1)
+
+    n_vertices = hx.shape[1]
+    spread = np.empty(len(starts))
+    chunk = max(1, _PAIRWISE_CELLS // (n_vertices * n_vertices))
+    for a in range(0, len(starts), chunk):
+        cx, cy = hx[a:a + chunk], hy[a:a + chunk]
+        d2 = (cx[:, :, None] - cx[:, None, :]) ** 2 + (cy[:, :, None] - cy[:, None, :]) ** 2
+        spread[a:a + chunk] = np.sqrt(d2.max(axis=(1, 2)))
+    return spread
+
+
+def _hull_candidates(x: np.ndarray, y: np.ndarray, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Mask of the shots that can be convex hull vertices of their group
+    (Akl-Toussaint): each group's extreme points in eight directions span an
+    octagon, and shots strictly inside it are dropped. group must be sorted.
+    """
+    n = len(x)
+    sizes = np.bincount(group, minlength=n_groups)
+    present = np.flatnonzero(sizes)
+    starts = (np.cumsum(sizes) - sizes)[present]
+    sizes = sizes[present]
+    positions = np.arange(n)
+    # support directions in counter-clockwise order, so their extreme points are too
+    directions = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+    vx, vy = [], []
+    vertex = np.zeros(n, dtype=bool)
+    for dx, dy in directions:
+        score = dx * x + dy * y
+        # groups are contiguous, so repeating per-group values is a cheap broadcast
+        best = np.repeat(np.maximum.reduceat(score, starts), sizes)
+        first = np.minimum.reduceat(np.where(score == best, positions, n), starts)
+        vertex[first] = True
+        vx.append(x[first])
+        vy.append(y[first])
+
+    inside = np.ones(n, dtype=bool)
+    for i in range(len(directions)):
+        ax, ay, bx, by = vx[i], vy[i], vx[(i + 1) % 8], vy[(i + 1) % 8]
+        # the edge as a*x + b*y > c per group; repeated extreme points give
+        # empty edges, which constrain nothing
+        a, b = ay - by, bx - ax
+        c = np.where((a == 0) & (b == 0), -np.inf, a * ax + b * ay)
+        inside &= np.repeat(a, sizes) * x + np.repeat(b, sizes) * y > np.repeat(c, sizes)
+    return vertex | ~inside
+
+
+def extreme_spread(x: np.ndarray, y: np.ndarray, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Largest centre-to-centre distance between two shots of each group.
+    x, y are coordinates per shot and group the group id (0..n_groups-1) of
+    each shot, sorted. NaN for groups without shots, 0 for single shots.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    spread = np.full(n_groups, np.nan)
+    if len(x) == 0:
+        return spread
+    keep = _hull_candidates(x, y, group, n_groups)
+    x, y, group = x[keep], y[keep], group[keep]
+    order = np.lexsort((y, x, group))
+    xs, ys, gs = x[order], y[order], group[order]
+    sizes = np.bincount(gs, minlength=n_groups)
+    starts = np.cumsum(sizes) - sizes
+
+    # strings are padded to the largest in their bucket, so bucket by size class
+    present = np.flatnonzero(sizes)
+    size_class = np.ceil(np.log2(sizes[present])).astype(int)
+    for cls in np.unique(size_class):
+        members = present[size_class == cls]
+        spread[members] = _bucket_spread(xs, ys, starts[members], sizes[members])
+    return spread
+
+
+def _grouped_sorted(values: np.ndarray, group: np.ndarray, n_groups: int, ufunc) -> np.ndarray:
+    """ufunc.reduceat of values over each group; group must be sorted. NaN for empty groups."""
+    out = np.full(n_groups, np.nan)
+    if len(values) == 0:
+        return out
+    sizes = np.bincount(group, minlength=n_groups)
+    present = np.flatnonzero(sizes)
+    starts = (np.cumsum(sizes) - sizes)[present]
+    out[present] = ufunc.reduceat(values, starts)
+    return out
+
+
+def group_stats(x: np.ndarray, y: np.ndarray, group: np.ndarray, n_groups: int,
+                v: Optional[np.ndarray] = None, mm_per_moa: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Statistics of every group in one pass. x, y (mm) and v (fps) are per shot,
+    group the group id of each shot, mm_per_moa one value per group.
+    NaN x/y shots are ignored; velocities count when finite and positive.
+    Returns one row per group id with STAT_COLUMNS.
+    """
+    group = np.asarray(group, dtype=np.intp)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(group) and np.any(group[1:] < group[:-1]):
+        order = np.argsort(group, kind="stable")
+        group, x, y = group[order], x[order], y[order]
+        v = None if v is None else np.asarray(v)[order]
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    gx, gy, gg = x[valid], y[valid], group[valid]
+    n = np.bincount(gg, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cx = np.bincount(gg, gx, n_groups) / n
+        cy = np.bincount(gg, gy, n_groups) / n
+        dx, dy = gx - cx[gg], gy - cy[gg]
+        mean_radius = np.bincount(gg, np.hypot(dx, dy), n_groups) / n
+        radial_sd = np.sqrt(np.bincount(gg, dx * dx + dy * dy, n_groups) / np.where(n > 1, n - 1, np.nan))
+    spread = extreme_spread(gx, gy, gg, n_groups)
+
+    stats = {
+        "shots": n.astype(np.int64),
+        "centroid_x_mm": cx,
+        "centroid_y_mm": cy,
+        "centroid_offset_mm": np.hypot(cx, cy),
+        "mean_radius_mm": mean_radius,
+        "radial_sd_mm": radial_sd,
+        "extreme_spread_mm": spread,
+    }
+    moa = np.full(n_groups, np.nan) if mm_per_moa is None else np.asarray(mm_per_moa, dtype=np.float64)
+    stats["es_moa"] = spread / moa
+    stats["mean_radius_moa"] = mean_radius / moa
+    stats["mm_per_moa"] = moa
+
+    if v is None:
+        v = np.full(len(group), np.nan)
+    v = np.asarray(v, dtype=np.float64)
+    fired = np.isfinite(v) & (v > 0)
+    vv, vg = v[fired], group[fired]
+    nv = np.bincount(vg, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        v_mean = np.bincount(vg, vv, n_groups) / nv
+        v_sd = np.sqrt(np.bincount(vg, (vv - v_mean[vg]) ** 2, n_groups) / np.where(nv > 1, nv - 1, np.nan))
+    stats["velocity_shots"] = nv.astype(np.int64)
+    stats["velocity_mean_fps"] = v_mean
+    stats["velocity_es_fps"] = (_grouped_sorted(vv, vg, n_groups, np.maximum)
+                                - _grouped_sorted(vv, vg, n_groups, np.minimum))
+    stats["velocity_sd_fps"] = v_sd
+    return pd.DataFrame(stats, columns=STAT_COLUMNS)
+
+
+def moa_by_target(target_types: pd.Series) -> np.ndarray:
+    """mm per MOA for each string's target type, looked up once per distinct type."""
+    registry = get_registry()
+    codes, uniques = pd.factorize(target_types)
+    targets = [registry.get(t) for t in uniques]
+    per_type = np.array([t.mm_per_moa if t else math.nan for t in targets] + [math.nan])
+    return per_type[codes]
+
+
+def strings_stats(strings: List[Dict[str, Any]], include_sighters: bool = False) -> pd.DataFrame:
+    """
+    Statistics for a list of parsed string dicts, one row per string in the
+    same order, with its unique_id. Sighters are left out unless include_sighters.
+    """
+    frames = [string["data"] for string in strings]
+    counts = np.array([len(df) for df in frames], dtype=np.intp)
+
+    def column(name, fill=np.nan):
+        parts = [df[name].to_numpy() if name in df.columns else np.full(len(df), fill, dtype=object)
+                 for df in frames]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    group = np.repeat(np.arange(len(frames)), counts)
+    x = column("x_mm").astype(np.float64)
+    y = column("y_mm").astype(np.float64)
+    v = column("v_fps").astype(np.float64)
+    if not include_sighters:
+        keep = column("tags", "") != "sighter"
+        group, x, y, v = group[keep], x[keep], y[keep], v[keep]
+
+    target_types = pd.Series([df["target_info"].iat[0] if "target_info" in df.columns and len(df) else None
+                              for df in frames], dtype=object)
+    stats = group_stats(x, y, group, len(frames), v=v, mm_per_moa=moa_by_target(target_types))
+    stats.insert(0, "unique_id", [string.get("unique_id", "") for string in strings])
+    return stats
+
+
+def store_stats(store, include_sighters: bool = False) -> pd.DataFrame:
+    """
+    Statistics for every string of a ShotStore straight from its shared shot
+    table (no per-string views), one row per string with its unique_id.
+    """
+    shots = store.shots
+    starts = store.strings["start"].to_numpy()
+    stops = store.strings["stop"].to_numpy()
+    group = np.repeat(np.arange(len(store)), stops - starts)
+    keep = np.ones(len(shots), dtype=bool)
+    if not include_sighters and "tags" in shots.columns:
+        keep = (shots["tags"] != "sighter").to_numpy()
+
+    def column(name):
+        return shots[name].to_numpy(dtype=np.float64)[keep] if name in shots.columns else None
+
+    if "target_info" in shots.columns and len(shots):
+        target_types = shots["target_info"].take(starts).astype(object).reset_index(drop=True)
+    else:
+        target_types = pd.Series([None] * len(store), dtype=object)
+    stats = group_stats(column("x_mm"), column("y_mm"), group[keep], len(store),
+                        v=column("v_fps"), mm_per_moa=moa_by_target(target_types))
+    stats.insert(0, "unique_id", store.strings["unique_id"].to_numpy())
+    return stats
+
+
+def _grouped_mean(values: np.ndarray, group: np.ndarray, n_groups: int, weights=None) -> np.ndarray:
+    """Mean of the finite values of each group (weighted if weights are given), NaN if none."""
+    finite = np.isfinite(values)
+    w = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+    w = np.where(finite, w, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.bincount(group, np.where(finite, values, 0.0) * w, n_groups) / np.bincount(group, w, n_groups)
+
+
+def groups_summary(strings: List[Dict[str, Any]], group: np.ndarray, n_groups: int,
+                   stats: Optional[pd.DataFrame] = None, include_sighters: bool = False) -> pd.DataFrame:
+    """
+    Compact summary of groups of strings (e.g. one shooter, relay and target),
+    all groups in one pass: strings, record shots, total points and Xs from the
+    device scores, mean and best ES and mean radius in MOA, and mean velocity.
+    group gives each string's group id (0..n_groups-1); stats is
+    strings_stats(strings) when it has been computed already.
+    """
+    group = np.asarray(group, dtype=np.intp)
+    if stats is None:
+        stats = strings_stats(strings, include_sighters)
+    frames = [string["data"] for string in strings]
+    counts = np.array([len(df) for df in frames], dtype=np.intp)
+
+    pairs = [shot_scores(df) for df in frames]
+    points = np.concatenate([p for p, _ in pairs]) if pairs else np.empty(0, dtype=np.int8)
+    xs = np.concatenate([x for _, x in pairs]) if pairs else np.empty(0, dtype=bool)
+    # each shot's group, straight from its string's
+    shot_group = np.repeat(group, counts)
+    if not include_sighters:
+        tags = [df["tags"].to_numpy() if "tags" in df.columns else np.full(len(df), "", dtype=object)
+                for df in frames]
+        keep = (np.concatenate(tags) != "sighter") if tags else np.empty(0, dtype=bool)
+        points, xs, shot_group = points[keep], xs[keep], shot_group[keep]
+
+    es = stats["es_moa"].to_numpy(dtype=np.float64)
+    order = np.argsort(group, kind="stable")
+    best = _grouped_sorted(np.where(np.isfinite(es), es, np.inf)[order], group[order], n_groups, np.minimum)
+    summary = {
+        "strings": np.bincount(group, minlength=n_groups),
+        "shots": np.bincount(group, stats["shots"].to_numpy(dtype=np.float64), n_groups).astype(np.int64),
+        "points": np.bincount(shot_group, np.maximum(points, 0), n_groups).astype(np.int64),
+        "xs": np.bincount(shot_group, xs, n_groups).astype(np.int64),
+        "mean_es_moa": _grouped_mean(es, group, n_groups),
+        "best_es_moa": np.where(np.isinf(best), np.nan, best),
+        "mean_radius_moa": _grouped_mean(stats["mean_radius_moa"].to_numpy(dtype=np.float64), group, n_groups),
+        "velocity_mean_fps": _grouped_mean(stats["velocity_mean_fps"].to_numpy(dtype=np.float64), group, n_groups,
+                                           weights=stats["velocity_shots"].to_numpy()),
+    }
+    return pd.DataFrame(summary, columns=SUMMARY_COLUMNS)
+
+
+def format_stats(row) -> str:
+    """One-line summary of a stats row for display."""
+    if not row["shots"]:
+        return "No shots"
+    parts = []
+    if not np.isnan(row["es_moa"]):
+        parts.append(f"ES {row['es_moa']:.2f} MOA ({row['extreme_spread_mm']:.0f} mm)")
+        parts.append(f"MR {row['mean_radius_moa']:.2f} MOA")
+    else:
+        parts.append(f"ES {row['extreme_spread_mm']:.0f} mm")
+        parts.append(f"MR {row['mean_radius_mm']:.0f} mm")
+    parts.append(f"Radial SD {row['radial_sd_mm']:.0f} mm")
+    parts.append(f"Centroid ({row['centroid_x_mm']:+.0f}, {row['centroid_y_mm']:+.0f}) mm")
+    if row["velocity_shots"] > 1:
+        parts.append(f"Velocity {row['velocity_mean_fps']:.0f} fps, ES {row['velocity_es_fps']:.0f}, "
+                     f"SD {row['velocity_sd_fps']:.1f}")
+    return " · ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group statistics for every string of ShotMarker exports.")
+    parser.add_argument("paths", nargs="+", help="ShotMarker CSV/XLSX exports")
+    parser.add_argument("--sighters", action="store_true", help="include sighter shots")
+    parser.add_argument("--csv", help="write the table to this CSV file instead of printing it")
+    args = parser.parse_args(argv)
+
+    from ingest import parse_stores
+
+    # load the specs before timing
+    get_registry().refresh()
+
+    contents = []
+    for path in args.paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    stores = parse_stores(contents)
+
+    t0 = time.perf_counter()
+    tables = []
+    for store in stores:
+        stats = store_stats(store, include_sighters=args.sighters)
+        stats.insert(1, "shooter", store.strings["shooter"].to_numpy())
+        stats.insert(2, "course", store.strings["course"].to_numpy())
+        tables.append(stats)
+    table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=STAT_COLUMNS)
+    elapsed = time.perf_counter() - t0
+
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", 200, "display.precision", 2):
+            print(table.drop(columns=["unique_id"]))
+    print(f"{len(table)} strings in {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# ingest.py
+"""
+Parallel ingestion of many ShotMarker exports.
+
+Files are parsed in a process pool. Workers send back the compact columnar
+form from build_shot_columns (header dicts plus one narrow array or
+categorical per column) instead of pickled DataFrame-heavy string dicts; the
+shot stores are built in the parent process. Results keep the input order, so the output matches
+parsing the files one after another.
+
+The pool is created once per process with default_workers() workers and
+shared by every caller (Streamlit sessions run in their own threads); a
+smaller max_workers limits how many files a call has in the pool at once.
+Workers are started with forkserver (spawn where there is none), never
+forked from the multi-threaded server, and a pool broken by a worker crash
+is replaced so later calls still work.
+
+Command line:
+    python ingest.py EXPORT [EXPORT ...] [--workers 1,2,4]
+reports files per second for each worker count.
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shot_store import ShotStore
+from shotmarker_parser import _read_content, scan_content, build_shot_columns, store_from_columns, strings_from_columns
+
+# below this many files the pool start-up costs more than it saves
+MIN_FILES_FOR_POOL = 2
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    """Worker count used when none is given: one per CPU."""
+    return os.cpu_count() or 1
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """The process's one pool, so repeated calls (e.g. Streamlit reruns) skip start-up."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _executor = ProcessPoolExecutor(max_workers=default_workers(),
+                                            mp_context=multiprocessing.get_context(method))
+        return _executor
+
+
+def _drop_executor(broken: ProcessPoolExecutor) -> None:
+    """Forget a broken pool, unless another caller has already replaced it."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _map_limited(executor: ProcessPoolExecutor, fn, items: Sequence[Any], limit: int) -> List[Any]:
+    """fn over items in the pool with at most limit of them submitted at a time, results in input order."""
+    results: List[Any] = []
+    pending: deque = deque()
+    for item in items:
+        if len(pending) >= limit:
+            results.append(pending.popleft().result())
+        pending.append(executor.submit(fn, item))
+    results.extend(future.result() for future in pending)
+    return results
+
+
+def parse_columnar(content: bytes) -> Tuple[List[Dict[str, Any]], Dict[str, np.ndarray], np.ndarray]:
+    """Worker entry point: parse one file's content into (headers, columns, counts)."""
+    scanner = scan_content(content)
+    columns, counts = build_shot_columns(scanner.headers, scanner.shot_lines,
+                                         scanner.shot_blocks, scanner.max_fields)
+    return scanner.headers, columns, counts
+
+
+def parse_files_columnar(files: Sequence[Any], max_workers: Optional[int] = None) -> List[Tuple]:
+    """
+    Parse files into their columnar form, in input order.
+    Accepts bytes, str, or file-like objects with .getvalue() (Streamlit uploads).
+    """
+    contents = [_read_content(f) for f in files]
+    contents = [c.encode("utf-8") if isinstance(c, str) else c for c in contents]
+    workers = min(max_workers or default_workers(), default_workers(), len(contents))
+    if workers <= 1 or len(contents) < MIN_FILES_FOR_POOL:
+        return [parse_columnar(c) for c in contents]
+    executor = _get_executor()
+    try:
+        return _map_limited(executor, parse_columnar, contents, workers)
+    except BrokenProcessPool:
+        # a worker died (e.g. killed for memory); start a new pool and try once more
+        _drop_executor(executor)
+        return _map_limited(_get_executor(), parse_columnar, contents, workers)
+
+
+def parse_stores(files: Sequence[Any], max_workers: Optional[int] = None) -> List[ShotStore]:
+    """Parse ShotMarker exports across a process pool into one ShotStore per file, in input order."""
+    return [store_from_columns(headers, columns, counts)
+            for headers, columns, counts in parse_files_columnar(files, max_workers)]
+
+
+def parse_files(files: Sequence[Any], max_workers: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Parse ShotMarker exports across a process pool.
+    Returns one list of string dicts per input file, in input order, exactly as
+    parse_shotmarker_csv would return them for each file.
+    """
+    return [strings_from_columns(headers, columns, counts)
+            for headers, columns, counts in parse_files_columnar(files, max_workers)]
+
+
+def _throughput(contents: List[bytes], worker_counts: Sequence[int]) -> None:
+    """Print files per second for each worker count."""
+    n_shots = None
+    for workers in worker_counts:
+        # warm the pool so start-up is not counted
+        parse_files_columnar(contents[:workers], max_workers=workers)
+        t0 = time.perf_counter()
+        results = parse_files(contents, max_workers=workers)
+        elapsed = time.perf_counter() - t0
+        if n_shots is None:
+            n_shots = sum(len(s["data"]) for strings in results for s in strings)
+            print(f"{len(contents)} files, {n_shots} shots")
+        print(f"workers={workers:2d}  {elapsed:7.2f} s  {len(contents) / elapsed:8.1f} files/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse ShotMarker exports in parallel and report throughput.")
+    parser.add_argument("paths", nargs="+", help="ShotMarker CSV/XLSX exports")
+    parser.add_argument("--workers", default=str(default_workers()),
+                        help="comma-separated worker counts to time, e.g. 1,2,4")
+    args = parser.parse_args(argv)
+
+    contents = []
+    for path in args.paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    _throughput(contents, [int(w) for w in args.workers.split(",")])
+
+
+if __name__ == "__main__":
+    main()
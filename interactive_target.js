@@ -0,0 +1,509 @@
+// interactive_target.js
+// Interactive target plot, the browser half of interactive_target.py (a
+// Streamlit custom component). Rings, grid and shots are drawn with WebGL from
+// the ring radii and the base64 float32 shot arrays sent by Python; shot ids
+// and the tooltip are drawn on top. Zoom, pan, the tooltip and the series
+// toggles only redraw here, they never send anything back to the server.
+//
+// Browsers keep only about 16 live WebGL contexts and drop the oldest past
+// that, and a page can hold many more charts, so every chart on the page
+// draws with one shared context (sharedRenderer) into an off-screen canvas
+// and copies the frame to its own 2D canvas. When the context is lost, the
+// charts wait; once it is restored each chart uploads its buffers again and
+// redraws.
+
+const RING_SEGMENTS = 128;
+// Marker diameters as a fraction of the plot width, about what
+// plot_target.draw_shot_layer draws (s=500 and s=150 on an 8 inch figure)
+const SHOT_SIZE = 0.05;
+const SIGHTER_SIZE = 0.028;
+const MAX_ZOOM = 40;
+
+const SERIES = {
+  shots: { fill: [0, 0, 1, 0.6], edge: [0, 0, 0.545, 0.85], marker: 1, size: SHOT_SIZE, label: "Shots" },
+  sighters: { fill: [1, 0.647, 0, 0.6], edge: [1, 0.549, 0, 0.85], marker: 2, size: SIGHTER_SIZE, label: "Sighters" },
+};
+const RING_EDGE = [0, 0, 0, 0.6];
+const GRID_COLOR = [0.69, 0.69, 0.69, 0.3];
+const AXIS_COLOR = [0, 0, 0, 0.3];
+
+const VERTEX_SHADER = `
+attribute vec2 a_position;
+uniform vec2 u_center;
+uniform float u_scale;
+uniform float u_point_size;
+void main() {
+  gl_Position = vec4((a_position - u_center) * u_scale, 0.0, 1.0);
+  gl_PointSize = u_point_size;
+}`;
+
+// u_marker: 0 solid geometry, 1 round marker, 2 square marker
+const FRAGMENT_SHADER = `
+precision mediump float;
+uniform vec4 u_color;
+uniform vec4 u_edge;
+uniform int u_marker;
+uniform float u_edge_from;
+void main() {
+  if (u_marker == 0) {
+    gl_FragColor = u_color;
+    return;
+  }
+  vec2 p = gl_PointCoord * 2.0 - 1.0;
+  float d = u_marker == 1 ? length(p) : max(abs(p.x), abs(p.y));
+  if (d > 1.0) discard;
+  gl_FragColor = d > u_edge_from ? u_edge : u_color;
+}`;
+
+function decodeBytes(b64) {
+  const text = atob(b64 || "");
+  const bytes = new Uint8Array(text.length);
+  for (let i = 0; i < text.length; i++) bytes[i] = text.charCodeAt(i);
+  return bytes;
+}
+
+function decodeFloats(b64) {
+  return new Float32Array(decodeBytes(b64).buffer);
+}
+
+function hexColor(hex) {
+  const m = /^#?([0-9a-f]{6})$/i.exec(String(hex).trim());
+  const v = m ? parseInt(m[1], 16) : 0;
+  return [((v >> 16) & 255) / 255, ((v >> 8) & 255) / 255, (v & 255) / 255, 1];
+}
+
+function compile(gl, type, source) {
+  const shader = gl.createShader(type);
+  gl.shaderSource(shader, source);
+  gl.compileShader(shader);
+  if (!gl.getShaderParameter(shader, gl.COMPILE_STATUS)) {
+    throw new Error(gl.getShaderInfoLog(shader));
+  }
+  return shader;
+}
+
+function program(gl) {
+  const prog = gl.createProgram();
+  gl.attachShader(prog, compile(gl, gl.VERTEX_SHADER, VERTEX_SHADER));
+  gl.attachShader(prog, compile(gl, gl.FRAGMENT_SHADER, FRAGMENT_SHADER));
+  gl.linkProgram(prog);
+  if (!gl.getProgramParameter(prog, gl.LINK_STATUS)) {
+    throw new Error(gl.getProgramInfoLog(prog));
+  }
+  return prog;
+}
+
+// One buffer of ring fans (centre, then RING_SEGMENTS + 1 rim points each,
+// largest ring first), grid lines and the two centre lines
+// The page's one WebGL context, its program and the charts drawing with it.
+// The module is loaded once per page, so all charts share it; it is released
+// when the last chart unmounts.
+let shared = null;
+
+function sharedRenderer() {
+  if (shared) return shared;
+  const canvas = document.createElement("canvas");
+  const gl = canvas.getContext("webgl", { antialias: true, alpha: false });
+  if (!gl) return null;
+  const renderer = { canvas, gl, loc: null, charts: new Set(), generation: 0, lost: false };
+  // program and state; run again after a restore, which also tells every
+  // chart (by the new generation) that its buffers are gone
+  const setup = () => {
+    const prog = program(gl);
+    gl.useProgram(prog);
+    renderer.loc = {
+      position: gl.getAttribLocation(prog, "a_position"),
+      center: gl.getUniformLocation(prog, "u_center"),
+      scale: gl.getUniformLocation(prog, "u_scale"),
+      pointSize: gl.getUniformLocation(prog, "u_point_size"),
+      color: gl.getUniformLocation(prog, "u_color"),
+      edge: gl.getUniformLocation(prog, "u_edge"),
+      marker: gl.getUniformLocation(prog, "u_marker"),
+      edgeFrom: gl.getUniformLocation(prog, "u_edge_from"),
+    };
+    gl.enable(gl.BLEND);
+    gl.blendFunc(gl.SRC_ALPHA, gl.ONE_MINUS_SRC_ALPHA);
+    renderer.generation += 1;
+  };
+  canvas.addEventListener("webglcontextlost", (event) => {
+    // without preventDefault the context is never restored
+    event.preventDefault();
+    renderer.lost = true;
+  });
+  canvas.addEventListener("webglcontextrestored", () => {
+    renderer.lost = false;
+    setup();
+    for (const chart of renderer.charts) chart.redraw();
+  });
+  setup();
+  shared = renderer;
+  return renderer;
+}
+
+function releaseRenderer(renderer) {
+  if (renderer.charts.size > 0 || shared !== renderer) return;
+  shared = null;
+  const lose = renderer.gl.getExtension("WEBGL_lose_context");
+  if (lose) lose.loseContext();
+}
+
+function backgroundGeometry(rings, limit) {
+  const radii = rings ? rings.radii : [];
+  const fan = RING_SEGMENTS + 2;
+  const lines = [];
+  const grid = rings && rings.grid_mm > 0 ? rings.grid_mm : 0;
+  if (grid) {
+    for (let v = Math.ceil(-limit / grid) * grid; v <= limit; v += grid) {
+      lines.push(v, -limit, v, limit, -limit, v, limit, v);
+    }
+  }
+  const gridVertices = lines.length / 2;
+  lines.push(0, -limit, 0, limit, -limit, 0, limit, 0);
+  const data = new Float32Array(radii.length * fan * 2 + lines.length);
+  radii.forEach((r, k) => {
+    let o = k * fan * 2 + 2;
+    for (let i = 0; i <= RING_SEGMENTS; i++) {
+      const a = (2 * Math.PI * i) / RING_SEGMENTS;
+      data[o++] = r * Math.cos(a);
+      data[o++] = r * Math.sin(a);
+    }
+  });
+  data.set(lines, radii.length * fan * 2);
+  return { data, fan, rings: radii.length, lineStart: radii.length * fan, gridVertices };
+}
+
+function formatNumber(value, digits, unit) {
+  return Number.isFinite(value) ? value.toFixed(digits) + unit : "–";
+}
+
+export default function (component) {
+  const { data, parentElement } = component;
+  if (!data || !data.limit_mm) return;
+
+  const n = data.n || 0;
+  const x = decodeFloats(data.x);
+  const y = decodeFloats(data.y);
+  const sighter = decodeBytes(data.sighter);
+  const columns = {
+    v_fps: decodeFloats(data.v_fps),
+    yaw_deg: decodeFloats(data.yaw_deg),
+    pitch_deg: decodeFloats(data.pitch_deg),
+    quality: decodeFloats(data.quality),
+  };
+  const ids = (data.id || "").split("\n");
+  const times = (data.time || "").split("\n");
+  const scores = (data.score || "").split("\n");
+  const limit = data.limit_mm;
+
+  // shot indices of each series, leaving out shots without a position
+  const members = { shots: [], sighters: [] };
+  for (let i = 0; i < n; i++) {
+    if (Number.isFinite(x[i]) && Number.isFinite(y[i])) members[sighter[i] ? "sighters" : "shots"].push(i);
+  }
+
+  const root = document.createElement("div");
+  root.className = "target-plot";
+  const title = document.createElement("div");
+  title.className = "target-plot-title";
+  title.textContent = (data.title || []).join("\n");
+  const stage = document.createElement("div");
+  stage.className = "target-plot-stage";
+  const canvas = document.createElement("canvas");
+  const plot = canvas.getContext("2d");
+  const overlay = document.createElement("canvas");
+  overlay.className = "target-plot-overlay";
+  const tooltip = document.createElement("div");
+  tooltip.className = "target-plot-tooltip";
+  const controls = document.createElement("div");
+  controls.className = "target-plot-controls";
+  stage.append(canvas, overlay, tooltip);
+  root.append(title, stage, controls);
+  parentElement.appendChild(root);
+
+  const visible = { shots: true, sighters: true, labels: true };
+  const toggle = (key, text, color) => {
+    if (key !== "labels" && members[key].length === 0) return;
+    const label = document.createElement("label");
+    const box = document.createElement("input");
+    box.type = "checkbox";
+    box.checked = true;
+    box.addEventListener("change", () => {
+      visible[key] = box.checked;
+      schedule();
+    });
+    label.appendChild(box);
+    if (color) {
+      const swatch = document.createElement("span");
+      swatch.className = "target-plot-swatch";
+      swatch.style.background = `rgba(${color.slice(0, 3).map((c) => Math.round(c * 255)).join(",")},${color[3]})`;
+      label.appendChild(swatch);
+    }
+    label.append(text);
+    controls.appendChild(label);
+  };
+  toggle("shots", `Shots (${members.shots.length})`, SERIES.shots.fill);
+  toggle("sighters", `Sighters (${members.sighters.length})`, SERIES.sighters.fill);
+  toggle("labels", "Labels");
+  const reset = document.createElement("button");
+  reset.type = "button";
+  reset.textContent = "Reset view";
+  controls.appendChild(reset);
+
+  const renderer = sharedRenderer();
+  if (!renderer) {
+    title.textContent += "\n(WebGL is not available in this browser)";
+    return () => root.remove();
+  }
+  const gl = renderer.gl;
+
+  const background = backgroundGeometry(data.rings, limit);
+  const ringColors = (data.rings ? data.rings.colors : []).map(hexColor);
+  const seriesPoints = {};
+  for (const key of Object.keys(SERIES)) {
+    const points = new Float32Array(members[key].length * 2);
+    members[key].forEach((i, k) => {
+      points[2 * k] = x[i];
+      points[2 * k + 1] = y[i];
+    });
+    seriesPoints[key] = points;
+  }
+  // the geometry is uploaded once per context (again after a restore); only
+  // uniforms change on zoom and pan
+  const buffers = { generation: -1, background: null, series: {} };
+  const upload = () => {
+    if (buffers.generation === renderer.generation) return;
+    buffers.background = gl.createBuffer();
+    gl.bindBuffer(gl.ARRAY_BUFFER, buffers.background);
+    gl.bufferData(gl.ARRAY_BUFFER, background.data, gl.STATIC_DRAW);
+    for (const key of Object.keys(SERIES)) {
+      buffers.series[key] = gl.createBuffer();
+      gl.bindBuffer(gl.ARRAY_BUFFER, buffers.series[key]);
+      gl.bufferData(gl.ARRAY_BUFFER, seriesPoints[key], gl.STATIC_DRAW);
+    }
+    buffers.generation = renderer.generation;
+  };
+
+  const view = { zoom: 1, cx: 0, cy: 0, size: 0, ratio: 1 };
+  const clampView = () => {
+    view.zoom = Math.min(Math.max(view.zoom, 1), MAX_ZOOM);
+    // the view never leaves the plotted area, which is where the grid is
+    const room = limit - limit / view.zoom;
+    view.cx = Math.min(Math.max(view.cx, -room), room);
+    view.cy = Math.min(Math.max(view.cy, -room), room);
+  };
+  const pxPerMm = () => (view.size / (2 * limit)) * view.zoom;
+  const toScreen = (i) => [
+    view.size / 2 + (x[i] - view.cx) * pxPerMm(),
+    view.size / 2 - (y[i] - view.cy) * pxPerMm(),
+  ];
+
+  const draw = () => {
+    // a lost context draws nothing; the restore redraws every chart
+    if (renderer.lost || gl.isContextLost()) return;
+    upload();
+    const ratio = view.ratio;
+    const loc = renderer.loc;
+    const width = canvas.width;
+    const height = canvas.height;
+    // the shared canvas only grows; this chart draws in its bottom left corner
+    const target = renderer.canvas;
+    if (target.width < width || target.height < height) {
+      target.width = Math.max(target.width, width);
+      target.height = Math.max(target.height, height);
+    }
+    gl.viewport(0, 0, width, height);
+    gl.clearColor(1, 1, 1, 1);
+    gl.clear(gl.COLOR_BUFFER_BIT);
+    gl.uniform2f(loc.center, view.cx, view.cy);
+    gl.uniform1f(loc.scale, view.zoom / limit);
+
+    gl.bindBuffer(gl.ARRAY_BUFFER, buffers.background);
+    gl.enableVertexAttribArray(loc.position);
+    gl.vertexAttribPointer(loc.position, 2, gl.FLOAT, false, 0, 0);
+    gl.uniform1i(loc.marker, 0);
+    for (let k = 0; k < background.rings; k++) {
+      gl.uniform4fv(loc.color, ringColors[k] || [0, 0, 0, 1]);
+      gl.drawArrays(gl.TRIANGLE_FAN, k * background.fan, background.fan);
+    }
+    gl.uniform4fv(loc.color, RING_EDGE);
+    for (let k = 0; k < background.rings; k++) {
+      gl.drawArrays(gl.LINE_LOOP, k * background.fan + 1, RING_SEGMENTS);
+    }
+    gl.uniform4fv(loc.color, GRID_COLOR);
+    gl.drawArrays(gl.LINES, background.lineStart, background.gridVertices);
+    gl.uniform4fv(loc.color, AXIS_COLOR);
+    gl.drawArrays(gl.LINES, background.lineStart + background.gridVertices, 4);
+
+    const labelled = [];
+    for (const key of Object.keys(SERIES)) {
+      const series = SERIES[key];
+      if (!visible[key] || members[key].length === 0) continue;
+      const diameter = Math.max(8, series.size * view.size);
+      gl.bindBuffer(gl.ARRAY_BUFFER, buffers.series[key]);
+      gl.vertexAttribPointer(loc.position, 2, gl.FLOAT, false, 0, 0);
+      gl.uniform1i(loc.marker, series.marker);
+      gl.uniform1f(loc.pointSize, diameter * ratio);
+      gl.uniform1f(loc.edgeFrom, 1 - 4 / diameter);
+      gl.uniform4fv(loc.color, series.fill);
+      gl.uniform4fv(loc.edge, series.edge);
+      gl.drawArrays(gl.POINTS, 0, members[key].length);
+      labelled.push([key, diameter]);
+    }
+    // copy the frame out before another chart draws on the shared canvas
+    plot.drawImage(target, 0, target.height - height, width, height, 0, 0, width, height);
+
+    const context = overlay.getContext("2d");
+    context.setTransform(ratio, 0, 0, ratio, 0, 0);
+    context.clearRect(0, 0, view.size, view.size);
+    if (!visible.labels) return;
+    for (const [key, diameter] of labelled) {
+      context.font = `bold ${Math.max(7, Math.round(diameter * 0.45))}px sans-serif`;
+      context.fillStyle = "white";
+      context.textAlign = "center";
+      context.textBaseline = "middle";
+      for (const i of members[key]) {
+        const [sx, sy] = toScreen(i);
+        context.fillText(ids[i] || "", sx, sy);
+      }
+    }
+  };
+
+  let frame = 0;
+  const schedule = () => {
+    if (!frame) {
+      frame = requestAnimationFrame(() => {
+        frame = 0;
+        draw();
+      });
+    }
+  };
+
+  const resize = () => {
+    const size = Math.max(120, Math.floor(stage.clientWidth));
+    const ratio = window.devicePixelRatio || 1;
+    if (size === view.size && ratio === view.ratio) return;
+    view.size = size;
+    view.ratio = ratio;
+    for (const c of [canvas, overlay]) {
+      c.width = Math.round(size * ratio);
+      c.height = Math.round(size * ratio);
+      c.style.width = `${size}px`;
+      c.style.height = `${size}px`;
+    }
+    stage.style.height = `${size}px`;
+    schedule();
+  };
+
+  const pointer = (event) => {
+    const rect = overlay.getBoundingClientRect();
+    return [event.clientX - rect.left, event.clientY - rect.top];
+  };
+
+  // the visible shot under the pointer, if any (a few dozen per string)
+  const hit = (px, py) => {
+    let best = -1;
+    let bestDistance = Infinity;
+    for (const key of Object.keys(SERIES)) {
+      if (!visible[key]) continue;
+      const radius = Math.max(8, SERIES[key].size * view.size) / 2 + 2;
+      for (const i of members[key]) {
+        const [sx, sy] = toScreen(i);
+        const d = Math.hypot(sx - px, sy - py);
+        if (d <= radius && d < bestDistance) {
+          best = i;
+          bestDistance = d;
+        }
+      }
+    }
+    return best;
+  };
+
+  const showTooltip = (i, px, py) => {
+    if (i < 0) {
+      tooltip.style.display = "none";
+      return;
+    }
+    tooltip.textContent = [
+      `Shot ${ids[i] || ""}${sighter[i] ? " (sighter)" : ""}  ·  Score ${scores[i] || "–"}`,
+      `Time ${times[i] || "–"}`,
+      `Velocity ${formatNumber(columns.v_fps[i], 0, " fps")}`,
+      `Yaw ${formatNumber(columns.yaw_deg[i], 2, "°")}  ·  Pitch ${formatNumber(columns.pitch_deg[i], 2, "°")}`,
+      `Quality ${formatNumber(columns.quality[i], 2, "")}`,
+    ].join("\n");
+    tooltip.style.display = "block";
+    const left = px + 12 + tooltip.offsetWidth > view.size ? px - 12 - tooltip.offsetWidth : px + 12;
+    tooltip.style.left = `${Math.max(0, left)}px`;
+    tooltip.style.top = `${Math.max(0, Math.min(py + 12, view.size - tooltip.offsetHeight))}px`;
+  };
+
+  let drag = null;
+  const onWheel = (event) => {
+    event.preventDefault();
+    const [px, py] = pointer(event);
+    // keep the point under the pointer where it is
+    const mx = view.cx + (px - view.size / 2) / pxPerMm();
+    const my = view.cy - (py - view.size / 2) / pxPerMm();
+    const before = view.zoom;
+    view.zoom *= Math.exp(-event.deltaY * 0.0015);
+    clampView();
+    view.cx = mx - (mx - view.cx) * (before / view.zoom);
+    view.cy = my - (my - view.cy) * (before / view.zoom);
+    clampView();
+    tooltip.style.display = "none";
+    schedule();
+  };
+  const onDown = (event) => {
+    drag = { x: event.clientX, y: event.clientY, cx: view.cx, cy: view.cy };
+    overlay.setPointerCapture(event.pointerId);
+  };
+  const onMove = (event) => {
+    const [px, py] = pointer(event);
+    if (drag) {
+      view.cx = drag.cx - (event.clientX - drag.x) / pxPerMm();
+      view.cy = drag.cy + (event.clientY - drag.y) / pxPerMm();
+      clampView();
+      tooltip.style.display = "none";
+      schedule();
+      return;
+    }
+    showTooltip(hit(px, py), px, py);
+  };
+  const onUp = (event) => {
+    drag = null;
+    if (overlay.hasPointerCapture(event.pointerId)) overlay.releasePointerCapture(event.pointerId);
+  };
+  const onLeave = () => {
+    tooltip.style.display = "none";
+  };
+  const onReset = () => {
+    view.zoom = 1;
+    view.cx = 0;
+    view.cy = 0;
+    schedule();
+  };
+
+  overlay.addEventListener("wheel", onWheel, { passive: false });
+  overlay.addEventListener("pointerdown", onDown);
+  overlay.addEventListener("pointermove", onMove);
+  overlay.addEventListener("pointerup", onUp);
+  overlay.addEventListener("pointerleave", onLeave);
+  overlay.addEventListener("dblclick", onReset);
+  reset.addEventListener("click", onReset);
+  const observer = new ResizeObserver(resize);
+  observer.observe(stage);
+  const chart = { redraw: schedule };
+  renderer.charts.add(chart);
+  resize();
+
+  return () => {
+    observer.disconnect();
+    if (frame) cancelAnimationFrame(frame);
+    renderer.charts.delete(chart);
+    if (buffers.generation === renderer.generation && !gl.isContextLost()) {
+      gl.deleteBuffer(buffers.background);
+      for (const key of Object.keys(SERIES)) gl.deleteBuffer(buffers.series[key]);
+    }
+    releaseRenderer(renderer);
+    root.remove();
+  };
+}
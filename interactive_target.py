@@ -0,0 +1,137 @@
+# interactive_target.py
+"""
+Interactive target plots drawn in the browser.
+
+The static plot (plot_target_with_scores through render_cache) is a PNG, so
+zooming into a group or hiding the sighters means another rerun and another
+image. This renderer sends the data instead: the target's rings as radii and
+colours from the target registry, tessellated and uploaded to the GPU once by
+the browser, and the shots as base64 float32 / uint8 arrays, about a hundred
+bytes per shot including the tooltip fields. interactive_target.js, a
+Streamlit custom component, draws rings and shots with WebGL, every chart of
+the page through one shared context (browsers keep only about 16); wheel
+zoom, drag to pan, the per-shot tooltip (time, score, velocity, yaw / pitch,
+quality) and the Shots / Sighters / Labels toggles run in the browser without
+a rerun.
+
+target_plot_data only needs NumPy and pandas; Streamlit's component API is
+imported when the first chart is mounted.
+"""
+import base64
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from density import PLOT_MARGIN, density_target_size
+from shot_store import shot_score_labels
+from target_registry import get_registry
+
+COMPONENT_NAME = "target_plot"
+COMPONENT_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interactive_target.js")
+# Shot fields sent as float32 arrays (NaN where missing) for the tooltip
+TOOLTIP_COLUMNS = ("v_fps", "yaw_deg", "pitch_deg", "quality")
+
+COMPONENT_CSS = """
+.target-plot { font-family: sans-serif; font-size: 12px; }
+.target-plot-title { white-space: pre-line; text-align: center; font-weight: bold; margin-bottom: 4px; }
+.target-plot-stage { position: relative; width: 100%; }
+.target-plot-stage canvas { position: absolute; left: 0; top: 0; }
+.target-plot-overlay { cursor: crosshair; touch-action: none; }
+.target-plot-tooltip {
+  display: none; position: absolute; pointer-events: none; white-space: pre;
+  background: rgba(255, 255, 255, 0.95); border: 1px solid #888; border-radius: 4px;
+  padding: 4px 6px; font-size: 11px; color: #222;
+}
+.target-plot-controls { display: flex; flex-wrap: wrap; gap: 8px; align-items: center; margin-top: 4px; }
+.target-plot-controls label { display: inline-flex; align-items: center; gap: 3px; }
+.target-plot-swatch { display: inline-block; width: 10px; height: 10px; border-radius: 2px; }
+"""
+
+_component = None
+
+
+def _b64(values: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+
+
+def _floats(df: pd.DataFrame, column: str) -> str:
+    """A column as base64 little-endian float32, NaN where missing or absent."""
+    if column in df.columns:
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        values = np.full(len(df), np.nan)
+    return _b64(values.astype("<f4"))
+
+
+def _lines(values) -> str:
+    """Texts joined with newlines, blanks where missing."""
+    return "\n".join("" if pd.isna(v) else str(v) for v in values)
+
+
+def target_title(string_data: Dict[str, Any]) -> List[str]:
+    """Title lines of a string's chart, as plot_target.target_title without the target size."""
+    return [f"{string_data.get('shooter')} - {string_data.get('course')}",
+            f"{string_data.get('rifle')}", f"Score: {string_data.get('score')}"]
+
+
+def target_plot_data(string_data: Dict[str, Any], target_size_mm: Optional[int] = None) -> Dict[str, Any]:
+    """
+    The JSON payload of one string's chart: title, plotted half width
+    (limit_mm), rings (radii largest first, hex colours, grid spacing, or None
+    when the target type is unknown), and per shot x / y, a sighter flag, the
+    TOOLTIP_COLUMNS as base64 arrays and id, time and score as newline-joined
+    text. The target size is chosen from the record shots as
+    plot_target.auto_target_size does, unless given.
+    """
+    df = string_data["data"]
+    sighter = (df["tags"] == "sighter").to_numpy(dtype=bool) if "tags" in df.columns else np.zeros(len(df), bool)
+    x = pd.to_numeric(df["x_mm"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    y = pd.to_numeric(df["y_mm"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    if target_size_mm is None:
+        target_size_mm = density_target_size(x[~sighter], y[~sighter], coverage=100)
+
+    target_type = df["target_info"].iat[0] if len(df) and "target_info" in df.columns else None
+    target = get_registry().get(target_type) if target_type else None
+    rings = None
+    if target:
+        rings = {"radii": list(target.draw_radii), "colors": list(target.draw_colors),
+                 "grid_mm": target.grid_size_mm}
+
+    payload = {
+        "title": target_title(string_data) + [f"Target: {target_size_mm}mm"],
+        "limit_mm": target_size_mm / 2 * PLOT_MARGIN,
+        "rings": rings,
+        "n": len(df),
+        "x": _b64(x.astype("<f4")),
+        "y": _b64(y.astype("<f4")),
+        "sighter": _b64(sighter.astype(np.uint8)),
+        "id": _lines(df["id"]) if "id" in df.columns else "",
+        "time": _lines(df["time"]) if "time" in df.columns else "",
+        "score": _lines(shot_score_labels(df)),
+    }
+    for column in TOOLTIP_COLUMNS:
+        payload[column] = _floats(df, column)
+    return payload
+
+
+def _target_plot_component():
+    """The registered component, registered on first use."""
+    global _component
+    if _component is None:
+        import streamlit as st
+
+        with open(COMPONENT_JS, encoding="utf-8") as f:
+            js = f.read()
+        _component = st.components.v2.component(COMPONENT_NAME, js=js, css=COMPONENT_CSS)
+    return _component
+
+
+def interactive_target(string_data: Dict[str, Any], key: Optional[str] = None,
+                       target_size_mm: Optional[int] = None):
+    """Mount the interactive chart of a string; key must be unique among the charts on the page."""
+    if key:
+        # Streamlit reserves '__' in component keys
+        key = key.replace("__", "_-")
+    return _target_plot_component()(data=target_plot_data(string_data, target_size_mm), key=key)
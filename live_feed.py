@@ -0,0 +1,374 @@
+# live_feed.py
+"""
+Live ingestion of ShotMarker export lines while a match is being shot.
+
+An asyncio service reads lines as they appear, either by tailing a growing
+export file or from clients that connect to a local TCP port and send the
+export's lines (UTF-8, newline terminated). Lines go through the same
+header / shot-line grammar as parse_shotmarker_csv (StringBlockScanner).
+
+A LiveStore keeps every string seen so far. Only the strings that received
+new shot lines are parsed again, and each change bumps the store's version,
+so a reader asks which strings changed since the version it last saw and
+redraws only those. Lines of completed strings (a later header has been
+seen) are dropped once the string is built, so memory is bounded by the
+strings themselves plus the string still being shot.
+
+Every string keeps the time its latest lines were received and the time it
+was rebuilt. Readers call record_latency once they have drawn it, which
+gives the latency from shot line to updated plot (latency_stats; see also
+benchmarks/bench_live.py). Tailing adds up to POLL_SECONDS to that, since
+the file is checked for new data at that interval.
+
+The service runs its event loop in a background thread (get_live_feed), so
+Streamlit reruns only read the store.
+
+Command line:
+    python live_feed.py serve [--tail EXPORT] [--port 8765]
+prints each string as it changes;
+    python live_feed.py replay EXPORT --port 8765 [--rate 5]
+sends an export's lines to a running service, rate lines per second.
+"""
+import argparse
+import asyncio
+import bisect
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from shotmarker_parser import (
+    STREAM_CHUNK_SIZE,
+    LineSplitter,
+    StringBlockScanner,
+    build_shot_columns,
+    store_from_columns,
+)
+
+# Environment variables read by the app for a live feed started from the shell
+LIVE_FILE_ENV = "MRPC_LIVE_FILE"
+LIVE_PORT_ENV = "MRPC_LIVE_PORT"
+# Interval at which a tailed file is checked for new data
+POLL_SECONDS = 0.1
+# Latencies kept for latency_stats
+LATENCY_WINDOW = 1000
+DEFAULT_HOST = "127.0.0.1"
+
+
+class _Source:
+    """Scanner state of one input; block b of the scanner is string offset + b of the source."""
+
+    def __init__(self):
+        self.scanner = StringBlockScanner()
+        self.offset = 0
+
+
+class LiveStore:
+    """
+    Strings of all live sources, rebuilt incrementally as lines arrive.
+
+    Strings are keyed by '<source>#<n>', n counting the strings of the
+    source from 0, so a key stays the same while its string grows (its
+    unique_id does not). Each string dict has the parse_shotmarker_csv
+    layout plus 'live_key' and 'live_source'. Thread-safe.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._sources: Dict[str, _Source] = {}
+        self._strings: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        # (received, updated) monotonic times of each string's latest change
+        self._times: Dict[str, Tuple[float, float]] = {}
+        self._latencies: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+        self._changed = threading.Condition()
+
+    def apply(self, source: str, lines: List[str], received_at: Optional[float] = None) -> List[str]:
+        """
+        Feed lines from source (received at monotonic time received_at, now
+        by default) and rebuild the strings they extend. Returns the keys of
+        the strings that changed.
+        """
+        received_at = time.monotonic() if received_at is None else received_at
+        with self._changed:
+            state = self._sources.setdefault(source, _Source())
+            scanner = state.scanner
+            n_lines = len(scanner.shot_lines)
+            scanner.feed_lines(lines)
+            if len(scanner.shot_lines) == n_lines:
+                return []
+
+            # new shot lines only ever extend the last blocks, so every block
+            # from the first one that got a line is rebuilt, in one pass
+            first = scanner.shot_blocks[n_lines]
+            lo = bisect.bisect_left(scanner.shot_blocks, first)
+            blocks = [b - first for b in scanner.shot_blocks[lo:]]
+            columns, counts = build_shot_columns(scanner.headers[first:], scanner.shot_lines[lo:],
+                                                 blocks, scanner.max_fields)
+            built = store_from_columns(scanner.headers[first:], columns, counts).to_strings() if columns else []
+
+            updated_at = time.monotonic()
+            changed = []
+            version = self.version + 1
+            for b, string in zip(np.flatnonzero(counts), built):
+                key = f"{source}#{state.offset + first + int(b)}"
+                string["live_key"] = key
+                string["live_source"] = source
+                self._strings.pop(key, None)
+                self._strings[key] = string
+                self._versions[key] = version
+                self._times[key] = (received_at, updated_at)
+                changed.append(key)
+            if changed:
+                self.version = version
+                self._changed.notify_all()
+
+            # completed strings are built for good; their lines are not needed
+            completed = scanner.take_completed()
+            if completed is not None:
+                state.offset += len(completed[0])
+            return changed
+
+    def reset_source(self, source: str) -> None:
+        """Start a source over (e.g. a tailed file was truncated): its strings are dropped and built again as lines come in."""
+        with self._changed:
+            self._sources.pop(source, None)
+            for key in [key for key, string in self._strings.items() if string["live_source"] == source]:
+                del self._strings[key], self._versions[key], self._times[key]
+            self.version += 1
+            self._changed.notify_all()
+
+    def changed_since(self, version: int) -> Tuple[List[str], int]:
+        """Keys of the strings changed after version, and the current version."""
+        with self._changed:
+            keys = [key for key, v in self._versions.items() if v > version]
+            return keys, self.version
+
+    def snapshot(self, version: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """
+        The strings changed after version, all strings (as strings()) and the
+        current version, taken together so every string in the first two
+        lists is at or before the returned version.
+        """
+        with self._changed:
+            changed = [self._strings[key] for key, v in self._versions.items() if v > version]
+            return changed, list(self._strings.values()), self.version
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Block until the store's version is past version; False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.version > version, timeout)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The current string dict for a key, or None."""
+        with self._changed:
+            return self._strings.get(key)
+
+    def strings(self) -> List[Dict[str, Any]]:
+        """All strings, in the order they were last changed (oldest first)."""
+        with self._changed:
+            return list(self._strings.values())
+
+    def timing(self, key: str) -> Tuple[float, float]:
+        """(received, updated) monotonic times of a string's latest change."""
+        with self._changed:
+            return self._times[key]
+
+    def record_latency(self, key: str, done_at: Optional[float] = None) -> float:
+        """
+        Record that the latest change of a string has been drawn (at monotonic
+        time done_at, now by default). Returns the seconds since its lines were
+        received, NaN (and nothing recorded) if its source has started over since.
+        """
+        done_at = time.monotonic() if done_at is None else done_at
+        with self._changed:
+            if key not in self._times:
+                return float("nan")
+            latency = done_at - self._times[key][0]
+            self._latencies.append(latency)
+        return latency
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Count, median, 95th percentile and maximum of the recorded latencies, in ms."""
+        with self._changed:
+            values = np.array(self._latencies, dtype=np.float64) * 1000.0
+        if len(values) == 0:
+            return {"count": 0, "p50_ms": np.nan, "p95_ms": np.nan, "max_ms": np.nan}
+        return {
+            "count": len(values),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "max_ms": float(values.max()),
+        }
+
+
+class LiveFeed:
+    """
+    asyncio service feeding a LiveStore from tailed files and TCP clients.
+
+    The coroutines (tail_file, serve) can run on any event loop; start()
+    runs a loop in a daemon thread, and tail() / listen() schedule them on it.
+    """
+
+    def __init__(self, store: Optional[LiveStore] = None, poll_seconds: float = POLL_SECONDS):
+        self.store = store if store is not None else LiveStore()
+        self.poll_seconds = poll_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tails: Dict[str, Any] = {}
+        self._servers: Dict[Tuple[str, int], Any] = {}
+        self._lock = threading.Lock()
+
+    async def tail_file(self, path: str) -> None:
+        """
+        Feed a growing export file from its start, then every line appended to
+        it. A file that shrinks or is replaced is read again from the start.
+        """
+        source = f"file:{os.path.abspath(path)}"
+        splitter = LineSplitter()
+        position = 0
+        inode = None
+        while True:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            if stat.st_size < position or (inode is not None and stat.st_ino != inode):
+                self.store.reset_source(source)
+                splitter = LineSplitter()
+                position = 0
+            inode = stat.st_ino
+            if stat.st_size == position:
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            with open(path, "rb") as f:
+                f.seek(position)
+                chunk = f.read(STREAM_CHUNK_SIZE)
+            received_at = time.monotonic()
+            position += len(chunk)
+            lines = splitter.feed(chunk)
+            if lines:
+                self.store.apply(source, lines, received_at)
+            # let other sources in between the chunks of a large backlog
+            await asyncio.sleep(0)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername") or ("?", 0)
+        source = f"tcp:{peer[0]}:{peer[1]}"
+        splitter = LineSplitter()
+        try:
+            while True:
+                chunk = await reader.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                lines = splitter.feed(chunk)
+                if lines:
+                    self.store.apply(source, lines)
+            lines = splitter.flush()
+            if lines:
+                self.store.apply(source, lines)
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = 0) -> asyncio.AbstractServer:
+        """Accept line-sending clients on host:port; each connection is its own source."""
+        return await asyncio.start_server(self._handle_client, host, port)
+
+    def start(self) -> None:
+        """Run the event loop in a daemon thread (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="live-feed", daemon=True)
+            self._thread.start()
+
+    def tail(self, path: str) -> None:
+        """Tail path on the background loop, unless it is tailed already."""
+        self.start()
+        path = os.path.abspath(path)
+        with self._lock:
+            if path not in self._tails or self._tails[path].done():
+                self._tails[path] = asyncio.run_coroutine_threadsafe(self.tail_file(path), self._loop)
+
+    def listen(self, port: int, host: str = DEFAULT_HOST) -> int:
+        """Accept clients on host:port on the background loop (once per address). Returns the bound port."""
+        self.start()
+        with self._lock:
+            server = self._servers.get((host, port))
+            if server is None:
+                server = asyncio.run_coroutine_threadsafe(self.serve(host, port), self._loop).result()
+                self._servers[(host, port)] = server
+            return server.sockets[0].getsockname()[1]
+
+
+_default_feed: Optional[LiveFeed] = None
+_default_lock = threading.Lock()
+
+
+def get_live_feed() -> LiveFeed:
+    """Process-wide live feed shared by all Streamlit sessions and reruns."""
+    global _default_feed
+    with _default_lock:
+        if _default_feed is None:
+            _default_feed = LiveFeed()
+        return _default_feed
+
+
+def send_lines(lines: List[str], port: int, host: str = DEFAULT_HOST, rate: Optional[float] = None) -> None:
+    """Send lines to a live feed over TCP, rate lines per second (as fast as possible if None)."""
+    with socket.create_connection((host, port)) as sock:
+        for line in lines:
+            sock.sendall((line.rstrip("\r\n") + "\n").encode("utf-8"))
+            if rate:
+                time.sleep(1.0 / rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live ShotMarker feed.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="tail a file and/or accept lines over TCP, printing changes")
+    serve.add_argument("--tail", help="growing export file to tail")
+    serve.add_argument("--port", type=int, help="TCP port to accept lines on")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    replay = commands.add_parser("replay", help="send an export's lines to a running service")
+    replay.add_argument("path", help="ShotMarker CSV export")
+    replay.add_argument("--port", type=int, required=True)
+    replay.add_argument("--host", default=DEFAULT_HOST)
+    replay.add_argument("--rate", type=float, default=5.0, help="lines per second (0 = as fast as possible)")
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        with open(args.path, "r", encoding="utf-8", errors="replace") as f:
+            send_lines(f.read().splitlines(), args.port, args.host, args.rate or None)
+        return
+
+    if not args.tail and args.port is None:
+        parser.error("serve needs --tail and/or --port")
+    feed = get_live_feed()
+    if args.tail:
+        feed.tail(args.tail)
+    if args.port is not None:
+        print(f"listening on {args.host}:{feed.listen(args.port, args.host)}")
+    version = 0
+    try:
+        while True:
+            if not feed.store.wait(version, timeout=1.0):
+                continue
+            keys, version = feed.store.changed_since(version)
+            for key in keys:
+                string = feed.store.get(key)
+                received, updated = feed.store.timing(key)
+                print(f"{key}: {string['shooter']} {string['course']} {len(string['data'])} shots, "
+                      f"score {string['score']} (parsed in {(updated - received) * 1000:.1f} ms)")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
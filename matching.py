@@ -0,0 +1,227 @@
+# matching.py
+"""
+Linking score rows to ShotMarker strings when their ids do not agree exactly.
+
+A string's unique_id and a score row's uniq_id are both "total,s1,s2,...",
+but they are built from different files: X can be 'x' or 'X', a score may be
+'10' or '10.0', and one side may include the sighters. ScoreMatcher indexes
+the strings twice:
+
+- by the normalized score sequence, with and without sighters (a hash lookup);
+- by (total points, X count), where rows that miss the first index are
+  compared by edit distance against the few strings in their bucket. The shot
+  count is left out of the key, so a shot inserted or missing on one side
+  still lands in the same bucket and costs one edit.
+
+Both lookups are dict hits, so linking N strings against M rows stays close
+to O(N + M) instead of comparing every row with every string.
+"""
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Largest number of differing shots accepted by the edit-distance fallback
+MAX_EDIT_DISTANCE = 2
+
+_TOTAL_RE = re.compile(r"^\s*(\d+)(?:\.0+)?\s*(?:-\s*(\d+)\s*[XV])?\s*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def normalize_shot(value: Any) -> str:
+    """Canonical form of one shot score: 'X' for x/v, '10' for '10.0', upper case otherwise."""
+    text = str(value).strip().upper()
+    if text in ("X", "V"):
+        return "X"
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else text
+
+
+def parse_total(total: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(points, X count) from a total such as '198-7x'; X count is None when absent."""
+    match = _TOTAL_RE.match(str(total))
+    if not match:
+        return None, None
+    xs = match.group(2)
+    return int(match.group(1)), (int(xs) if xs is not None else None)
+
+
+def split_id(uid: str) -> Tuple[str, Tuple[str, ...]]:
+    """Split a unique_id/uniq_id into its total and normalized shot scores."""
+    total, _, shots = str(uid).partition(",")
+    tokens = tuple(normalize_shot(s) for s in shots.split(",") if s.strip())
+    return total.strip(), tokens
+
+
+def _points(shots: Sequence[str]) -> int:
+    total = 0
+    for shot in shots:
+        if shot == "X":
+            total += 10
+        elif shot.isdigit():
+            total += int(shot)
+    return total
+
+
+def sequence_key(total: str, shots: Sequence[str]) -> str:
+    """Hash key of a normalized score sequence."""
+    points, xs = parse_total(total)
+    head = str(total).strip().upper() if points is None else f"{points}-{xs if xs is not None else shots.count('X')}X"
+    return head + "," + ",".join(shots)
+
+
+def bucket_key(total: str, shots: Sequence[str]) -> Tuple:
+    """Secondary index key: (total points, X count)."""
+    points, xs = parse_total(total)
+    if points is None:
+        points = _points(shots)
+    return points, shots.count("X") if xs is None else xs
+
+
+def edit_distance(a: Sequence[str], b: Sequence[str], limit: int = MAX_EDIT_DISTANCE) -> int:
+    """Levenshtein distance between two shot sequences; returns limit + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _sighter_count(string: Dict[str, Any]) -> int:
+    """Number of leading sighter shots in a string's data."""
+    data = string.get("data")
+    if data is None or "tags" not in data.columns:
+        return 0
+    # sighters come first, so only the leading rows are looked at
+    col = data.columns.get_loc("tags")
+    count = 0
+    while count < len(data) and data.iat[count, col] == "sighter":
+        count += 1
+    return count
+
+
+class ScoreMatcher:
+    """Index of strings by normalized score sequence and by (total, X count)."""
+
+    def __init__(self, strings: List[Dict[str, Any]], max_distance: int = MAX_EDIT_DISTANCE):
+        self.strings = strings
+        self.max_distance = max_distance
+        self._by_sequence: Dict[str, List[int]] = defaultdict(list)
+        self._by_bucket: Dict[Tuple, List[Tuple[int, Tuple[str, ...]]]] = defaultdict(list)
+        for i, string in enumerate(strings):
+            unique_id = string.get("unique_id", "")
+            if not unique_id:
+                continue
+            total, shots = split_id(unique_id)
+            variants = {shots}
+            sighters = _sighter_count(string)
+            if sighters:
+                # the scores side usually lists record shots only
+                variants.add(shots[sighters:])
+            for variant in variants:
+                self._by_sequence[sequence_key(total, variant)].append(i)
+                self._by_bucket[bucket_key(total, variant)].append((i, variant))
+
+    def _distinct(self, positions: Sequence[int]) -> List[int]:
+        """Positions with distinct unique_ids (duplicate strings are the same link)."""
+        seen = {}
+        for i in positions:
+            # the last string wins, as with an exact join
+            seen[self.strings[i]["unique_id"]] = i
+        return list(seen.values())
+
+    def match(self, uniq_id: str) -> Dict[str, Any]:
+        """
+        Link one score uniq_id. Returns a dict with the matched string position
+        (or None), method ('exact', 'normalized', 'fuzzy', 'ambiguous' or
+        'unmatched'), the edit distance and the candidate unique_ids.
+        """
+        total, shots = split_id(uniq_id)
+        candidates = self._distinct(self._by_sequence.get(sequence_key(total, shots), []))
+        distance = 0
+        if not candidates:
+            best = self.max_distance + 1
+            for i, variant in self._by_bucket.get(bucket_key(total, shots), []):
+                d = edit_distance(shots, variant, self.max_distance)
+                if d < best:
+                    best, candidates = d, [i]
+                elif d == best and d <= self.max_distance:
+                    candidates.append(i)
+            candidates = self._distinct(candidates) if best <= self.max_distance else []
+            distance = best
+            method = "fuzzy"
+        else:
+            exact = [i for i in candidates if self.strings[i]["unique_id"] == uniq_id]
+            method = "exact" if exact else "normalized"
+            candidates = exact or candidates
+
+        result = {
+            "string": None,
+            "method": method,
+            "distance": distance if candidates else None,
+            "candidates": [self.strings[i]["unique_id"] for i in candidates],
+        }
+        if not candidates:
+            result["method"] = "unmatched"
+        elif len(candidates) > 1:
+            result["method"] = "ambiguous"
+        else:
+            result["string"] = candidates[0]
+        return result
+
+
+def match_scores(strings: List[Dict[str, Any]], df_scores: pd.DataFrame,
+                 max_distance: int = MAX_EDIT_DISTANCE) -> pd.DataFrame:
+    """
+    Match every score row to a string. One report row per score row (same
+    index as df_scores) with uniq_id, the linked string position and its
+    unique_id ('' when not linked), method, distance and candidates.
+    """
+    matcher = ScoreMatcher(strings, max_distance)
+    rows = []
+    for uniq_id in df_scores["uniq_id"].tolist():
+        if not isinstance(uniq_id, str) or not uniq_id:
+            rows.append({"uniq_id": uniq_id, "string": None, "unique_id": "", "method": "unmatched",
+                         "distance": None, "candidates": []})
+            continue
+        result = matcher.match(uniq_id)
+        linked = result["string"]
+        rows.append({"uniq_id": uniq_id, "string": linked,
+                     "unique_id": strings[linked]["unique_id"] if linked is not None else "",
+                     "method": result["method"], "distance": result["distance"],
+                     "candidates": result["candidates"]})
+    return pd.DataFrame(rows, index=df_scores.index,
+                        columns=["uniq_id", "string", "unique_id", "method", "distance", "candidates"])
+
+
+def unmatched_strings(strings: List[Dict[str, Any]], report: pd.DataFrame) -> List[int]:
+    """Positions of strings no score row was linked to."""
+    linked = set(report["string"].dropna().astype(int))
+    return [i for i, string in enumerate(strings) if string.get("unique_id") and i not in linked]
+
+
+def link_scores(strings: List[Dict[str, Any]], df_scores: pd.DataFrame,
+                max_distance: int = MAX_EDIT_DISTANCE) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Point each score row's uniq_id at the string it matches, so the exact
+    joins in enrichment.py pick up normalized and fuzzy links too. The value
+    from the scores CSV is kept in uniq_id_csv; unmatched and ambiguous rows
+    keep their own uniq_id. Returns (df_scores copy, match report).
+    """
+    report = match_scores(strings, df_scores, max_distance)
+    df_scores = df_scores.copy()
+    df_scores["uniq_id_csv"] = df_scores["uniq_id"]
+    linked = report["unique_id"] != ""
+    df_scores.loc[linked, "uniq_id"] = report.loc[linked, "unique_id"]
+    return df_scores, report
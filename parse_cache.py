@@ -0,0 +1,225 @@
+# parse_cache.py
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+from ingest import parse_stores
+from score_parser import parse_scores_csv
+from shot_store import ShotStore, text_columns_to_object
+
+# Bump when the parsers' output changes so stale disk entries are ignored
+CACHE_VERSION = 3
+
+# Directory for the on-disk tier; set MRPC_PARSE_CACHE_DIR="" to disable it
+_DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mrpc_sm", "parse")
+
+
+def _file_bytes(uploaded_file) -> bytes:
+    """Return the raw bytes of an uploaded file, bytes or str."""
+    if hasattr(uploaded_file, "getvalue"):
+        content = uploaded_file.getvalue()
+    elif hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        content = uploaded_file.read()
+        uploaded_file.seek(0)
+    else:
+        content = uploaded_file
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return bytes(content)
+
+
+def content_key(kind: str, data: bytes) -> str:
+    """Cache key for a parser kind and file content."""
+    return f"{kind}-v{CACHE_VERSION}-{hashlib.sha256(data).hexdigest()}"
+
+
+class ParseCache:
+    """
+    Parse results keyed by a hash of the file bytes.
+
+    Entries are kept in an in-memory LRU of at most max_entries files. When
+    cache_dir is set, results are also written there as Parquet files so a new
+    process can load a known upload without parsing it again. Thread-safe: the
+    in-memory tier and the counters are guarded by a lock, parsing and disk
+    reads and writes run outside it.
+    """
+
+    def __init__(self, max_entries: int = 32, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and the current number of in-memory entries."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the disk tier is left alone)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key: str, load_from_disk) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.cache_dir:
+            try:
+                value = load_from_disk(key)
+            except Exception:
+                # a missing or unreadable disk entry is just a miss
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        return None
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{suffix}.parquet")
+
+    @staticmethod
+    def _write_parquet(df: pd.DataFrame, path: str) -> None:
+        """
+        Write to a temp name and os.replace it in, so a reader never sees a
+        half-written file; the temp name is per thread, as two sessions may
+        save the same entry at once.
+        """
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    # ShotMarker exports ---------------------------------------------------
+
+    def _load_store(self, key: str) -> Optional[ShotStore]:
+        strings_path = self._path(key, "strings")
+        if not os.path.exists(strings_path):
+            return None
+        strings = text_columns_to_object(pd.read_parquet(strings_path))
+        shots = pd.read_parquet(self._path(key, "shots"))
+        return ShotStore(strings, shots)
+
+    def _save_store(self, key: str, store: ShotStore) -> None:
+        if len(store) == 0:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # shots first: the strings file marks a complete entry
+        self._write_parquet(store.shots, self._path(key, "shots"))
+        self._write_parquet(store.strings, self._path(key, "strings"))
+
+    def shotmarker_strings(self, uploaded_file) -> List[Dict[str, Any]]:
+        """Cached parse_shotmarker_csv; each call returns fresh string dicts."""
+        return self.shotmarker_strings_many([uploaded_file], max_workers=1)[0]
+
+    def shotmarker_stores(self, uploaded_files, max_workers: Optional[int] = None) -> List[ShotStore]:
+        """
+        Cached parse of several exports, one ShotStore per file in input order.
+        Files that miss the cache are parsed together across a process pool.
+        """
+        datas = [_file_bytes(f) for f in uploaded_files]
+        keys = [content_key("shotmarker", data) for data in datas]
+        stores = [self._lookup(key, self._load_store) for key in keys]
+
+        missing = [i for i, store in enumerate(stores) if store is None]
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            parsed = parse_stores([datas[i] for i in missing], max_workers=max_workers)
+            for i, store in zip(missing, parsed):
+                stores[i] = store
+                self._remember(keys[i], store)
+                if self.cache_dir:
+                    try:
+                        self._save_store(keys[i], store)
+                    except Exception:
+                        # the disk tier is best effort, the in-memory entry is enough
+                        pass
+        return stores
+
+    def shotmarker_strings_many(self, uploaded_files, max_workers: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Cached parse of several exports, one list of strings per file in input order.
+        The string dicts are new on every call and their 'data' frames are
+        copy-on-write views of the cached store, so callers may modify them freely.
+        """
+        return [store.to_strings() for store in self.shotmarker_stores(uploaded_files, max_workers)]
+
+    # Scores CSV -------------------------------------------------------------
+
+    def _load_scores(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key, "scores")
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def scores(self, scores_uploaded_file) -> pd.DataFrame:
+        """Cached parse_scores_csv; returns a copy that is safe to modify."""
+        data = _file_bytes(scores_uploaded_file)
+        key = content_key("scores", data)
+        df_scores = self._lookup(key, self._load_scores)
+        if df_scores is None:
+            with self._lock:
+                self.misses += 1
+            df_scores = parse_scores_csv(io.BytesIO(data))
+            self._remember(key, df_scores)
+            if self.cache_dir:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    self._write_parquet(df_scores, self._path(key, "scores"))
+                except Exception:
+                    # e.g. mixed-type columns Parquet cannot store
+                    pass
+        return df_scores.copy()
+
+
+_default_cache: Optional[ParseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    """
+    Process-wide cache shared by all Streamlit sessions and reruns.
+    The disk tier lives in MRPC_PARSE_CACHE_DIR (default ~/.cache/mrpc_sm/parse)
+    and is only enabled when pyarrow is installed.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            cache_dir = os.environ.get("MRPC_PARSE_CACHE_DIR", _DEFAULT_CACHE_DIR) or None
+            if cache_dir:
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError:
+                    cache_dir = None
+            _default_cache = ParseCache(cache_dir=cache_dir)
+        return _default_cache
@@ -1,158 +1,211 @@
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection, PathCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
 from matplotlib.patches import Circle
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
 from matplotlib.ticker import MultipleLocator
+from matplotlib.transforms import Affine2D
+
+import functools
+import math
+
+import numpy as np
+
+from target_registry import get_registry
+
 
-import json
-import os
-
-# Load target specs JSON from the project folder (same directory as this script)
-TARGET_SPECS_RAW = {}
-TARGET_SPECS = {}  # Dictionary indexed by type name for quick lookup
-try:
-    _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
-    _CANDIDATE_FILES = [
-        os.path.join(_THIS_DIR, 'target_specs.json'),
-        os.path.join(_THIS_DIR, 'target-specs.json'),
-        os.path.join(_THIS_DIR, 'targets.json'),
-    ]
-    for _path in _CANDIDATE_FILES:
-        if os.path.exists(_path):
-            with open(_path, 'r', encoding='utf-8') as _f:
-                TARGET_SPECS_RAW = json.load(_f)
-            # Build a lookup dictionary by type name
-            if 'targets' in TARGET_SPECS_RAW:
-                for target in TARGET_SPECS_RAW['targets']:
-                    TARGET_SPECS[target['type']] = target
-            break
-except Exception:
-    TARGET_SPECS_RAW = {}
-    TARGET_SPECS = {}
-    
 def get_target_spec_for(string_data):
-    """Return target_spec dict: prefer string_data['target_spec'], else lookup by target type in TARGET_SPECS."""
+    """
+    Return the target spec dict for a string: string_data['target_spec'] if
+    set, else the registry's spec for its target type (first shot's
+    target_info, or string_data['target_type']).
+    """
     if isinstance(string_data, dict) and 'target_spec' in string_data:
         return string_data['target_spec']
-    # Try to get target type from string_data and lookup in TARGET_SPECS
     target_type = None
     if isinstance(string_data, dict):
-        # Try to get target type from shots if available
         data = string_data.get('data')
-        if data is not None and hasattr(data, 'columns') and 'target_info' in data.columns:
-            target_type = data['target_info'].iloc[0]
-        elif 'target_type' in string_data:
-            target_type = string_data['target_type']
-    if target_type and target_type in TARGET_SPECS:
-        return TARGET_SPECS[target_type]
+        if data is not None and hasattr(data, 'columns'):
+            target_type = _target_type_for(data)
+        if target_type is None:
+            target_type = string_data.get('target_type')
+    return get_registry().spec(target_type) if target_type else None
+
+
+def _target_type_for(shots):
+    """Target type of a string, taken from the first shot's target_info."""
+    if len(shots) > 0 and 'target_info' in shots.columns:
+        return shots['target_info'].iloc[0]
     return None
 
 
-def plot_target_with_scores(string_data, target_size_mm=None):
-    """Enhanced target plot with shot scores and calculated target size."""
-    
-    fig, ax = plt.subplots(1, 1, figsize=(8,8))
-    
-    df = string_data['data']
-    sighters = df[df['tags'] == 'sighter']
-    shots = df[df['tags'] != 'sighter']
-    
-    # Calculate target size based on farthest shots
-    if target_size_mm is None:
-        x_max = shots['x_mm'].abs().max() if len(shots) > 0 else 0
-        y_max = shots['y_mm'].abs().max() if len(shots) > 0 else 0
-        farthest = max(x_max, y_max)
-        import math
-        target_size_mm = math.ceil((farthest * 2 + 25) / 50) * 50  # Round up to nearest 50mm and add 25mm
-        if target_size_mm < 50:
-            target_size_mm = 50
-    
+def auto_target_size(shots):
+    """Displayed target size in mm, based on the farthest shot from the center."""
+    x_max = shots['x_mm'].abs().max() if len(shots) > 0 else 0
+    y_max = shots['y_mm'].abs().max() if len(shots) > 0 else 0
+    farthest = max(x_max, y_max)
+    target_size_mm = math.ceil((farthest * 2 + 25) / 50) * 50  # Round up to nearest 50mm and add 25mm
+    if target_size_mm < 50:
+        target_size_mm = 50
+    return target_size_mm
+
+
+def draw_target_background(ax, target_type, target_size_mm):
+    """
+    Draw everything that only depends on the target type and size: rings,
+    grid, center lines and axis limits. The rings are two PatchCollections
+    (fills and outlines) instead of two Circle patches per ring.
+    """
     ax.set_aspect('equal')
     limit = target_size_mm / 2 * 1.1
     ax.set_xlim(-limit, limit)
     ax.set_ylim(-limit, limit)
-    
-    # Draw target rings based on specifications
-    if len(shots) > 0 and 'target_info' in shots.columns:
-        target_type = shots['target_info'].iloc[0]
-        # Match target_type to spec by name
-        spec = TARGET_SPECS.get(target_type)
-        
-        if spec:
-            # Draw rings from largest to smallest (so smaller rings are on top)
-            rings = spec.get('rings', [])
-            # Sort by diameter descending to draw outer rings first
-            rings_sorted = sorted(rings, key=lambda r: r.get('diameter', 0), reverse=True)
-            
-            for ring in rings_sorted:
-                # Convert diameter to radius
-                radius = ring.get('diameter', 0) / 2.0
-                color = ring.get('color', '#000000')
-                
-                # Create circle with fill for better visibility
-                circle = Circle(
-                    (0, 0),
-                    radius,
-                    fill=True,
-                    facecolor=color,  # honor TARGET_SPECS hex colors
-                    edgecolor='black',
-                    linewidth=1,
-                    alpha=1.0,
-                    zorder=1,
-                )
-                ax.add_patch(circle)
-                
-                # Add edge outline for clarity
-                edge_circle = Circle((0, 0), radius, fill=False,
-                                    edgecolor='black', linewidth=1.5, alpha=0.6, zorder=2)
-                ax.add_patch(edge_circle)
-    
-    # Plot shots with IDs inside markers
-    shot_handle = None
-    sighter_handle = None
-    if len(shots) > 0:
-        shot_handle = ax.scatter(shots['x_mm'], shots['y_mm'], 
-              c='blue', s=500, alpha=0.6, 
-              edgecolors='darkblue', linewidth=2.5, label='Shots', zorder=5)
-        
-        for _, shot in shots.iterrows():
-            ax.annotate(str(shot['id']), (shot['x_mm'], shot['y_mm']),
-                   fontsize=8, ha='center', va='center',
-                   color='white', weight='bold', zorder=6)
-    # Plot sighters
-    if len(sighters) > 0:
-        sighter_handle = ax.scatter(sighters['x_mm'], sighters['y_mm'],
-                  c='orange', s=150, alpha=0.6,
-                  edgecolors='darkorange', linewidth=2,
-                  marker='s', label='Sighters', zorder=5)
-        
-        for _, shot in sighters.iterrows():
-            ax.annotate(str(shot['id']), (shot['x_mm'], shot['y_mm']),
-                       fontsize=8, ha='center', va='center',
-                       color='white', weight='bold', zorder=6)
+
+    # the registry resolves name variants and keeps the rings largest first
+    target = get_registry().get(target_type) if target_type else None
+    if target:
+        # fills honor the spec's hex colors
+        fills = PatchCollection([Circle((0, 0), r) for r in target.draw_radii], match_original=False,
+                                facecolors=target.draw_colors, edgecolors='black', linewidths=1,
+                                alpha=1.0, zorder=1)
+        # Add edge outline for clarity
+        edges = PatchCollection([Circle((0, 0), r) for r in target.draw_radii], match_original=False,
+                                facecolors='none', edgecolors=to_rgba('black', 0.6),
+                                linewidths=1.5, zorder=2)
+        ax.add_collection(fills, autolim=False)
+        ax.add_collection(edges, autolim=False)
+
     # Set grid size from target specs if available
-    grid_size_mm = None
-    if len(shots) > 0 and 'target_info' in shots.columns:
-        target_type = shots['target_info'].iloc[0]
-        spec = TARGET_SPECS.get(target_type)
-        if spec and 'grid_size_moa_quarter' in spec:
-            grid_size_mm = spec['grid_size_moa_quarter']
-    
+    grid_size_mm = target.grid_size_mm if target else None
     if grid_size_mm:
         ax.xaxis.set_major_locator(MultipleLocator(grid_size_mm))
         ax.yaxis.set_major_locator(MultipleLocator(grid_size_mm))
-    
+
     ax.grid(True, alpha=0.3)
-    ax.set_aspect('equal')
-    limit = target_size_mm / 2 * 1.1
-    ax.set_xlim(-limit, limit)
-    ax.set_ylim(-limit, limit)
     ax.axhline(y=0, color='k', linestyle='--', alpha=0.3)
     ax.axvline(x=0, color='k', linestyle='--', alpha=0.3)
     # Removed x and y labels and hide tick labels (grid labels)
     ax.tick_params(axis='both', which='both', labelbottom=False, labelleft=False)
-    title = f"{string_data['shooter']} - {string_data['course']}\n{string_data['rifle']}\nScore: {string_data['score']}\nTarget: {target_size_mm}mm"
-    ax.set_title(title, fontsize=11, weight='bold')
+
+
+# Shot ID labels: 8pt bold white text centered on each marker
+LABEL_FONT_SIZE = 8
+_LABEL_FONT = FontProperties(weight='bold')
+
+
+@functools.lru_cache(maxsize=1024)
+def _label_path(label):
+    """Outline of a label in points, centered on the origin. Built once per label text."""
+    text_path = TextPath((0, 0), label, size=LABEL_FONT_SIZE, prop=_LABEL_FONT)
+    extents = text_path.get_extents()
+    center = ((extents.x0 + extents.x1) / 2, (extents.y0 + extents.y1) / 2)
+    return Path(text_path.vertices - center, text_path.codes)
+
+
+def draw_shot_labels(ax, x, y, labels, zorder=6, scale=1.0):
+    """
+    Draw all labels of a layer as a single PathCollection: cached glyph outlines
+    placed at the shot offsets, so the cost per string stays roughly constant
+    instead of growing with one Annotation per shot. scale resizes the text.
+    """
+    paths = [_label_path(str(label)) for label in labels]
+    collection = PathCollection(paths, facecolors='white', edgecolors='none',
+                                offsets=np.column_stack([x, y]),
+                                offset_transform=ax.transData, zorder=zorder)
+    # glyph outlines are in points; scale them to pixels at draw time
+    collection.set_transform(Affine2D().scale(scale / 72) + ax.figure.dpi_scale_trans)
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def draw_shot_layer(ax, shots, sighters, scale=1.0):
+    """
+    Draw shot and sighter markers with their IDs; returns the artists added.
+    scale shrinks or grows markers and labels, e.g. for smaller report subplots.
+    """
+    artists = []
+    # Plot shots with IDs inside markers
+    if len(shots) > 0:
+        artists.append(ax.scatter(shots['x_mm'], shots['y_mm'],
+              c='blue', s=500 * scale ** 2, alpha=0.6,
+              edgecolors='darkblue', linewidth=2.5 * scale, label='Shots', zorder=5))
+        artists.append(draw_shot_labels(ax, shots['x_mm'], shots['y_mm'], shots['id'].tolist(), scale=scale))
+    # Plot sighters
+    if len(sighters) > 0:
+        artists.append(ax.scatter(sighters['x_mm'], sighters['y_mm'],
+                  c='orange', s=150 * scale ** 2, alpha=0.6,
+                  edgecolors='darkorange', linewidth=2 * scale,
+                  marker='s', label='Sighters', zorder=5))
+        artists.append(draw_shot_labels(ax, sighters['x_mm'], sighters['y_mm'], sighters['id'].tolist(), scale=scale))
+    return artists
+
+
+# Legend corners tried in order, as (loc, sign of x, sign of y)
+_LEGEND_CORNERS = (("upper right", 1, 1), ("upper left", -1, 1), ("lower left", -1, -1), ("lower right", 1, -1))
+
+
+def legend_loc(shots, sighters, target_size_mm):
+    """
+    Pick the legend corner covering the fewest shots. A cheap stand-in for
+    matplotlib's loc='best', which measures every artist in the axes.
+    """
+    limit = target_size_mm / 2 * 1.1
+    xs = np.concatenate([shots['x_mm'].to_numpy(dtype=float), sighters['x_mm'].to_numpy(dtype=float)])
+    ys = np.concatenate([shots['y_mm'].to_numpy(dtype=float), sighters['y_mm'].to_numpy(dtype=float)])
+    best_loc, best_count = _LEGEND_CORNERS[0][0], None
+    for loc, sx, sy in _LEGEND_CORNERS:
+        # the legend box covers roughly the outer 35% x 25% of the axes
+        count = int(np.count_nonzero((sx * xs > 0.3 * limit) & (sy * ys > 0.5 * limit)))
+        if best_count is None or count < best_count:
+            best_loc, best_count = loc, count
+        if count == 0:
+            break
+    return best_loc
+
+
+def split_shots(string_data):
+    """Return (shots, sighters) DataFrames for a string."""
+    df = string_data['data']
+    is_sighter = df['tags'] == 'sighter'
+    return df[~is_sighter], df[is_sighter]
+
+
+def target_title(string_data, target_size_mm):
+    """Plot title for a string."""
+    return f"{string_data['shooter']} - {string_data['course']}\n{string_data['rifle']}\nScore: {string_data['score']}\nTarget: {target_size_mm}mm"
+
+
+def plot_target_with_scores(string_data, target_size_mm=None, ax=None, scale=1.0):
+    """
+    Enhanced target plot with shot scores and calculated target size.
+    Draws into ax when given (e.g. a report subplot), otherwise into a new 8x8
+    off-screen figure (Agg canvas, not registered with pyplot, so pyplot is never
+    imported); scale resizes markers, labels and the title for smaller axes.
+    """
+
+    if ax is None:
+        fig = Figure(figsize=(8,8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+    else:
+        fig = ax.figure
+
+    shots, sighters = split_shots(string_data)
+
+    # Calculate target size based on farthest shots
+    if target_size_mm is None:
+        target_size_mm = auto_target_size(shots)
+
+    # Draw target rings based on specifications, matching target_type to spec by name
+    draw_target_background(ax, _target_type_for(shots), target_size_mm)
+    draw_shot_layer(ax, shots, sighters, scale=scale)
+
+    ax.set_title(target_title(string_data, target_size_mm), fontsize=11 * scale, weight='bold')
     handles, labels = ax.get_legend_handles_labels()
     if handles:
-        ax.legend()
-    
-    return fig, ax
\ No newline at end of file
+        ax.legend(loc=legend_loc(shots, sighters, target_size_mm), fontsize=10 * scale)
+
+    return fig, ax
@@ -0,0 +1,307 @@
+# render_cache.py
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.legend import Legend
+from PIL import Image
+
+from plot_target import (
+    plot_target_with_scores,
+    auto_target_size,
+    draw_target_background,
+    draw_shot_layer,
+    legend_loc,
+    split_shots,
+    target_title,
+    _target_type_for,
+)
+from density import DensityGrid, density_grid
+from target_registry import get_registry
+
+# Default raster settings for target PNGs
+DEFAULT_STYLE = {"dpi": 100}
+# zlib level for PNGs from the layered renderer: much faster than the default 6
+# for flat-colored plots, at the cost of slightly larger files
+PNG_COMPRESS_LEVEL = 1
+# Density overlays: colormap, opacity of the densest cell, and the share of
+# the peak below which cells are left transparent
+DENSITY_CMAP = "turbo"
+DENSITY_MAX_ALPHA = 0.85
+DENSITY_FLOOR = 0.01
+
+
+def render_target_png(string_data: Dict[str, Any], target_size_mm=None, dpi: int = 100) -> bytes:
+    """
+    Render plot_target_with_scores off-screen with the Agg backend and return PNG bytes.
+    The figure is not registered with pyplot, so there is nothing to close.
+    """
+    fig, _ = plot_target_with_scores(string_data, target_size_mm=target_size_mm)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+class _BackgroundCanvas:
+    """
+    Off-screen figure for one (target type, target size, dpi) with the rings,
+    grid and center lines drawn once and saved as a raster. Each string is
+    rendered by restoring that raster and drawing only its shot layer on top.
+    The figure is shared by every session's thread, so renders on one canvas
+    are serialized by its lock.
+    """
+
+    def __init__(self, target_type, target_size_mm, dpi):
+        self.figure = Figure(figsize=(8, 8), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(1, 1, 1)
+        self.figure.subplots_adjust(left=0.02, right=0.98, bottom=0.02, top=0.88)
+        draw_target_background(self.ax, target_type, target_size_mm)
+        # empty title so its position is laid out with the background
+        self.title = self.ax.set_title("", fontsize=11, weight="bold")
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._legends: Dict[Tuple, Legend] = {}
+        self._lock = threading.Lock()
+
+    def _legend(self, artists, loc) -> Optional[Legend]:
+        """Legend for the labelled artists, built once per label set and corner."""
+        handles = [a for a in artists if not a.get_label().startswith("_")]
+        if not handles:
+            return None
+        labels = tuple(a.get_label() for a in handles)
+        legend = self._legends.get((labels, loc))
+        if legend is None:
+            # the legend copies the handles' styles, so it outlives this string's artists
+            legend = Legend(self.ax, handles, list(labels), loc=loc)
+            self._legends[(labels, loc)] = legend
+        return legend
+
+    def _png(self) -> bytes:
+        width, height = self.canvas.get_width_height()
+        image = Image.frombuffer("RGBA", (width, height), self.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+        # the figure background is opaque, so the alpha channel is dead weight
+        image = image.convert("RGB")
+        buf = io.BytesIO()
+        image.save(buf, format="png", compress_level=PNG_COMPRESS_LEVEL)
+        return buf.getvalue()
+
+    def render(self, string_data, shots, sighters, target_size_mm) -> bytes:
+        """PNG bytes of the background with this string's shots, title and legend."""
+        with self._lock:
+            self.canvas.restore_region(self.background)
+            artists = draw_shot_layer(self.ax, shots, sighters)
+            legend = self._legend(artists, legend_loc(shots, sighters, target_size_mm))
+            self.title.set_text(target_title(string_data, target_size_mm))
+            try:
+                # draw_artist ignores zorder, so draw in zorder like a full draw would
+                for artist in sorted(artists, key=lambda a: a.get_zorder()):
+                    self.ax.draw_artist(artist)
+                self.ax.draw_artist(self.title)
+                if legend is not None:
+                    self.ax.draw_artist(legend)
+                return self._png()
+            finally:
+                for artist in artists:
+                    artist.remove()
+                self.title.set_text("")
+
+    def render_density(self, grid: DensityGrid, title: str) -> bytes:
+        """
+        PNG bytes of the background with a density grid over it. Colors follow
+        DENSITY_CMAP and opacity grows with the square root of the density, so
+        sparse areas stay see-through and the rings show under them.
+        """
+        with self._lock:
+            self.canvas.restore_region(self.background)
+            peak = grid.values.max()
+            level = grid.values / peak if peak > 0 else grid.values
+            rgba = colormaps[DENSITY_CMAP](level)
+            rgba[..., 3] = np.where(level >= DENSITY_FLOOR, DENSITY_MAX_ALPHA * np.sqrt(level), 0.0)
+            h = grid.half_width_mm
+            image = self.ax.imshow(rgba, extent=(-h, h, -h, h), origin="lower", interpolation="bilinear", zorder=3)
+            self.title.set_text(title)
+            try:
+                self.ax.draw_artist(image)
+                self.ax.draw_artist(self.title)
+                return self._png()
+            finally:
+                image.remove()
+                self.title.set_text("")
+
+
+class LayeredTargetRenderer:
+    """Renders target PNGs on top of cached per-target background rasters. Thread-safe."""
+
+    def __init__(self, max_backgrounds: int = 16):
+        self.max_backgrounds = max_backgrounds
+        self._canvases: "OrderedDict[Tuple, _BackgroundCanvas]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _canvas(self, target_type, target_size_mm, dpi) -> _BackgroundCanvas:
+        # the registry version changes when spec files are edited
+        key = (target_type, target_size_mm, dpi, get_registry().version)
+        with self._lock:
+            canvas = self._canvases.get(key)
+            if canvas is None:
+                canvas = _BackgroundCanvas(target_type, target_size_mm, dpi)
+                self._canvases[key] = canvas
+                while len(self._canvases) > self.max_backgrounds:
+                    self._canvases.popitem(last=False)
+            else:
+                self._canvases.move_to_end(key)
+            return canvas
+
+    def render(self, string_data: Dict[str, Any], target_size_mm=None, dpi: int = 100) -> bytes:
+        """PNG bytes for a string's target plot."""
+        shots, sighters = split_shots(string_data)
+        if target_size_mm is None:
+            target_size_mm = auto_target_size(shots)
+        canvas = self._canvas(_target_type_for(shots), target_size_mm, dpi)
+        return canvas.render(string_data, shots, sighters, target_size_mm)
+
+    def render_density(self, x, y, target_type, title: str, target_size_mm=None, dpi: int = 100,
+                       kde: bool = True, bandwidth_mm: Optional[float] = None) -> bytes:
+        """PNG bytes of the density of many shots (see density.density_grid) over a target's rings."""
+        grid = density_grid(x, y, target_size_mm, bandwidth_mm=bandwidth_mm, kde=kde)
+        canvas = self._canvas(target_type, grid.target_size_mm, dpi)
+        detail = f"{grid.shots:,} shots"
+        if grid.outside:
+            detail += f" ({grid.outside:,} off the plot)"
+        if kde:
+            detail += f", KDE bandwidth {grid.bandwidth_mm:.1f} mm"
+        return canvas.render_density(grid, f"{title}\n{detail}\nTarget: {grid.target_size_mm}mm")
+
+
+def _string_fingerprint(string_data: Dict[str, Any]) -> str:
+    """
+    Short digest of everything else that shows up in the plot: shot coordinates,
+    ids and tags, plus the title fields. Two strings with the same score sequence
+    (and therefore the same unique_id) still get different entries.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for key in ("shooter", "course", "rifle", "score"):
+        digest.update(str(string_data.get(key, "")).encode("utf-8"))
+        digest.update(b"\0")
+    df = string_data.get("data")
+    if df is not None:
+        for col in ("x_mm", "y_mm"):
+            if col in df.columns:
+                digest.update(df[col].to_numpy(dtype="float64").tobytes())
+        for col in ("id", "tags"):
+            if col in df.columns:
+                digest.update("\0".join(map(str, df[col].tolist())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_key(string_data: Dict[str, Any], target_size_mm=None, style: Optional[Dict[str, Any]] = None) -> Tuple:
+    """Cache key: (unique_id, target spec and registry version, size, style, content fingerprint)."""
+    style = {**DEFAULT_STYLE, **(style or {})}
+    target_type = ""
+    df = string_data.get("data")
+    if df is not None and "target_info" in df.columns and len(df) > 0:
+        target_type = str(df["target_info"].iloc[0])
+    return (
+        string_data.get("unique_id", ""),
+        target_type,
+        get_registry().version,
+        target_size_mm,
+        tuple(sorted(style.items())),
+        _string_fingerprint(string_data),
+    )
+
+
+class RenderCache:
+    """
+    In-memory LRU of rendered target PNGs, drawn with LayeredTargetRenderer.
+    Thread-safe: lookups and inserts hold a lock, renders run outside it.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._renderer = LayeredTargetRenderer()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and the current number of cached images."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        """Drop all cached images."""
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: Tuple) -> Optional[bytes]:
+        """Cached PNG for key (marked most recently used), counting the hit or miss."""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def target_png(self, string_data: Dict[str, Any], target_size_mm=None,
+                   style: Optional[Dict[str, Any]] = None) -> bytes:
+        """PNG bytes for a string's target plot, rendered on first use."""
+        key = render_key(string_data, target_size_mm, style)
+        png = self._lookup(key)
+        if png is not None:
+            return png
+
+        style = {**DEFAULT_STYLE, **(style or {})}
+        png = self._renderer.render(string_data, target_size_mm=target_size_mm, dpi=style["dpi"])
+        self._store(key, png)
+        return png
+
+    def _store(self, key: Tuple, png: bytes) -> None:
+        with self._lock:
+            self._entries[key] = png
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def density_png(self, shots: Dict[str, Any], title: str, target_size_mm=None, kde: bool = True,
+                    style: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        PNG bytes of the density of many shots (x, y and target_type as
+        returned by density.strings_shots / store_shots), rendered on first use.
+        The key hashes the coordinates, so the same selection is not binned twice.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for name in ("x", "y"):
+            digest.update(np.ascontiguousarray(shots[name], dtype=np.float64).tobytes())
+        style = {**DEFAULT_STYLE, **(style or {})}
+        key = ("density", digest.hexdigest(), str(shots.get("target_type")), get_registry().version,
+               title, target_size_mm, kde, tuple(sorted(style.items())))
+        png = self._lookup(key)
+        if png is not None:
+            return png
+
+        png = self._renderer.render_density(shots["x"], shots["y"], shots.get("target_type"), title,
+                                            target_size_mm=target_size_mm, dpi=style["dpi"], kde=kde)
+        self._store(key, png)
+        return png
+
+
+_default_cache: Optional[RenderCache] = None
+_default_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """Process-wide render cache shared by all Streamlit sessions and reruns."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RenderCache()
+        return _default_cache
@@ -1,5 +1,4 @@
 import pandas as pd
-import streamlit as st
 
 def parse_scores_csv(scores_uploaded_file):
     """
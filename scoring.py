@@ -0,0 +1,203 @@
+# scoring.py
+"""
+Geometric scoring of shots from their x_mm / y_mm position.
+
+Each target's rings come from the target registry as a table of scoring
+radii sorted from the centre out, with the points and X flag of each ring. A shot scores the
+innermost ring its bullet hole touches: its centre distance minus the
+bullet radius is looked up in the table with np.searchsorted, so a hole
+that touches a line gets the higher value. Shots outside the last ring
+score 0 (a miss).
+
+score_shots scores any number of shots on any mix of target types in one
+searchsorted call: every table is shifted by its own offset and the tables
+are concatenated, so one sorted array covers them all. Results are compared
+with the score the device reported, and disagreements are flagged.
+
+Command line:
+    python scoring.py EXPORT... [--bullet-mm 7.82]
+reports how many shots agree with the device score and lists the rest.
+"""
+import argparse
+import time
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from shot_store import SCORE_POINTS_COLUMN, SCORE_X_COLUMN, SCORE_LABEL_COLUMN, shot_score_labels, shot_scores
+from target_registry import RingTable, get_registry
+
+# Bullet diameter used for the edge rule when none is given (.308 / 7.62 mm bore)
+DEFAULT_BULLET_DIAMETER_MM = 7.82
+# Columns added by score_frame
+AUTO_POINTS_COLUMN = "auto_points"
+AUTO_X_COLUMN = "auto_x"
+MISMATCH_COLUMN = "score_mismatch"
+# Points of a shot whose target type has no spec
+UNKNOWN_POINTS = -1
+# Display label of every int8 points value, indexed by its uint8 bit pattern
+# (negative points, i.e. unknown, have an empty label)
+_POINT_LABELS = np.array([str(p) for p in range(0, 128)] + [""] * 128, dtype=object)
+
+
+def ring_table(target_type: Any) -> Optional[RingTable]:
+    """RingTable of a target type (or a variant of its name) from the target registry, or None."""
+    target = get_registry().get(target_type)
+    return target.rings if target else None
+
+
+def score_shots(x: np.ndarray, y: np.ndarray, target_code: np.ndarray, tables: Sequence[Optional[RingTable]],
+                bullet_diameter_mm: float = DEFAULT_BULLET_DIAMETER_MM):
+    """
+    Score shots at (x, y) mm. target_code gives each shot's index into tables
+    (-1 or a None table for unknown targets). Returns (points int8, is_x bool);
+    points is 0 for a miss and UNKNOWN_POINTS for unknown targets or positions.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    target_code = np.asarray(target_code, dtype=np.intp)
+
+    # one sorted key array for all tables: table t's radii are shifted by t * span
+    known = [t for t in tables if t is not None and len(t.radii)]
+    span = 2.0 * (max(float(t.radii[-1]) for t in known) if known else 1.0) + 1.0
+    keys, points, is_x, first, size = [], [], [], [], []
+    offset = 0
+    for t, table in enumerate(tables):
+        if table is None or not len(table.radii):
+            first.append(offset)
+            size.append(0)
+            continue
+        keys.append(table.radii + t * span)
+        points.append(table.points)
+        is_x.append(table.is_x)
+        first.append(offset)
+        size.append(len(table.radii))
+        offset += len(table.radii)
+    # a sentinel slot past the last ring: a miss
+    all_keys = np.concatenate(keys) if keys else np.empty(0)
+    all_points = np.concatenate(points + [np.zeros(1, dtype=np.int8)])
+    all_x = np.concatenate(is_x + [np.zeros(1, dtype=bool)])
+    first = np.array(first + [0], dtype=np.intp)
+    size = np.array(size + [0], dtype=np.intp)
+
+    code = np.where((target_code >= 0) & (target_code < len(tables)), target_code, len(tables))
+    # edge rule: the hole touches a ring when centre distance - bullet radius <= ring radius
+    reach = np.clip(np.hypot(x, y) - bullet_diameter_mm / 2.0, 0.0, span / 2.0)
+    ring = np.searchsorted(all_keys, reach + code * span, side="left") - first[code]
+    inside = ring < size[code]
+    slot = np.where(inside, first[code] + ring, len(all_points) - 1)
+
+    shot_points = all_points[slot]
+    shot_x = all_x[slot]
+    unknown = (size[code] == 0) | np.isnan(reach)
+    shot_points[unknown] = UNKNOWN_POINTS
+    shot_x[unknown] = False
+    return shot_points, shot_x
+
+
+def score_frame(df: pd.DataFrame, bullet_diameter_mm: float = DEFAULT_BULLET_DIAMETER_MM) -> pd.DataFrame:
+    """
+    Auto-score a shot table (a ShotStore's shots, a string's data, or many
+    strings concatenated) in one pass. Returns a DataFrame on the same index
+    with auto_points, auto_x and score_mismatch: True where the device
+    reported a numeric score that differs in points or X from the geometric one.
+    """
+    target_types = pd.Categorical(df["target_info"]) if "target_info" in df.columns else None
+    if target_types is not None:
+        tables = [ring_table(t) for t in target_types.categories]
+        codes = target_types.codes
+    else:
+        tables, codes = [], np.full(len(df), -1)
+    points, xs = score_shots(df["x_mm"].to_numpy(), df["y_mm"].to_numpy(), codes, tables, bullet_diameter_mm)
+
+    device_points, device_x = shot_scores(df)
+    # only shots with a device score and a known target are compared
+    compared = (device_points >= 0) & (points != UNKNOWN_POINTS)
+    mismatch = compared & ((device_points != points) | (device_x != xs))
+    return pd.DataFrame({AUTO_POINTS_COLUMN: points, AUTO_X_COLUMN: xs, MISMATCH_COLUMN: mismatch},
+                        index=df.index)
+
+
+def score_labels(points: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """Display labels for points and X flags: 'X', '10', '9', ..., '' for unknown."""
+    out = _POINT_LABELS[np.asarray(points, dtype=np.int8).astype(np.uint8)]
+    out[np.asarray(xs, dtype=bool)] = "X"
+    return out
+
+
+def device_score_labels(df: pd.DataFrame) -> np.ndarray:
+    """
+    The device's scores as display labels ('X' for x/v, '10' for '10.0',
+    other text unchanged), as decoded at ingest (shot_store.decode_scores).
+    """
+    return shot_score_labels(df)
+
+
+def _flat_shots(strings: List[Dict[str, Any]]) -> pd.DataFrame:
+    """The shots of many strings as one flat table with a 'string' position column."""
+    frames = [s["data"] for s in strings]
+    columns = {"string": np.repeat(np.arange(len(frames)), [len(df) for df in frames])}
+    for name in ("id", "score", "target_info", "x_mm", "y_mm", SCORE_POINTS_COLUMN, SCORE_X_COLUMN,
+                 SCORE_LABEL_COLUMN):
+        if all(name in df.columns for df in frames):
+            columns[name] = np.concatenate([df[name].to_numpy() for df in frames]) if frames else []
+    return pd.DataFrame(columns)
+
+
+def mismatches(strings: List[Dict[str, Any]], bullet_diameter_mm: float = DEFAULT_BULLET_DIAMETER_MM) -> pd.DataFrame:
+    """
+    Shots of parsed strings whose device score disagrees with the geometric
+    score, scored together in one pass: string position, shooter, course,
+    shot id, position, and both scores.
+    """
+    shots = _flat_shots(strings)
+    if len(shots) == 0:
+        return pd.DataFrame(columns=["string", "shooter", "course", "id", "x_mm", "y_mm", "device", "auto"])
+    scored = score_frame(shots, bullet_diameter_mm)
+    rows = shots[scored[MISMATCH_COLUMN].to_numpy()]
+    scored = scored.loc[rows.index]
+    positions = rows["string"].to_numpy()
+    return pd.DataFrame({
+        "string": positions,
+        "shooter": [strings[i].get("shooter", "") for i in positions],
+        "course": [strings[i].get("course", "") for i in positions],
+        "id": rows["id"].to_numpy(),
+        "x_mm": rows["x_mm"].to_numpy(),
+        "y_mm": rows["y_mm"].to_numpy(),
+        "device": device_score_labels(rows),
+        "auto": score_labels(scored[AUTO_POINTS_COLUMN].to_numpy(), scored[AUTO_X_COLUMN].to_numpy()),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score ShotMarker shots from their position and compare with the device.")
+    parser.add_argument("paths", nargs="+", help="ShotMarker CSV/XLSX exports")
+    parser.add_argument("--bullet-mm", type=float, default=DEFAULT_BULLET_DIAMETER_MM,
+                        help="bullet diameter for the edge rule (mm)")
+    args = parser.parse_args(argv)
+
+    from ingest import parse_stores
+
+    # load the specs before timing
+    get_registry().refresh()
+
+    contents = []
+    for path in args.paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    for path, store in zip(args.paths, parse_stores(contents)):
+        t0 = time.perf_counter()
+        scored = score_frame(store.shots, args.bullet_mm)
+        elapsed = time.perf_counter() - t0
+        compared = int((store.shots[SCORE_POINTS_COLUMN] >= 0).sum())
+        n_mismatch = int(scored[MISMATCH_COLUMN].sum())
+        print(f"{path}: {len(scored)} shots scored in {elapsed * 1000:.1f} ms, "
+              f"{n_mismatch} of {compared} disagree with the device")
+        if n_mismatch:
+            with pd.option_context("display.max_rows", 50, "display.width", 200):
+                print(mismatches(store.to_strings(), args.bullet_mm).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
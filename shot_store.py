@@ -0,0 +1,196 @@
+# shot_store.py
+"""
+Compact columnar storage for parsed shots.
+
+All shots of an export live in one shared table with narrow dtypes:
+categorical time, tags, id, score and target_info, the decoded score (int8
+points, an X flag and a categorical display label), and float32
+measurements. String-level metadata (date, shooter,
+rifle, course, relay, match, shooter_name, ...) is one row per string in a
+second table. Each string's 'data' DataFrame is a row slice of the shared
+table; with pandas copy-on-write the slices share its memory until written.
+"""
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Per-shot text columns stored as categoricals (a small code per shot)
+SHOT_CATEGORICAL_COLUMNS = ["time", "tags", "id", "score", "target_info"]
+# Per-shot measurements are stored with this dtype
+MEASUREMENT_DTYPE = np.float32
+# Columns of the shared shot table holding the score as a number
+SCORE_POINTS_COLUMN = "score_points"
+SCORE_X_COLUMN = "score_x"
+# Display form of the score: 'X' for x/v, '10' for '10.0', other text unchanged
+SCORE_LABEL_COLUMN = "score_label"
+# String-level columns kept in the strings table and in each string dict
+STRING_LEVEL_COLUMNS = ["relay", "match", "shooter_name"]
+# Row range of each string in the shot table
+_RANGE_COLUMNS = ["start", "stop"]
+
+
+def _category_score(label: Any) -> Tuple[int, bool, str]:
+    """(points, is X, display label) for one score label; -1 points when it is not a score."""
+    text = str(label).strip()
+    if text.upper() in ("X", "V"):
+        return 10, True, "X"
+    try:
+        points = int(float(text))
+    except ValueError:
+        return -1, False, text
+    return points, False, str(points)
+
+
+def decode_scores(scores: Any) -> Tuple[np.ndarray, np.ndarray, pd.Categorical]:
+    """
+    Score codec: int8 points, a boolean X flag and a categorical display
+    label for a score column (categorical or any array of score text).
+    Only the categories are parsed; shots map onto them through their codes,
+    so the cost per shot is three array lookups. Missing scores get -1
+    points and an empty label.
+    """
+    if not isinstance(scores, pd.Categorical):
+        scores = pd.Categorical(scores)
+    decoded = [_category_score(c) for c in scores.categories]
+    # one extra slot at the end for code -1 (missing)
+    points = np.array([p for p, _, _ in decoded] + [-1], dtype=np.int8)
+    xs = np.array([x for _, x, _ in decoded] + [False], dtype=bool)
+    # several raw categories ('x', 'X', 'V') share one display label
+    label_codes: Dict[str, int] = {}
+    codes_of_category = np.array([label_codes.setdefault(label, len(label_codes))
+                                  for label in [d[2] for d in decoded] + [""]], dtype=np.int32)
+    codes = scores.codes
+    labels = pd.Categorical.from_codes(codes_of_category[codes], categories=list(label_codes))
+    return points[codes], xs[codes], labels
+
+
+def score_points(scores: pd.Categorical) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 points and a boolean X flag for a categorical score column (see decode_scores)."""
+    points, xs, _ = decode_scores(scores)
+    return points, xs
+
+
+def shot_scores(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Points and X flags of a shot table: the columns decoded at ingest, or decoded now."""
+    if SCORE_POINTS_COLUMN in df.columns and SCORE_X_COLUMN in df.columns:
+        return df[SCORE_POINTS_COLUMN].to_numpy(), df[SCORE_X_COLUMN].to_numpy()
+    return score_points(df["score"])
+
+
+def shot_score_labels(df: pd.DataFrame) -> np.ndarray:
+    """Display labels (object array) of a shot table's scores, decoded at ingest or now."""
+    if SCORE_LABEL_COLUMN in df.columns:
+        return df[SCORE_LABEL_COLUMN].to_numpy(dtype=object)
+    return np.asarray(decode_scores(df["score"])[2], dtype=object)
+
+
+def add_score_columns(shots: pd.DataFrame) -> pd.DataFrame:
+    """
+    Decode the score of a shot table in place when its decoded columns are
+    missing or incomplete (e.g. tables archived before a column was added).
+    """
+    if "score" not in shots.columns:
+        return shots
+    complete = all(col in shots.columns for col in (SCORE_POINTS_COLUMN, SCORE_X_COLUMN, SCORE_LABEL_COLUMN))
+    if not complete or shots[SCORE_LABEL_COLUMN].isna().any():
+        shots[SCORE_POINTS_COLUMN], shots[SCORE_X_COLUMN], shots[SCORE_LABEL_COLUMN] = decode_scores(
+            shots["score"])
+    return shots
+
+
+def compact_columns(columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    Narrow a dict of per-shot arrays: text columns become categoricals,
+    float64 measurements float32, and the score is decoded once (decode_scores)
+    into int8 points, an X flag and a display label.
+    Other columns are passed through unchanged.
+    """
+    compact = {}
+    for col, values in columns.items():
+        if col in SHOT_CATEGORICAL_COLUMNS:
+            compact[col] = pd.Categorical(values)
+        elif values.dtype == np.float64:
+            compact[col] = values.astype(MEASUREMENT_DTYPE)
+        else:
+            compact[col] = values
+    if "score" in compact:
+        (compact[SCORE_POINTS_COLUMN], compact[SCORE_X_COLUMN],
+         compact[SCORE_LABEL_COLUMN]) = decode_scores(compact["score"])
+    return compact
+
+
+class ShotStore:
+    """
+    Shots of one export in one shared table plus a table of string metadata.
+
+    strings has one row per string: the header fields, unique_id, the
+    STRING_LEVEL_COLUMNS and the [start, stop) row range of its shots.
+    """
+
+    def __init__(self, strings: pd.DataFrame, shots: pd.DataFrame):
+        self.strings = strings
+        self.shots = shots
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def _slice(self, start: int, stop: int) -> pd.DataFrame:
+        view = self.shots.iloc[start:stop]
+        # setting the index on the slice is cheaper than reset_index(drop=True)
+        view.index = pd.RangeIndex(stop - start)
+        return view
+
+    def view(self, i: int) -> pd.DataFrame:
+        """Shot rows of string i, indexed from 0; shares memory with the store."""
+        return self._slice(int(self.strings["start"].iat[i]), int(self.strings["stop"].iat[i]))
+
+    def to_strings(self) -> List[Dict[str, Any]]:
+        """String dicts in the parse_shotmarker_csv layout, with views as 'data'."""
+        starts = self.strings["start"].to_numpy()
+        stops = self.strings["stop"].to_numpy()
+        records = self.strings.drop(columns=_RANGE_COLUMNS).to_dict("records")
+        all_strings = []
+        for record, start, stop in zip(records, starts, stops):
+            record["data"] = self._slice(int(start), int(stop))
+            all_strings.append(record)
+        return all_strings
+
+    def nbytes(self) -> Dict[str, int]:
+        """Memory held by the store, including the text of categories and metadata."""
+        shots = int(self.shots.memory_usage(index=True, deep=True).sum())
+        strings = int(self.strings.memory_usage(index=True, deep=True).sum())
+        return {"shots": shots, "strings": strings, "total": shots + strings}
+
+
+def text_columns_to_object(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn string columns read back from Parquet/Arrow into object columns with
+    None for nulls, as the parser produces them. Categoricals are left alone.
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if (pd.api.types.is_string_dtype(dtype) and dtype != object
+                and not isinstance(dtype, pd.CategoricalDtype)):
+            values = df[col].to_numpy(dtype=object, na_value=None)
+            df[col] = pd.Series(values, index=df.index, dtype=object)
+    return df
+
+
+def build_store(metadata: List[Dict[str, Any]], columns: Dict[str, Any], counts: np.ndarray) -> ShotStore:
+    """
+    Build a ShotStore from one metadata dict per string and per-shot columns
+    (see compact_columns) where string b owns the next counts[b] rows.
+    Strings without shots are dropped.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    keep = np.flatnonzero(counts)
+
+    # plain object columns: values come back as the same str / None objects
+    strings = pd.DataFrame([metadata[b] for b in keep], dtype=object)
+    strings["start"] = starts[keep]
+    strings["stop"] = stops[keep]
+    shots = pd.DataFrame(columns) if columns else pd.DataFrame()
+    return ShotStore(strings, shots)
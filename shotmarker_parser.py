@@ -1,164 +1,496 @@
 # shotmarker_parser.py
+import bisect
+import codecs
+import csv
+import datetime
+import io
 import re
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 
-def parse_shotmarker_csv(uploaded_file: Union[bytes, str, "UploadedFile"]) -> List[Dict[str, Any]]:
-    """
-    Parse the ShotMarker CSV file with multiple shooting strings.
-    Accepts bytes, str, or a file-like object with .getvalue().
-    Returns a list of dicts; each dict has metadata and a pandas DataFrame under 'data'.
-    """
-    # get text content
+from shot_store import ShotStore, build_store, compact_columns
+
+# month abbrev at line start followed by comma somewhere
+_HEADER_RE = re.compile(r'^[A-Z][a-z]{2}\b.*,\s*')
+# R or r followed immediately by one or more digits (relay), same for M/m (match)
+_RELAY_RE = re.compile(r'[Rr](\d+)')
+_MATCH_RE = re.compile(r'[Mm](\d+)')
+# rifle text between parentheses
+_RIFLE_RE = re.compile(r'\(([^)]+)\)')
+
+# Shot line layout: field 0 is unused, fields 1..12 map onto these columns
+SHOT_TEXT_COLUMNS = ["time", "tags", "id", "score"]
+SHOT_NUMERIC_COLUMNS = ["temp_c", "x_mm", "y_mm", "v_fps", "yaw_deg", "pitch_deg", "quality", "xy_err"]
+SHOT_COLUMNS = SHOT_TEXT_COLUMNS + SHOT_NUMERIC_COLUMNS
+_SHOT_FIELDS = len(SHOT_COLUMNS) + 1
+
+# Time formats tried before falling back to pandas' per-element inference
+TIME_FORMATS = ("%I:%M:%S %p", "%H:%M:%S")
+
+# XLSX workbooks are zip archives
+_XLSX_MAGIC = b"PK\x03\x04"
+
+# Bytes read per step by iter_shotmarker_strings: the first read is small so the
+# first strings come out quickly, later reads double up to STREAM_CHUNK_SIZE so
+# the per-batch parsing overhead is spread over more strings
+STREAM_FIRST_CHUNK_SIZE = 1 << 16
+STREAM_CHUNK_SIZE = 1 << 20
+# XLSX rows fed to the scanner per step by iter_shotmarker_strings
+_XLSX_BATCH_ROWS = 1000
+
+
+def _read_content(uploaded_file: Union[bytes, str, "UploadedFile"]) -> Union[bytes, str]:
+    """Return the raw content of bytes, str, or a file-like object with .getvalue()."""
     if hasattr(uploaded_file, "getvalue"):
         content = uploaded_file.getvalue()
         if isinstance(content, (bytes, bytearray)):
-            text = content.decode("utf-8", errors="replace")
-        else:
-            text = str(content)
-    elif isinstance(uploaded_file, (bytes, bytearray)):
-        text = uploaded_file.decode("utf-8", errors="replace")
-    elif isinstance(uploaded_file, str):
-        text = uploaded_file
-    else:
-        raise TypeError("Unsupported uploaded_file type")
+            return bytes(content)
+        return str(content)
+    if isinstance(uploaded_file, (bytes, bytearray)):
+        return bytes(uploaded_file)
+    if isinstance(uploaded_file, str):
+        return uploaded_file
+    raise TypeError("Unsupported uploaded_file type")
 
-    lines = text.splitlines()
 
-    all_strings = []
-    current_string = None
-    current_data = []
+def _clock_text(value: Union[datetime.time, datetime.datetime]) -> str:
+    """A time of day as the CSV export writes it: '9:01:05 am', '12:30:00 pm'."""
+    return f"{value.hour % 12 or 12}:{value:%M:%S} {'am' if value.hour < 12 else 'pm'}"
 
-    header_re = re.compile(r'^[A-Z][a-z]{2}\b.*,\s*')  # month abbrev at line start followed by comma somewhere
 
-    for line in lines:
+def _format_cell(value: Any) -> str:
+    """
+    Render an XLSX cell value the way it appears in a ShotMarker CSV export.
+    Integral floats lose their '.0' so scores and shot ids match the CSV text,
+    and times use the CSV's 12-hour clock.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, datetime.datetime):
+        date = f"{value:%b} {value.day} {value.year}"
+        if value.time() == datetime.time(0):
+            return date
+        return f"{date} {_clock_text(value)}"
+    if isinstance(value, datetime.time):
+        return _clock_text(value)
+    return str(value)
+
+
+def iter_xlsx_lines(source) -> Iterator[str]:
+    """
+    Stream the rows of every worksheet in an XLSX workbook as CSV-style lines.
+    The workbook is opened read-only, so rows are read one at a time from the
+    underlying XML instead of loading the whole workbook into memory.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Reading .xlsx files requires openpyxl (pip install openpyxl)") from e
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            for row in worksheet.iter_rows(values_only=True):
+                yield ",".join(_format_cell(v) for v in row)
+    finally:
+        workbook.close()
+
+
+def _parse_header(parts: List[str]) -> Dict[str, Any]:
+    """Build the string-level metadata dict from a split header line."""
+    # parse shooter/stage
+    shooter = ""
+    stage = ""
+    shooter_stage = parts[1] if parts[1] else ""
+    tokens = shooter_stage.split()
+    if tokens:
+        shooter = tokens[0]
+        stage = " ".join(tokens[1:]) if len(tokens) > 1 else ""
+
+    # Extract rifle text between parentheses
+    rifle_text = parts[2] if len(parts) > 2 else ""
+    rifle_match = _RIFLE_RE.search(rifle_text)
+    rifle = rifle_match.group(1) if rifle_match else rifle_text
+
+    return {
+        "date": parts[0],
+        "shooter": shooter or "Unknown",
+        "stage": stage or "",
+        "shooter_stage": shooter_stage,  # Store original for relay/match extraction
+        "rifle": rifle,
+        "target_info": parts[3] if len(parts) > 3 else "",
+        "course": parts[4] if len(parts) > 4 else "",
+        "score": parts[5] if len(parts) > 5 else "",
+    }
+
+
+def _string_columns(header: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Derive the per-string columns (relay, match, shooter_name) from a header dict.
+    Relay and match come from the original shooter_stage text; shooter_name is
+    the first word of the shooter concatenated with the rifle.
+    """
+    shooter_stage_text = header.get("shooter_stage", "")
+    relay_match = _RELAY_RE.search(shooter_stage_text)
+    match_match = _MATCH_RE.search(shooter_stage_text)
+
+    shooter_words = header.get("shooter", "").split()
+    shooter_first_word = shooter_words[0] if shooter_words else ""
+    rifle_text = header.get("rifle", "")
+    shooter_name = f"{shooter_first_word} {rifle_text}".strip() if shooter_first_word or rifle_text else ""
+
+    return {
+        "relay": relay_match.group(1) if relay_match else None,
+        "match": match_match.group(1) if match_match else None,
+        "shooter_name": shooter_name,
+    }
+
+
+def _is_number(text: str) -> bool:
+    """True if text converts cleanly to float."""
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+class StringBlockScanner:
+    """
+    Single-pass state machine that splits ShotMarker export lines into string blocks.
+
+    Header lines are parsed immediately (there is one per string); shot lines are
+    only collected together with the index of the block they belong to, so that
+    all shots of a file can be parsed in one vectorized call afterwards.
+    """
+
+    def __init__(self):
+        self.headers: List[Dict[str, Any]] = []
+        self.shot_lines: List[str] = []
+        self.shot_blocks: List[int] = []
+        self.max_fields = _SHOT_FIELDS
+        self._block_started = False
+
+    def feed(self, line: str) -> None:
+        """Consume one line of the export."""
         line = line.strip()
-        if not line or line.startswith("ShotMarker") or line.startswith("Exported"):
-            continue
+        if not line or line.startswith(("ShotMarker", "Exported")):
+            return
 
         # Check if this is a new string header
-        if header_re.match(line) and "," in line:
+        if _HEADER_RE.match(line):
             parts = [p.strip() for p in line.split(",")]
             if len(parts) >= 6:
-                # save previous
-                if current_string and current_data:
-                    current_string["data"] = pd.DataFrame(current_data)
-                    # Add relay, match, and shooter_name columns
-                    # Use shooter_stage (original full string) for relay/match extraction
-                    shooter_stage_text = current_string.get("shooter_stage", "")
-                    shooter_text = current_string.get("shooter", "")
-                    rifle_text = current_string.get("rifle", "")
-                    
-                    # Extract relay (R followed by number, case-insensitive, anywhere in string)
-                    # Pattern: R or r followed immediately by one or more digits
-                    relay_match = re.search(r'[Rr](\d+)', shooter_stage_text)
-                    relay = relay_match.group(1) if relay_match else None
-                    
-                    # Extract match (M followed by number, case-insensitive, anywhere in string)
-                    # Pattern: M or m followed immediately by one or more digits
-                    match_match = re.search(r'[Mm](\d+)', shooter_stage_text)
-                    match = match_match.group(1) if match_match else None
-                    
-                    # Extract first word of shooter and concatenate with rifle
-                    shooter_first_word = shooter_text.split()[0] if shooter_text.split() else ""
-                    shooter_name = f"{shooter_first_word} {rifle_text}".strip() if shooter_first_word or rifle_text else ""
-                    
-                    # Add columns to dataframe
-                    current_string["data"]["relay"] = relay
-                    current_string["data"]["match"] = match
-                    current_string["data"]["shooter_name"] = shooter_name
-                    
-                    # Create unique_id: total score + comma-separated individual shot scores
-                    current_string["unique_id"] = current_string["score"] + "," + ",".join([str(shot["score"]) for shot in current_data])
-                    all_strings.append(current_string)
-
-                # parse shooter/stage
-                shooter = ""
-                stage = ""
-                shooter_stage = parts[1] if parts[1] else ""
-                tokens = shooter_stage.split()
-                if tokens:
-                    shooter = tokens[0]
-                    stage = " ".join(tokens[1:]) if len(tokens) > 1 else ""
-
-                # Extract rifle text between parentheses
-                rifle_text = parts[2] if len(parts) > 2 else ""
-                rifle_match = re.search(r'\(([^)]+)\)', rifle_text)
-                rifle = rifle_match.group(1) if rifle_match else rifle_text
-                
-                current_string = {
-                    "date": parts[0],
-                    "shooter": shooter or "Unknown",
-                    "stage": stage or "",
-                    "shooter_stage": shooter_stage,  # Store original for relay/match extraction
-                    "rifle": rifle,
-                    "target_info": parts[3] if len(parts) > 3 else "",
-                    "course": parts[4] if len(parts) > 4 else "",
-                    "score": parts[5] if len(parts) > 5 else "",
-                }
-                current_data = []
-                continue
-
-        # parse shot data lines when inside a string
-        if current_string:
-            parts = [p.strip() for p in line.split(",")]
-            if len(parts) >= 13:
-                x_str, y_str = parts[6], parts[7]
-                if x_str and y_str:
-                    try:
-                        shot_data = {
-                            "time": parts[1],
-                            "tags": parts[2],
-                            "id": parts[3],
-                            "score": parts[4],
-                            "temp_c": float(parts[5]) if parts[5] else None,
-                            "x_mm": float(x_str),
-                            "y_mm": float(y_str),
-                            "v_fps": float(parts[8]) if parts[8] else None,
-                            "yaw_deg": float(parts[9]) if parts[9] else None,
-                            "pitch_deg": float(parts[10]) if parts[10] else None,
-                            "quality": float(parts[11]) if parts[11] else None,
-                            "xy_err": float(parts[12]) if parts[12] else None,
-                            "target_info": current_string.get("course", ""),
-                        }
-                        current_data.append(shot_data)
-                    except (ValueError, IndexError):
-                        # skip malformed shot lines
-                        continue
-
-    # final string
-    if current_string and current_data:
-        current_string["data"] = pd.DataFrame(current_data)
-        # Add relay, match, and shooter_name columns
-        # Use shooter_stage (original full string) for relay/match extraction
-        shooter_stage_text = current_string.get("shooter_stage", "")
-        shooter_text = current_string.get("shooter", "")
-        rifle_text = current_string.get("rifle", "")
-        
-        # Extract relay (R followed by number, case-insensitive, anywhere in string)
-        # Pattern: R or r followed immediately by one or more digits
-        relay_match = re.search(r'[Rr](\d+)', shooter_stage_text)
-        relay = relay_match.group(1) if relay_match else None
-        
-        # Extract match (M followed by number, case-insensitive, anywhere in string)
-        # Pattern: M or m followed immediately by one or more digits
-        match_match = re.search(r'[Mm](\d+)', shooter_stage_text)
-        match = match_match.group(1) if match_match else None
-        
-        # Extract first word of shooter and concatenate with rifle
-        shooter_first_word = shooter_text.split()[0] if shooter_text.split() else ""
-        shooter_name = f"{shooter_first_word} {rifle_text}".strip() if shooter_first_word or rifle_text else ""
-        
-        # Add columns to dataframe
-        current_string["data"]["relay"] = relay
-        current_string["data"]["match"] = match
-        current_string["data"]["shooter_name"] = shooter_name
-        
+                self.headers.append(_parse_header(parts))
+                self._block_started = False
+                return
+
+        # collect shot data lines when inside a string
+        if self.headers:
+            n_fields = line.count(",") + 1
+            if n_fields >= _SHOT_FIELDS:
+                if not self._block_started:
+                    # the first row after a header may be the column title row
+                    if not _is_number(line.split(",", 7)[6].strip()):
+                        return
+                    self._block_started = True
+                if n_fields > self.max_fields:
+                    self.max_fields = n_fields
+                self.shot_lines.append(line)
+                self.shot_blocks.append(len(self.headers) - 1)
+
+    def feed_lines(self, lines) -> "StringBlockScanner":
+        """Consume an iterable of lines and return self for chaining."""
+        feed = self.feed
+        for line in lines:
+            feed(line)
+        return self
+
+    def build(self) -> List[Dict[str, Any]]:
+        """Parse all collected shot lines at once and return the per-string dicts."""
+        return build_strings(self.headers, self.shot_lines, self.shot_blocks, self.max_fields)
+
+    def take_completed(self) -> Optional[Tuple[List[Dict[str, Any]], List[str], List[int], int]]:
+        """
+        Remove every block before the current one (a later header has been seen,
+        so no more shots can join them) and return them as build_strings
+        arguments, or None if only the current block is open.
+        """
+        done = len(self.headers) - 1
+        if done <= 0:
+            return None
+        # shot_blocks is non-decreasing, so the completed blocks' shots come first
+        split = bisect.bisect_left(self.shot_blocks, done)
+        completed = (self.headers[:done], self.shot_lines[:split], self.shot_blocks[:split], self.max_fields)
+        self.headers = self.headers[done:]
+        self.shot_lines = self.shot_lines[split:]
+        self.shot_blocks = [b - done for b in self.shot_blocks[split:]]
+        return completed
+
+
+def _read_shot_table(shot_lines: List[str], max_fields: int) -> pd.DataFrame:
+    """
+    Parse raw shot lines into a DataFrame with SHOT_COLUMNS in one read_csv call.
+    Rows with missing coordinates or malformed numeric fields are flagged through
+    a boolean '_valid' column so they can be skipped like the line-by-line parser did.
+    """
+    text = "\n".join(shot_lines)
+    field_ids = list(range(1, _SHOT_FIELDS))
+    numeric_ids = field_ids[len(SHOT_TEXT_COLUMNS):]
+    read_kwargs = dict(
+        header=None,
+        names=list(range(max_fields)),
+        usecols=field_ids,
+        quoting=csv.QUOTE_NONE,
+        skipinitialspace=True,
+        keep_default_na=False,
+        engine="c",
+    )
+
+    try:
+        # fast path: let the C parser convert the numeric columns directly
+        dtypes = {i: str for i in field_ids}
+        dtypes.update({i: "float64" for i in numeric_ids})
+        raw = pd.read_csv(io.StringIO(text), dtype=dtypes,
+                          na_values={i: [""] for i in numeric_ids}, **read_kwargs)
+        bad = np.zeros(len(raw), dtype=bool)
+    except ValueError:
+        # some numeric field is malformed: read as text and coerce column by column
+        raw = pd.read_csv(io.StringIO(text), dtype=str, **read_kwargs)
+        bad = np.zeros(len(raw), dtype=bool)
+        for i in numeric_ids:
+            col = raw[i].str.strip()
+            values = pd.to_numeric(col, errors="coerce")
+            bad |= (values.isna() & (col != "")).to_numpy()
+            raw[i] = values.astype("float64")
+
+    raw.columns = SHOT_COLUMNS
+    for col in SHOT_TEXT_COLUMNS:
+        raw[col] = raw[col].str.strip()
+    raw["_valid"] = ~bad & raw["x_mm"].notna().to_numpy() & raw["y_mm"].notna().to_numpy()
+    return raw
+
+
+def _time_between_shots(times: pd.Series, starts: np.ndarray) -> pd.Series:
+    """Time delta to the previous shot, restarting at zero at every string start."""
+    parsed = None
+    non_empty = times != ""
+    for fmt in TIME_FORMATS:
+        candidate = pd.to_datetime(times, format=fmt, errors="coerce")
+        if candidate.notna().sum() == non_empty.sum():
+            parsed = candidate
+            break
+    if parsed is None:
+        parsed = pd.to_datetime(times, errors="coerce")
+
+    deltas = parsed.diff()
+    deltas.iloc[starts] = pd.NaT
+    return deltas.fillna(pd.Timedelta(0))
+
+
+def build_shot_columns(headers: List[Dict[str, Any]], shot_lines: List[str],
+                       shot_blocks: List[int], max_fields: int = _SHOT_FIELDS) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Parse all collected shot lines in one columnar pass.
+    Returns (columns, counts): one array per output column covering every valid
+    shot of the file in order, and the number of valid shots per header.
+    Columns are already narrowed by shot_store.compact_columns (categorical text,
+    float32 measurements), so this form also pickles compactly between processes.
+    """
+    counts = np.zeros(len(headers), dtype=np.int64)
+    if not headers or not shot_lines:
+        return {}, counts
+
+    raw = _read_shot_table(shot_lines, max_fields)
+    valid = raw.pop("_valid").to_numpy()
+    blocks = np.asarray(shot_blocks, dtype=np.int64)[valid]
+    if len(blocks) == 0:
+        return {}, counts
+
+    # blocks are increasing, so each string is one contiguous run of rows
+    counts = np.bincount(blocks, minlength=len(headers))
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    present = np.flatnonzero(counts)
+
+    columns = {}
+    for col in SHOT_TEXT_COLUMNS:
+        columns[col] = raw[col].to_numpy(dtype=object)[valid]
+    for col in SHOT_NUMERIC_COLUMNS:
+        columns[col] = raw[col].to_numpy()[valid]
+    columns["target_info"] = np.array([h.get("course", "") for h in headers], dtype=object)[blocks]
+    times = pd.Series(columns["time"], dtype=object)
+    columns["time_between_shots"] = _time_between_shots(times, starts[present]).to_numpy()
+    return compact_columns(columns), counts
+
+
+def store_from_columns(headers: List[Dict[str, Any]], columns: Dict[str, Any],
+                       counts: np.ndarray) -> ShotStore:
+    """
+    Build the ShotStore for build_shot_columns output: the shared shot table
+    plus one metadata row per string (header fields, unique_id, relay, match
+    and shooter_name). Strings without any valid shot are dropped.
+    """
+    counts = np.asarray(counts)
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    shot_scores = np.asarray(columns["score"], dtype=object).tolist() if columns else []
+
+    metadata = []
+    for b, header in enumerate(headers):
+        string_meta = dict(header)
         # Create unique_id: total score + comma-separated individual shot scores
-        current_string["unique_id"] = current_string["score"] + "," + ",".join([str(shot["score"]) for shot in current_data])
-        # Calculate time between shots and add to DataFrame (if needed)
-        # Convert time column to datetime if it's not already, then calculate diff
-        current_string["data"]["time_between_shots"] = pd.to_datetime(current_string["data"]["time"], errors='coerce').diff().fillna(0)
-        all_strings.append(current_string)
+        string_meta["unique_id"] = header["score"] + "," + ",".join(shot_scores[starts[b]:stops[b]])
+        string_meta.update(_string_columns(header))
+        metadata.append(string_meta)
+    return build_store(metadata, columns, counts)
+
+
+def strings_from_columns(headers: List[Dict[str, Any]], columns: Dict[str, Any],
+                         counts: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Build the list of string dicts from build_shot_columns output.
+    Each string's 'data' is a view of one shared shot table; strings without
+    any valid shot are dropped.
+    """
+    if not columns:
+        return []
+    return store_from_columns(headers, columns, counts).to_strings()
+
+
+def build_strings(headers: List[Dict[str, Any]], shot_lines: List[str],
+                  shot_blocks: List[int], max_fields: int = _SHOT_FIELDS) -> List[Dict[str, Any]]:
+    """Turn scanned headers and shot lines into the list of string dicts."""
+    columns, counts = build_shot_columns(headers, shot_lines, shot_blocks, max_fields)
+    return strings_from_columns(headers, columns, counts)
+
+
+def scan_content(content: Union[bytes, str]) -> StringBlockScanner:
+    """
+    Run the string-block scanner over raw file content.
+    XLSX workbooks are detected by content and streamed row by row; anything
+    else is decoded as UTF-8 text.
+    """
+    scanner = StringBlockScanner()
+    if isinstance(content, bytes) and content.startswith(_XLSX_MAGIC):
+        scanner.feed_lines(iter_xlsx_lines(io.BytesIO(content)))
+    else:
+        text = content.decode("utf-8", errors="replace") if isinstance(content, bytes) else content
+        scanner.feed_lines(text.splitlines())
+    return scanner
+
+
+def parse_shotmarker_csv(uploaded_file: Union[bytes, str, "UploadedFile"]) -> List[Dict[str, Any]]:
+    """
+    Parse the ShotMarker CSV file with multiple shooting strings.
+    Accepts bytes, str, or a file-like object with .getvalue().
+    XLSX workbooks are detected by content and streamed row by row through the
+    same string-block scanner as CSV text.
+    Returns a list of dicts; each dict has metadata and a pandas DataFrame under 'data'.
+    """
+    return scan_content(_read_content(uploaded_file)).build()
+
+
+class LineSplitter:
+    """
+    Splits a stream of text or UTF-8 byte chunks into complete lines. Bytes go
+    through an incremental decoder, so a character split between two chunks is
+    decoded whole, and a partial last line is held back until the next chunk.
+    """
+
+    def __init__(self):
+        self._decode = None
+        self._carry = ""
+
+    def feed(self, chunk: Union[bytes, str]) -> List[str]:
+        """The lines completed by chunk (with their line endings)."""
+        if isinstance(chunk, (bytes, bytearray)):
+            if self._decode is None:
+                self._decode = codecs.getincrementaldecoder("utf-8")(errors="replace").decode
+            chunk = self._decode(chunk)
+        lines = (self._carry + chunk).splitlines(True)
+        # hold back an unterminated line, or one ending in '\r' that a '\n' may still follow
+        last = lines[-1] if lines else ""
+        self._carry = lines.pop() if last and (last.endswith("\r") or last.splitlines()[0] == last) else ""
+        return lines
+
+    def flush(self) -> List[str]:
+        """The held-back last line at the end of the stream, if any."""
+        tail = self._carry + (self._decode(b"", True) if self._decode else "")
+        self._carry = ""
+        return tail.splitlines()
+
+
+def _iter_text_lines(first_chunk: Union[bytes, str], read, chunk_size: int) -> Iterator[List[str]]:
+    """
+    Lines of a text or UTF-8 byte stream, one list per chunk read (see
+    LineSplitter). Chunks grow from len(first_chunk) by doubling up to chunk_size.
+    """
+    splitter = LineSplitter()
+    chunk = first_chunk
+    size = max(len(first_chunk), 1)
+    while chunk:
+        lines = splitter.feed(chunk)
+        if lines:
+            yield lines
+        size = min(size * 2, chunk_size)
+        chunk = read(size)
+    lines = splitter.flush()
+    if lines:
+        yield lines
+
+
+def _iter_row_batches(lines: Iterator[str], size: int) -> Iterator[List[str]]:
+    """Group an iterator of lines into lists of up to size lines."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_shotmarker_strings(source, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Parse a ShotMarker export incrementally, yielding each string dict as soon
+    as the next string's header (or the end of the file) has been read.
+
+    source is a binary or text file-like object with .read(), or bytes / str.
+    Bytes are read in chunks of STREAM_FIRST_CHUNK_SIZE growing to chunk_size
+    and decoded with an incremental UTF-8 decoder, so only the current chunk
+    and the strings still being parsed are held in memory. The shots of all
+    strings completed within one chunk are parsed together; each batch gets
+    its own shot store. XLSX workbooks are streamed row by row (openpyxl
+    needs a seekable file, so a non-seekable stream is read whole first).
+
+    Yields the same dicts, in the same order, as parse_shotmarker_csv.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif isinstance(source, str):
+        source = io.StringIO(source)
+
+    first = source.read(min(STREAM_FIRST_CHUNK_SIZE, chunk_size))
+    if isinstance(first, (bytes, bytearray)) and first.startswith(_XLSX_MAGIC):
+        if hasattr(source, "seekable") and source.seekable():
+            source.seek(0)
+        else:
+            source = io.BytesIO(bytes(first) + source.read())
+        batches = _iter_row_batches(iter_xlsx_lines(source), _XLSX_BATCH_ROWS)
+    else:
+        batches = _iter_text_lines(first, source.read, chunk_size)
 
-    return all_strings
\ No newline at end of file
+    scanner = StringBlockScanner()
+    for lines in batches:
+        scanner.feed_lines(lines)
+        completed = scanner.take_completed()
+        if completed is not None:
+            yield from build_strings(*completed)
+    yield from scanner.build()
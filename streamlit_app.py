@@ -1,399 +1,726 @@
+import os
+
+# The app only renders off-screen, so fix matplotlib to Agg before anything can
+# import it (it is imported lazily, on the first target plot)
+os.environ["MPLBACKEND"] = "Agg"
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import io
+import time
 
-from shotmarker_parser import parse_shotmarker_csv
-from plot_target import plot_target_with_scores
-from score_parser import parse_scores_csv
+from archive import get_archive
+from parse_cache import get_parse_cache
+from matching import link_scores, unmatched_strings
+from enrichment import strings_index, enrich_scores, scores_by_id, attach_scores, find_user_column
+from group_stats import strings_stats, groups_summary, format_stats
+from scoring import (
+    DEFAULT_BULLET_DIAMETER_MM,
+    AUTO_POINTS_COLUMN,
+    AUTO_X_COLUMN,
+    MISMATCH_COLUMN,
+    score_frame,
+    score_labels,
+    device_score_labels,
+    mismatches,
+)
 from app_utils import (
+    StageTimer,
     create_shooter_report,
     get_match_number,
-    _to_int_score,
-    _display_score
 )
+from live_feed import LIVE_FILE_ENV, LIVE_PORT_ENV, get_live_feed
+from trends import get_trend_index
+from density import store_shots, strings_shots
+from interactive_target import interactive_target
+from drift import LiveDrift, strings_drift
 
-# Must be the first Streamlit call in the file (move this right after `import streamlit as st`)
-st.set_page_config(page_title="MRPC Shotmarker Data Explorer", layout="wide")
+# The live feed panel is refreshed this often; only changed strings are redrawn
+LIVE_REFRESH_SECONDS = 1.0
+# Most recently changed live strings shown
+LIVE_SHOWN = 12
+# Groups drawn per page; plots and tables are only built for the current page
+GROUPS_PER_PAGE = 5
+# Interactions listed in the debug sidebar
+DEBUG_INTERACTIONS = 20
 
-st.title("MRPC Shotmarker Data Explorer")
-st.write(
-    "Upload your MRPC shotmarker data files to visualize and analyze your shooting sessions."
-)
 
-# optional CSS to ensure the block container uses full width
-st.markdown("<style>div.block-container{padding-left:1rem;padding-right:1rem;max-width:100%;}</style>", unsafe_allow_html=True)
+def target_png(string):
+    """
+    PNG of a string's target plot. Plots are cached as PNG bytes, so reruns do
+    not redraw them; render_cache (and with it matplotlib) is imported on first use.
+    """
+    from render_cache import get_render_cache
+    return get_render_cache().target_png(string)
 
-uploaded_files = st.sidebar.file_uploader(
-    "Choose MRPC shotmarker data files", accept_multiple_files=True, type=["csv", "xlsx"]
-)
 
-# Second upload button for scores CSV
-scores_uploaded_file = st.sidebar.file_uploader(
-    "Choose scores CSV file", accept_multiple_files=False, type=["csv"]
-)
+def density_png(shots, title):
+    """PNG of many shots as a density over their target's rings, cached like target_png."""
+    from render_cache import get_render_cache
+    return get_render_cache().density_png(shots, title)
+
 
-# Process scores CSV file if uploaded (display above shot strings)
-df_scores = None
-user_mapping = {}
-if scores_uploaded_file:
-    st.header("Scores Data")
+def conditions_chart(conditions, value):
+    """Line chart of one condition column (wind_moa / elevation_moa) over the time of day, a line per relay."""
+    chart = conditions.pivot_table(index='seconds', columns='relay_key', values=value)
+    chart.index = pd.to_datetime(chart.index, unit='s')
+    chart.index.name = 'time'
+    st.line_chart(chart, height=220)
+
+
+def drift_section(result, strings):
+    """
+    The conditions each relay shared and every string's drift: the relay's
+    wind and elevation over time, and per string how closely its drift
+    followed the other shooters' (corr) and what was left to the shooter (SD).
+    """
+    st.header("Wind and elevation drift")
+    relays = sorted(result.conditions['relay_key'].unique())
+    if not relays:
+        st.caption("No strings with a relay, match and shot times")
+        return
+    relay = st.selectbox("Relay", relays, key='drift_relay')
+    conditions = result.conditions[result.conditions['relay_key'] == relay]
+    left_col, right_col = st.columns(2)
+    with left_col:
+        st.caption("Relay wind (MOA, right positive)")
+        conditions_chart(conditions, 'wind_moa')
+    with right_col:
+        st.caption("Relay elevation (MOA, up positive)")
+        conditions_chart(conditions, 'elevation_moa')
+    members = np.flatnonzero((result.strings['relay_key'] == relay).to_numpy())
+    table = result.strings.iloc[members].drop(columns=['unique_id', 'relay_key'])
+    table.insert(0, 'shooter', [strings[i]['shooter'] for i in members])
+    table.insert(1, 'course', [strings[i]['course'] for i in members])
+    st.caption("corr: how closely a string's drift followed the rest of the relay; "
+               "shooter SD: the drift that was left once the relay's is taken out")
+    st.dataframe(table, width='stretch', hide_index=True)
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_panel(path, port, show_drift=False):
+    """
+    Strings from the live feed, most recently changed first. Only strings that
+    changed since this session's last refresh are drawn again; the others
+    reuse their PNG from the session state. With show_drift the relays'
+    conditions are charted too, recomputed only for relays that got shots.
+    """
+    feed = get_live_feed()
     try:
-        df_scores = parse_scores_csv(scores_uploaded_file)
-        
-        # Add relay, match, and target columns if they don't exist
-        if 'relay' not in df_scores.columns:
-            df_scores['relay'] = ''
-        if 'match_id' not in df_scores.columns:
-            df_scores['match_id'] = ''
-        if 'target' not in df_scores.columns:
-            df_scores['target'] = ''
-        
-        st.write(f"Loaded {len(df_scores)} rows from {scores_uploaded_file.name}")
-        st.dataframe(df_scores, use_container_width=True)
-        
-        # Create mapping from uniq_id to user column
-        # Try common column names for user
-        user_col = None
-        for col_name in ['user', 'User', 'USER']:
-            if col_name in df_scores.columns:
-                user_col = col_name
-                break
-        
-        if user_col:
-            user_mapping = dict(zip(df_scores['uniq_id'], df_scores[user_col]))
-        else:
-            st.warning("Could not find 'user' column in scores CSV. Available columns: " + ", ".join(df_scores.columns))
-        
-        # Optionally show raw data toggle
-        if st.checkbox("Show Raw Data Info", key="scores_raw_data"):
-            st.subheader("DataFrame Info")
-            st.write(f"Shape: {df_scores.shape}")
-            st.write(f"Columns: {list(df_scores.columns)}")
-    except Exception as e:
-        st.error(f"Error processing scores CSV file: {str(e)}")
-
-if uploaded_files:
+        if path:
+            feed.tail(path)
+        if port:
+            feed.listen(port)
+    except OSError as e:
+        st.error(f"Live feed: {e}")
+        return
+
+    store = feed.store
+    pngs = st.session_state.setdefault("live_pngs", {})
+    seen = st.session_state.get("live_version", 0)
+    # one snapshot, so every string shown below has had its PNG drawn even
+    # when the feed thread adds strings while this refresh renders
+    changed, live_strings, version = store.snapshot(seen)
+    for string in changed:
+        key = string['live_key']
+        pngs[key] = target_png(string)
+        # the first refresh of a session draws the backlog, which is not a shot's latency
+        if seen:
+            store.record_latency(key)
+    st.session_state["live_version"] = version
+
+    latency = store.latency_stats()
+    st.header("Live feed")
+    caption = f"{len(live_strings)} strings, {len(changed)} redrawn in this refresh"
+    if latency["count"]:
+        caption += (f"; shot line to plot: median {latency['p50_ms']:.0f} ms, "
+                    f"95% {latency['p95_ms']:.0f} ms over {latency['count']} updates")
+    st.caption(caption)
+    if show_drift:
+        tracker = st.session_state.setdefault("live_drift", LiveDrift())
+        tracker.update(store)
+        conditions = tracker.result().conditions
+        if len(conditions):
+            left_col, right_col = st.columns(2)
+            with left_col:
+                st.caption("Relay wind (MOA)")
+                conditions_chart(conditions, 'wind_moa')
+            with right_col:
+                st.caption("Relay elevation (MOA)")
+                conditions_chart(conditions, 'elevation_moa')
+    for string in live_strings[::-1][:LIVE_SHOWN]:
+        df = string['data']
+        left_col, right_col = st.columns([1, 4])
+        with left_col:
+            st.image(pngs[string['live_key']], width="stretch")
+        with right_col:
+            st.write(f"{string['shooter']} - {string['course']}, {len(df)} shots, Score: {string['score']}")
+            st.dataframe(pd.DataFrame([df['id'].to_numpy(), device_score_labels(df), df['time'].to_numpy()],
+                                      index=["Shot Number", "Score", "Time"]),
+                         width='content', hide_index=False)
+    st.divider()
+
+
+def upload_key(uploaded_file):
+    """Identity of an uploaded file; a new upload of the same name gets a new one."""
+    if uploaded_file is None:
+        return None
+    return getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+
+
+def get_grouping_key(string, scores_lookup):
+    """
+    Get the grouping key (user, relay, target) for a string.
+    Returns a tuple: (user, relay, target)
+    """
+    unique_id = string.get('unique_id', '')
+    
+    # Get values from scores lookup if available
+    user_val = string.get('shooter', 'Unknown')  # Already updated from scores
+    relay_val = ''
+    target_val = string.get('rifle', '')  # Default to rifle from shotmarker
+    
+    if unique_id and unique_id in scores_lookup:
+        scores_row = scores_lookup[unique_id]
+        # Get relay from scores (prefer scores over shotmarker)
+        relay_val = scores_row.get('relay', '') or ''
+        # Get target from scores if available, otherwise use rifle
+        target_val = scores_row.get('target', '') or string.get('rifle', '')
+    
+    # Normalize empty values
+    user_val = user_val or 'Unknown'
+    relay_val = relay_val or ''
+    target_val = target_val or ''
+    
+    return (user_val, relay_val, target_val)
+
+
+def build_model(uploaded_files, scores_uploaded_file, include_history):
+    """
+    Parse, enrich and group everything for one set of uploads. The model is
+    kept in the session state and reused by every rerun until the uploads or
+    the history checkbox change, so widget changes do not repeat any of it.
+    Archive writes happen here too, once per upload set.
+    """
+    parse_cache = get_parse_cache()
+    archive = get_archive()
+    model = {
+        'scores_raw': None, 'scores_error': None, 'user_col': None,
+        'strings': [], 'df_scores': None, 'match_report': None, 'orphan_strings': [],
+        'archived_count': 0, 'history_count': 0,
+        # score mismatches by bullet diameter, filled in on first display
+        'mismatches': {},
+        # wind / elevation drift of every string, computed when first shown
+        'drift': None,
+    }
+
+    # Process scores CSV file if uploaded
+    df_scores = None
+    if scores_uploaded_file:
+        try:
+            df_scores = parse_cache.scores(scores_uploaded_file)
+            # Add relay, match, and target columns if they don't exist
+            for col in ('relay', 'match_id', 'target'):
+                if col not in df_scores.columns:
+                    df_scores[col] = ''
+            model['user_col'] = find_user_column(df_scores)
+        except Exception as e:
+            model['scores_error'] = str(e)
+            df_scores = None
+    model['scores_raw'] = df_scores
+
+    if df_scores is None and include_history:
+        # without an uploaded scores CSV, the archived (already enriched) scores are used
+        df_scores = archive.load_scores()
+    model['df_scores'] = df_scores
+    if not (uploaded_files or include_history):
+        return model
+
     # Collect all strings from all uploaded files
+    # files not in the parse cache are parsed in parallel across a process pool
     all_strings = []
-    for uploaded_file in uploaded_files:
-        strings = parse_shotmarker_csv(uploaded_file)
-        all_strings.extend(strings)
-    
+    stores = parse_cache.shotmarker_stores(uploaded_files or [])
+    for store in stores:
+        all_strings.extend(store.to_strings())
+
+    if archive is not None:
+        # only strings whose unique_id is not archived yet are written
+        model['archived_count'] = sum(archive.append_store(store) for store in stores)
+        # the trend index, once built, follows the archive by adding the same stores
+        trend_index = get_trend_index(build=False)
+        for store in stores if trend_index is not None else []:
+            trend_index.append(store)
+        if include_history:
+            uploaded_ids = {string['unique_id'] for string in all_strings}
+            history = [string for string in archive.load_store().to_strings()
+                       if string['unique_id'] not in uploaded_ids]
+            all_strings.extend(history)
+            model['history_count'] = len(history)
+
     # ============================================================================
-    # STEP 1: Create comprehensive mapping from shotmarker strings to metadata
+    # STEP 1: Index the shotmarker strings by unique_id
     # ============================================================================
-    # Build a single mapping dictionary with all metadata for each unique_id
-    # This is more efficient than creating separate mappings and extracting from DataFrames
-    shotmarker_metadata = {}
-    for string in all_strings:
-        unique_id = string.get('unique_id', '')
-        if not unique_id:
-            continue
-        
-        # Extract relay and match from DataFrame (all rows have same values)
-        relay = None
-        match_id = None
-        if 'data' in string and string['data'] is not None:
-            if 'relay' in string['data'].columns:
-                relay_vals = string['data']['relay'].dropna().unique()
-                relay = relay_vals[0] if len(relay_vals) > 0 else None
-            if 'match' in string['data'].columns:
-                match_vals = string['data']['match'].dropna().unique()
-                match_id = match_vals[0] if len(match_vals) > 0 else None
-        
-        shotmarker_metadata[unique_id] = {
-            'relay': relay,
-            'match_id': match_id,
-            'target': string.get('rifle', ''),
-            'shooter': string.get('shooter', ''),
-            'string_data': string  # Keep reference to full string for later merging
-        }
-    
+    # One row per string with its relay, match, target (rifle) and shooter
+    index = strings_index(all_strings)
+
     # ============================================================================
     # STEP 2: Enrich scores DataFrame with shotmarker metadata
     # ============================================================================
     if df_scores is not None and 'uniq_id' in df_scores.columns:
-        # Ensure required columns exist
-        for col in ['relay', 'match_id', 'target']:
-            if col not in df_scores.columns:
-                df_scores[col] = ''
-        
-        # Map shotmarker metadata to scores DataFrame in one pass
-        def get_metadata_value(uniq_id, key):
-            """Helper to safely get metadata value"""
-            metadata = shotmarker_metadata.get(uniq_id, {})
-            return metadata.get(key, '')
-        
-        # Apply mappings efficiently
-        df_scores['relay'] = df_scores['uniq_id'].apply(lambda x: get_metadata_value(x, 'relay') or '')
-        df_scores['match_id'] = df_scores['uniq_id'].apply(lambda x: get_metadata_value(x, 'match_id') or '')
-        df_scores['target'] = df_scores['uniq_id'].apply(lambda x: get_metadata_value(x, 'target') or '')
-        
-        # Forward-fill missing values: match_id by match group, relay/target by user group
-        # Use pandas ffill/bfill which is more efficient than custom lambda functions
-        if 'match' in df_scores.columns and 'match_id' in df_scores.columns:
-            # Replace empty strings with NaN for forward-fill
-            df_scores['match_id'] = df_scores['match_id'].replace('', pd.NA)
-            # Forward-fill within each match group
-            df_scores['match_id'] = df_scores.groupby('match')['match_id'].ffill().bfill()
-            df_scores['match_id'] = df_scores['match_id'].fillna('')
-        
-        if 'user' in df_scores.columns:
-            for col in ['relay', 'target']:
-                if col in df_scores.columns:
-                    df_scores[col] = df_scores[col].replace('', pd.NA)
-                    # Forward-fill within each user group
-                    df_scores[col] = df_scores.groupby('user')[col].ffill().bfill()
-                    df_scores[col] = df_scores[col].fillna('')
-        
-        # Display updated df_scores after population
-        st.subheader("Updated Scores Data (After Merging)")
-        st.write(f"Updated {len(df_scores)} rows with relay, match_id, and target data")
-        st.dataframe(df_scores, use_container_width=True)
-    
+        # link score rows whose uniq_id differs from the string's only by
+        # formatting, sighters or a shot or two; the joins below are then exact
+        df_scores, match_report = link_scores(all_strings, df_scores)
+        model['match_report'] = match_report
+        model['orphan_strings'] = unmatched_strings(all_strings, match_report)
+        # one hash join of the scores' uniq_id against the strings index, then
+        # missing values are filled within each match / user group
+        df_scores = enrich_scores(df_scores, index)
+        if archive is not None and scores_uploaded_file:
+            archive.append_scores(df_scores)
+        model['df_scores'] = df_scores
+
     # ============================================================================
     # STEP 3: Update shooter names and merge scores data into shotmarker strings
     # ============================================================================
-    # Create a lookup dictionary from scores DataFrame for efficient access
-    scores_lookup = {}
-    user_col = None  # Initialize outside the if block
-    
-    if df_scores is not None and 'uniq_id' in df_scores.columns:
-        # Standardize column name for user lookup
-        for col_name in ['user', 'User', 'USER']:
-            if col_name in df_scores.columns:
-                user_col = col_name
-                break
-        
-        # Create lookup: uniq_id -> row data (as dict for easy access)
-        for _, row in df_scores.iterrows():
-            uniq_id = row['uniq_id']
-            if uniq_id:
-                scores_lookup[uniq_id] = row.to_dict()
-    
-    # Update shotmarker strings with user data and merge scores
-    for string in all_strings:
-        unique_id = string.get('unique_id', '')
-        if not unique_id or unique_id not in scores_lookup:
-            continue
-        
-        scores_row = scores_lookup[unique_id]
-        
-        # Update shooter name from scores CSV
-        user_from_scores = scores_row.get(user_col, '') if user_col else ''
-        if user_from_scores:
-            string['shooter'] = user_from_scores
-            rifle_from_shotmarker = string.get('rifle', '')
-            new_shooter_name = f"{user_from_scores} {rifle_from_shotmarker}".strip()
-            
-            # Update shooter_name in DataFrame
-            if 'data' in string and string['data'] is not None and 'shooter_name' in string['data'].columns:
-                string['data']['shooter_name'] = new_shooter_name
-        
-        # Merge scores data into shotmarker DataFrame
-        if 'data' in string and string['data'] is not None:
-            # Add unique_id to shotmarker DataFrame for reference
-            df_shotmarker = string['data'].copy()
-            df_shotmarker['unique_id'] = unique_id
-            
-            # Convert scores row to DataFrame and merge
-            df_scores_row = pd.DataFrame([scores_row])
-            # Rename uniq_id to unique_id for consistent merging
-            if 'uniq_id' in df_scores_row.columns:
-                df_scores_row = df_scores_row.rename(columns={'uniq_id': 'unique_id'})
-            
-            # Merge: use left join to keep all shotmarker rows, add scores columns
-            df_combined = pd.merge(
-                df_shotmarker, 
-                df_scores_row, 
-                on='unique_id', 
-                how='left', 
-                suffixes=('', '_scores')
-            )
-            string['data'] = df_combined
+    # Lookup from uniq_id to score row, used for grouping and display below
+    scores_lookup = scores_by_id(df_scores)
+
+    # Shooter names come from the scores CSV; score columns are added to every
+    # shot of the matched strings in one pass
+    attach_scores(all_strings, df_scores)
+
+    # Group size, mean radius, centroid and velocity statistics of every
+    # string, computed in one vectorized pass (record shots only)
+    stats_table = strings_stats(all_strings)
 
-        
-    
     # ============================================================================
     # STEP 4: Group strings by user, relay (from scores), and target
     # ============================================================================
-    def get_grouping_key(string):
-        """
-        Get the grouping key (user, relay, target) for a string.
-        Returns a tuple: (user, relay, target)
-        """
-        unique_id = string.get('unique_id', '')
-        
-        # Get values from scores lookup if available
-        user_val = string.get('shooter', 'Unknown')  # Already updated from scores
-        relay_val = ''
-        target_val = string.get('rifle', '')  # Default to rifle from shotmarker
-        
-        if unique_id and unique_id in scores_lookup:
-            scores_row = scores_lookup[unique_id]
-            # Get relay from scores (prefer scores over shotmarker)
-            relay_val = scores_row.get('relay', '') or ''
-            # Get target from scores if available, otherwise use rifle
-            target_val = scores_row.get('target', '') or string.get('rifle', '')
-        
-        # Normalize empty values
-        user_val = user_val or 'Unknown'
-        relay_val = relay_val or ''
-        target_val = target_val or ''
-        
-        return (user_val, relay_val, target_val)
-    
-    # Group strings by (user, relay, target)
     strings_by_group = {}
+    string_groups = []
     for string in all_strings:
-        group_key = get_grouping_key(string)
-        if group_key not in strings_by_group:
-            strings_by_group[group_key] = []
-        strings_by_group[group_key].append(string)
-    
+        group_key = get_grouping_key(string, scores_lookup)
+        string_groups.append(group_key)
+        strings_by_group.setdefault(group_key, []).append(string)
+
     # Sort strings within each group by match number
     for group_key in strings_by_group:
         strings_by_group[group_key].sort(key=get_match_number)
-    
+
     # Sort groups: first by user, then by relay, then by target
     sorted_groups = sorted(strings_by_group.keys(), key=lambda x: (x[0], x[1] or '', x[2] or ''))
+
+    # Create display labels for groups
+    group_labels = []
+    for user, relay, target in sorted_groups:
+        parts = [f"{user}"]
+        if relay:
+            parts.append(f"Relay: {relay}")
+        if target:
+            parts.append(f"Target: {target}")
+        group_labels.append(" | ".join(parts))
+
+    # One compact row per group, all groups in one vectorized pass
+    group_position = {group_key: i for i, group_key in enumerate(sorted_groups)}
+    summary = groups_summary(all_strings, [group_position[g] for g in string_groups],
+                             len(sorted_groups), stats_table)
+    summary.insert(0, 'page', [1 + i // GROUPS_PER_PAGE for i in range(len(sorted_groups))])
+    summary.insert(1, 'user', [g[0] for g in sorted_groups])
+    summary.insert(2, 'relay', [g[1] for g in sorted_groups])
+    summary.insert(3, 'target', [g[2] for g in sorted_groups])
+
+    model.update(
+        strings=all_strings,
+        scores_lookup=scores_lookup,
+        string_stats={id(string): row for string, row in zip(all_strings, stats_table.to_dict('records'))},
+        strings_by_group=strings_by_group,
+        sorted_groups=sorted_groups,
+        group_labels=group_labels,
+        summary=summary,
+    )
+    return model
+
+
+def record_interaction(label, seconds):
+    """Keep the server time of an interaction for the debug sidebar (most recent last)."""
+    interactions = st.session_state.setdefault('interactions', [])
+    interactions.append((label, seconds * 1000.0))
+    del interactions[:-DEBUG_INTERACTIONS]
+
+
+@st.fragment
+def string_block(string, stats_row, bullet_diameter_mm, match_value, match_display, raw_data_key,
+                 interactive_plot=False):
+    """
+    One string: its line, statistics, target plot and score table. A fragment,
+    so toggling its raw-data checkbox reruns only this block. With
+    interactive_plot the target is drawn in the browser (interactive_target)
+    instead of as a cached PNG.
+    """
+    started = time.perf_counter()
+    # Display match header
+    #st.subheader(f"{match_display} - {string['stage']}")
+    st.write(f"{match_value}Target Type: {string['course']}, Score: {string['score']}")
+    st.caption(format_stats(stats_row))
     
-    # Add dropdown to select group in sidebar
-    if len(sorted_groups) > 0:
-        # Create display labels for groups
-        group_labels = []
-        for user, relay, target in sorted_groups:
-            parts = [f"{user}"]
-            if relay:
-                parts.append(f"Relay: {relay}")
-            if target:
-                parts.append(f"Target: {target}")
-            label = " | ".join(parts)
-            group_labels.append(label)
-        
-        # Add "All Groups" option at the beginning
-        group_options = ["All Groups"] + group_labels
-        selected_group_label = st.sidebar.selectbox(
-            "Select Group:",
-            options=group_options,
-            index=0,
-            key="group_selector"
-        )
-        
-        # Filter groups based on selection
-        if selected_group_label == "All Groups":
-            groups_to_display = sorted_groups
+    df = string['data']
+    auto = score_frame(df, bullet_diameter_mm)
+    auto_labels = score_labels(auto[AUTO_POINTS_COLUMN].to_numpy(), auto[AUTO_X_COLUMN].to_numpy())
+    # disagreements with the device are marked with '*'
+    auto_labels = np.where(auto[MISMATCH_COLUMN].to_numpy(), auto_labels + '*', auto_labels)
+    # built directly in transposed form: rows are Shot Number, Score,
+    # Auto Score and Time, columns are each shot; scores display 'X' for x values
+    summary_df_t = pd.DataFrame(
+        [df['id'].to_numpy(), device_score_labels(df), auto_labels, df['time'].to_numpy()],
+        index=["Shot Number", "Score", "Auto Score", "Time"],
+    )
+
+    # add a Total column (sum of the score points, with blanks for non-score rows)
+    # summary_df_t['Total'] = ['', int(df['score_points'].clip(lower=0).sum()), '', '']
+    # st.dataframe(summary_df_t, use_container_width=True)
+    # show plot and scores side-by-side
+    left_col, right_col = st.columns([1, 4])
+    with left_col:
+        if interactive_plot:
+            interactive_target(string, key=f"plot_{raw_data_key}")
         else:
-            # Find the index of selected label
-            selected_idx = group_labels.index(selected_group_label)
-            groups_to_display = [sorted_groups[selected_idx]]
-    else:
-        groups_to_display = []
+            st.image(target_png(string), width="stretch")
+    with right_col:
+        # display summary dataframe without a header and with row labels
+        st.dataframe(summary_df_t, width='content', hide_index=False)
+
+        # Show raw data toggle
+        if st.checkbox(f"Show Raw Data for {match_display}", key=raw_data_key):
+            st.subheader(f"Raw Data for {match_display}")
+            st.write(df)
     
-    # Display grouped by (user, relay, target)
-    for group_key in groups_to_display:
-        user, relay, target = group_key
-        strings = strings_by_group[group_key]
+   
         
-        # Create container for each group
-        with st.container():
-            # Build header with group information
-            header_parts = [f"{user}"]
-            if relay:
-                header_parts.append(f"Relay: {relay}")
-            if target:
-                header_parts.append(f"Target: {target}")
-            st.header(" | ".join(header_parts))
-            
-            if strings:
-                first_string = strings[0]
-                st.subheader(f"Date: {first_string['date']}")
-                
-            # Create shooter report and download button
-            # report_buf = create_shooter_report(shooter, strings, get_match_number)
-            # if report_buf:
-            #     st.download_button(
-            #         label=f"📥 Download {shooter} Report (PNG)",
-            #         data=report_buf,
-            #         file_name=f"shooter_report_{shooter.replace(' ', '_')}.png",
-            #         mime="image/png",
-            #         key=f"download_report_{shooter}"
-            #     )
-            #     report_buf.close()
-            
-            #st.divider()
-            
-            # Display each match string separately within this group
-            for i, string in enumerate(strings):
-                # Get match number for display
-                match_num = get_match_number(string)
-                match_display = f"Match {match_num}" if match_num != 999 else "Match Unknown"
-                
-                # Get match value from scores lookup if available
-                match_value = ''
-                unique_id = string.get('unique_id', '')
-                if unique_id and unique_id in scores_lookup:
-                    match_val = scores_lookup[unique_id].get('match', '')
-                    if match_val and not pd.isna(match_val) and match_val != '':
-                        match_value = f"Match: {match_val}, "
-                
-                # Display match header
-                #st.subheader(f"{match_display} - {string['stage']}")
-                st.write(f"{match_value}Target Type: {string['course']}, Score: {string['score']}")
-                
-                df = string['data']
-                summary_data = {
-                    "Shot Number": df['id'].values,
-                    "Score": df['score'].values,
-                    "Time": df['time'].values
-                }
-                summary_df = pd.DataFrame(summary_data)
-                # transpose so rows become Shot Number, Score, Time and columns are each shot
-                summary_df_t = summary_df.T
-                # add a Total column (sums for each row)
-                # convert scores for summing (treat 'x' or 'X' as 10) and prepare display values
-                numeric_scores = df['score'].apply(_to_int_score)
-
-                # update Score row to display 'X' for x values
-                if 'Score' in summary_df_t.index:
-                    summary_df_t.loc['Score'] = [_display_score(v) for v in df['score'].values]
-
-                # add a Total column (sum of integer-converted scores, with blanks for non-score rows)
-                # summary_df_t['Total'] = ['', int(numeric_scores.sum()), '']
-                # st.dataframe(summary_df_t, use_container_width=True)
-                # show plot and scores side-by-side
-                left_col, right_col = st.columns([1, 4])
-                result = plot_target_with_scores(string)
-                fig = result[0] if isinstance(result, tuple) else result
-                with left_col:
-                    st.pyplot(fig)
-                with right_col:
-                    # display summary dataframe without a header and with row labels
-                    st.dataframe(summary_df_t, width='content', hide_index=False)
-
-                    # Show raw data toggle
-                    group_key_str = f"{user}_{relay}_{target}".replace(' ', '_')
-                    if st.checkbox(f"Show Raw Data for {match_display}", key=f"raw_data_{group_key_str}_{i}"):
-                        st.subheader(f"Raw Data for {match_display}")
-                        st.write(df)
-                
-               
-                    
-                
-                # do not close the figure here because it's used below for the download button
-                # Optionally, provide download link for the plot
-                # buf = io.BytesIO()
-                # fig.savefig(buf, format='png')
-                # buf.seek(0)
-                # st.download_button(
-                #     label="Download Target Plot as PNG",
-                #     data=buf,
-                #     file_name=f"target_plot_{shooter}_match_{match_num}_string_{i+1}.png",
-                #     mime="image/png"
-                # )
-                # buf.close()
-            
-            # Add spacing between shooter containers
+    
+    # Optionally, provide download link for the plot (the cached PNG bytes)
+    # st.download_button(
+    #     label="Download Target Plot as PNG",
+    #     data=target_png,
+    #     file_name=f"target_plot_{shooter}_match_{match_num}_string_{i+1}.png",
+    #     mime="image/png"
+    # )
+    # a rerun of only this block (not part of a full run) is an interaction of its own
+    if not st.session_state.get('in_full_run'):
+        record_interaction(f"string block: {match_display}", time.perf_counter() - started)
+
+
+# Must be the first Streamlit call in the file (move this right after `import streamlit as st`)
+st.set_page_config(page_title="MRPC Shotmarker Data Explorer", layout="wide")
+
+# Time of each stage of this run, shown in the debug sidebar
+timer = StageTimer()
+# string_block records its own time only when it reruns as a fragment, so the
+# flag is cleared however this run ends (an exception, st.stop(), a rerun)
+st.session_state['in_full_run'] = True
+try:
+    st.title("MRPC Shotmarker Data Explorer")
+    st.write(
+        "Upload your MRPC shotmarker data files to visualize and analyze your shooting sessions."
+    )
+
+    # optional CSS to ensure the block container uses full width
+    st.markdown("<style>div.block-container{padding-left:1rem;padding-right:1rem;max-width:100%;}</style>", unsafe_allow_html=True)
+
+    uploaded_files = st.sidebar.file_uploader(
+        "Choose MRPC shotmarker data files", accept_multiple_files=True, type=["csv", "xlsx"]
+    )
+
+    # Second upload button for scores CSV
+    scores_uploaded_file = st.sidebar.file_uploader(
+        "Choose scores CSV file", accept_multiple_files=False, type=["csv"]
+    )
+
+    # Parsed files are cached by content hash, so reruns do not parse them again
+    parse_cache = get_parse_cache()
+    # Parsed strings and enriched scores are kept in a Parquet archive when
+    # MRPC_ARCHIVE_DIR is set
+    archive = get_archive()
+    include_history = archive is not None and st.sidebar.checkbox(
+        "Include archived history", value=False,
+        help=f"Also show strings archived from earlier sessions ({archive.root})" if archive else None,
+    )
+
+    # Trends of one shooter / rifle across every archived string; the trend
+    # index is built from the archive the first time it is asked for
+    show_trends = archive is not None and st.sidebar.checkbox(
+        "Show shooter trends", value=False, key='show_trends',
+        help="Rolling score, X rate, centroid drift and velocity across the archive",
+    )
+    trend_shooter = None
+    if show_trends:
+        trend_index = get_trend_index()
+        trend_shooter = st.sidebar.selectbox("Trends: shooter", trend_index.shooters(), index=None,
+                                             placeholder="Choose a shooter")
+
+    # Groups can also be shown as one density plot of all their shots
+    show_heatmaps = st.sidebar.checkbox(
+        "Group heatmaps", value=False,
+        help="Draw the shots of each group as a density over the target rings",
+    )
+
+    # Drift through each string, split into what the relay shared (conditions)
+    # and what was the shooter's
+    show_drift = st.sidebar.checkbox(
+        "Wind / elevation drift", value=False, key='show_drift',
+        help="Smoothed drift of every string and the conditions shared by shooters on the same relay and match",
+    )
+
+    # Interactive plots are drawn in the browser from the ring radii and shot
+    # arrays, so zooming, tooltips and hiding sighters need no rerun
+    interactive_plots = st.sidebar.radio(
+        "Target plots", ["Static (PNG)", "Interactive (WebGL)"], index=0, key='plot_mode',
+        help="Interactive plots zoom (wheel), pan (drag) and show each shot's time, velocity, "
+             "yaw / pitch and quality on hover",
+    ) == "Interactive (WebGL)"
+
+    # Shots are also scored from their position; a hole touching a ring line
+    # scores the higher value, so the bullet diameter matters
+    bullet_diameter_mm = st.sidebar.number_input(
+        "Bullet diameter (mm)", min_value=0.0, max_value=20.0,
+        value=DEFAULT_BULLET_DIAMETER_MM, step=0.01, format="%.2f",
+    )
+
+    # Live feed: strings show up while shooting is still going on, from a growing
+    # export file or from lines sent to a local TCP port (see live_feed.py)
+    live_file = st.sidebar.text_input(
+        "Live feed: export file to tail", value=os.environ.get(LIVE_FILE_ENV, ""),
+    )
+    live_port = st.sidebar.number_input(
+        "Live feed: TCP port (0 = off)", min_value=0, max_value=65535,
+        value=int(os.environ.get(LIVE_PORT_ENV) or 0), step=1,
+    )
+    if live_file or live_port:
+        live_panel(live_file, int(live_port), show_drift)
+
+    # The parsed, enriched and grouped data is built once per upload set and kept
+    # in the session state, so widget changes only redraw
+    model_key = (tuple(upload_key(f) for f in uploaded_files or []), upload_key(scores_uploaded_file), include_history)
+    model = st.session_state.get('model')
+    if model is None or st.session_state.get('model_key') != model_key:
+        with timer.stage("build model"):
+            model = build_model(uploaded_files, scores_uploaded_file, include_history)
+        st.session_state['model'] = model
+        st.session_state['model_key'] = model_key
+
+    if trend_shooter:
+        with timer.stage("trends"):
+            season = trend_index.season(trend_shooter)
+            st.header(f"Trends: {trend_shooter}")
+            st.dataframe(trend_index.summary().loc[[trend_shooter]], width='stretch')
+            st.caption(f"Rolling values over the last {trend_index.window} strings, in date and match order")
+            chart = season.reset_index(drop=True)
+            chart.index.name = "string"
+            # every season shot as a density, straight from the archive's shot table
+            archived = archive.load_store()
+            season_shots = store_shots(archived, (archived.strings['shooter_name'] == trend_shooter).to_numpy())
+            st.image(density_png(season_shots, f"{trend_shooter}: season"), width=500)
+            left_col, right_col = st.columns(2)
+            with left_col:
+                st.line_chart(chart[['points_per_shot', 'rolling_points_per_shot']], height=220)
+                st.line_chart(chart[['x_rate', 'rolling_x_rate']], height=220)
+            with right_col:
+                st.line_chart(chart[['centroid_drift_mm', 'rolling_centroid_x_mm', 'rolling_centroid_y_mm']], height=220)
+                st.line_chart(chart[['velocity_mean_fps', 'rolling_velocity_fps']], height=220)
+            with st.expander(f"{len(season)} strings"):
+                st.dataframe(season.drop(columns=['unique_id', 'seq']), width='stretch', hide_index=True)
+        st.divider()
+
+    # Display the scores CSV if uploaded (above the shot strings)
+    if scores_uploaded_file:
+        st.header("Scores Data")
+        df_scores = model['scores_raw']
+        if model['scores_error'] is not None:
+            st.error(f"Error processing scores CSV file: {model['scores_error']}")
+        else:
+            st.write(f"Loaded {len(df_scores)} rows from {scores_uploaded_file.name}")
+            st.dataframe(df_scores, use_container_width=True)
+
+            if not model['user_col']:
+                st.warning("Could not find 'user' column in scores CSV. Available columns: " + ", ".join(df_scores.columns))
+
+            # Optionally show raw data toggle
+            if st.checkbox("Show Raw Data Info", key="scores_raw_data"):
+                st.subheader("DataFrame Info")
+                st.write(f"Shape: {df_scores.shape}")
+                st.write(f"Columns: {list(df_scores.columns)}")
+
+    if uploaded_files or include_history:
+        all_strings = model['strings']
+        df_scores = model['df_scores']
+        scores_lookup = model['scores_lookup']
+        string_stats = model['string_stats']
+        strings_by_group = model['strings_by_group']
+        sorted_groups = model['sorted_groups']
+
+        if model['archived_count']:
+            st.sidebar.caption(f"Archived {model['archived_count']} new strings")
+        if include_history:
+            st.sidebar.caption(f"{model['history_count']} strings from the archive")
+        cache_stats = parse_cache.stats()
+        st.sidebar.caption(
+            f"Parse cache: {cache_stats['hits']} hits, {cache_stats['disk_hits']} disk hits, "
+            f"{cache_stats['misses']} misses"
+        )
+
+        match_report = model['match_report']
+        if match_report is not None:
+            counts = match_report['method'].value_counts()
+            loose = match_report[match_report['method'] != 'exact']
+            orphan_strings = model['orphan_strings']
+            with st.expander(
+                f"Score matching: {counts.get('exact', 0)} exact, {counts.get('normalized', 0)} normalized, "
+                f"{counts.get('fuzzy', 0)} fuzzy, {counts.get('ambiguous', 0)} ambiguous, "
+                f"{counts.get('unmatched', 0)} unmatched rows; {len(orphan_strings)} strings without scores"
+            ):
+                if len(loose) > 0:
+                    st.dataframe(loose, use_container_width=True)
+                if orphan_strings:
+                    st.dataframe(pd.DataFrame(
+                        [(all_strings[i]['shooter'], all_strings[i]['course'], all_strings[i]['unique_id'])
+                         for i in orphan_strings],
+                        columns=['shooter', 'course', 'unique_id'],
+                    ), use_container_width=True)
+
+            # Display updated df_scores after population
+            st.subheader("Updated Scores Data (After Merging)")
+            st.write(f"Updated {len(df_scores)} rows with relay, match_id, and target data")
+            st.dataframe(df_scores, use_container_width=True)
+
+        # Shots whose device score disagrees with the geometric score, all
+        # strings scored in one pass (once per bullet diameter)
+        with timer.stage("score mismatches"):
+            score_mismatches = model['mismatches'].get(bullet_diameter_mm)
+            if score_mismatches is None:
+                score_mismatches = mismatches(all_strings, bullet_diameter_mm)
+                model['mismatches'][bullet_diameter_mm] = score_mismatches
+        if len(score_mismatches) > 0:
+            with st.expander(f"{len(score_mismatches)} shots scored differently by the device than by position"):
+                st.dataframe(score_mismatches.drop(columns=['string']), width='stretch', hide_index=True)
+
+        if show_drift:
+            with timer.stage("drift"):
+                if model['drift'] is None:
+                    model['drift'] = strings_drift(all_strings)
+                drift_section(model['drift'], all_strings)
             st.divider()
-            st.markdown("<br>", unsafe_allow_html=True)
-            
\ No newline at end of file
+
+        # Add dropdown to select group in sidebar
+        if len(sorted_groups) > 0:
+            group_labels = model['group_labels']
+            # Add "All Groups" option at the beginning
+            group_options = ["All Groups"] + group_labels
+            selected_group_label = st.sidebar.selectbox(
+                "Select Group:",
+                options=group_options,
+                index=0,
+                key="group_selector"
+            )
+
+            # Filter groups based on selection
+            if selected_group_label == "All Groups":
+                groups_to_display = sorted_groups
+            else:
+                # Find the index of selected label
+                selected_idx = group_labels.index(selected_group_label)
+                groups_to_display = [sorted_groups[selected_idx]]
+        else:
+            groups_to_display = []
+
+        # Plots and tables are only built for the groups on the current page, so a
+        # rerun costs about the same however many strings are loaded
+        n_pages = max(1, -(-len(groups_to_display) // GROUPS_PER_PAGE))
+        page = 1
+        if n_pages > 1:
+            page = st.sidebar.selectbox(
+                "Page:", options=list(range(1, n_pages + 1)),
+                format_func=lambda p: f"{p} of {n_pages}", key="group_page",
+            )
+
+        # One compact row per group (computed with the model)
+        if len(groups_to_display) > 1:
+            st.subheader(f"All groups ({len(sorted_groups)})")
+            st.dataframe(model['summary'], width='stretch', hide_index=True)
+
+        groups_to_display = groups_to_display[(page - 1) * GROUPS_PER_PAGE:page * GROUPS_PER_PAGE]
+
+        # Display grouped by (user, relay, target)
+        with timer.stage("draw groups"):
+            for group_key in groups_to_display:
+                user, relay, target = group_key
+                strings = strings_by_group[group_key]
+
+                # Create container for each group
+                with st.container():
+                    # Build header with group information
+                    header_parts = [f"{user}"]
+                    if relay:
+                        header_parts.append(f"Relay: {relay}")
+                    if target:
+                        header_parts.append(f"Target: {target}")
+                    st.header(" | ".join(header_parts))
+
+                    if strings:
+                        first_string = strings[0]
+                        st.subheader(f"Date: {first_string['date']}")
+
+                    # Create shooter report and download button
+                    # report_buf = create_shooter_report(shooter, strings, get_match_number)
+                    # if report_buf:
+                    #     st.download_button(
+                    #         label=f"📥 Download {shooter} Report (PNG)",
+                    #         data=report_buf,
+                    #         file_name=f"shooter_report_{shooter.replace(' ', '_')}.png",
+                    #         mime="image/png",
+                    #         key=f"download_report_{shooter}"
+                    #     )
+                    #     report_buf.close()
+
+                    #st.divider()
+
+                    if show_heatmaps:
+                        st.image(density_png(strings_shots(strings), " | ".join(header_parts)), width=500)
+
+                    with st.expander("Group statistics"):
+                        group_table = pd.DataFrame([string_stats[id(s)] for s in strings])
+                        group_table.insert(0, 'match', [get_match_number(s) for s in strings])
+                        st.dataframe(group_table.drop(columns=['unique_id']), width='stretch', hide_index=True)
+
+                    # Display each match string separately within this group
+                    for i, string in enumerate(strings):
+                        # Get match number for display
+                        match_num = get_match_number(string)
+                        match_display = f"Match {match_num}" if match_num != 999 else "Match Unknown"
+
+                        # Get match value from scores lookup if available
+                        match_value = ''
+                        unique_id = string.get('unique_id', '')
+                        if unique_id and unique_id in scores_lookup:
+                            match_val = scores_lookup[unique_id].get('match', '')
+                            if match_val and not pd.isna(match_val) and match_val != '':
+                                match_value = f"Match: {match_val}, "
+
+                        group_key_str = f"{user}_{relay}_{target}".replace(' ', '_')
+                        string_block(string, string_stats[id(string)], bullet_diameter_mm, match_value, match_display,
+                                     f"raw_data_{group_key_str}_{i}", interactive_plots)
+
+                    # Add spacing between shooter containers
+                    st.divider()
+                    st.markdown("<br>", unsafe_allow_html=True)
+finally:
+    st.session_state['in_full_run'] = False
+
+# Server time of this run by stage, and of the latest interactions
+record_interaction("full run", timer.total())
+with st.sidebar.expander("Debug: server time"):
+    cached = "" if "build model" in timer.stages else " (model from session state)"
+    st.caption(f"This run: {timer.total() * 1000:.0f} ms{cached}")
+    st.dataframe(pd.DataFrame({'stage': list(timer.stages), 'ms': [t * 1000.0 for t in timer.stages.values()]}),
+                 hide_index=True)
+    st.dataframe(pd.DataFrame(st.session_state['interactions'][::-1], columns=['interaction', 'ms']),
+                 hide_index=True)
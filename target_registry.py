@@ -0,0 +1,287 @@
+# target_registry.py
+"""
+Registry of target specifications.
+
+Specs come from the bundled target_specs.json (the first of SPEC_FILE_NAMES
+found next to this module) and from every *.json file in the directories
+listed in MRPC_TARGET_SPEC_DIRS (os.pathsep separated). Later files override
+earlier ones by type name, so a user directory can replace a bundled target.
+
+Nothing is read at import. The first lookup loads and validates every spec
+and compiles it into a CompiledTarget with NumPy ring arrays. Names are
+resolved through an index of normalized names built at the same time, so
+variants such as "SR 200y", "nra sr @ 200 yds" or "200y SR" find
+"NRA SR at 200y" with one dict lookup (and "SR" alone does too, as long as
+no other target shares it). The source files are checked for
+changes at most every RELOAD_CHECK_SECONDS, and the registry reloads when
+one is added, removed or modified.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+import warnings
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple
+
+import numpy as np
+
+# Bundled spec file names, tried in order next to this module
+SPEC_FILE_NAMES = ["target_specs.json", "target-specs.json", "targets.json"]
+# Environment variable with extra spec directories
+SPEC_DIRS_ENV = "MRPC_TARGET_SPEC_DIRS"
+# Minimum time between two checks of the spec files for changes
+RELOAD_CHECK_SECONDS = 2.0
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+_YARD_M = 0.9144
+_MOA_RAD = math.pi / (180 * 60)
+_DISTANCE_RE = re.compile(r"([\d.]+)\s*(y|yd|yds|yards?|m|meters?|metres?)\b", re.IGNORECASE)
+_UNIT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(yards?|yds?|y|meters?|metres?|m)\b")
+_TOKEN_RE = re.compile(r"[a-z0-9.]+")
+_DISTANCE_TOKEN_RE = re.compile(r"^\d+(?:\.\d+)?[ym]$")
+# words that do not tell targets apart
+_STOP_WORDS = {"nra", "at", "target", "the"}
+
+
+class TargetSpecError(ValueError):
+    """A target spec that cannot be used."""
+
+
+class RingTable(NamedTuple):
+    """Scoring radii (mm, ascending) of one target with the points and X flag of each ring."""
+    radii: np.ndarray
+    points: np.ndarray
+    is_x: np.ndarray
+
+
+class CompiledTarget(NamedTuple):
+    """A validated target spec with the arrays the plotting, scoring and statistics code use."""
+    name: str
+    spec: Dict[str, Any]
+    rings: RingTable
+    # rings largest first, as they are drawn
+    draw_radii: Tuple[float, ...]
+    draw_colors: Tuple[str, ...]
+    grid_size_mm: Optional[float]
+    mm_per_moa: float
+    source: str
+
+
+def mm_per_moa(spec: Optional[Dict[str, Any]]) -> float:
+    """
+    Millimetres per MOA on a target spec's face: from its distance
+    ('200 yards', '300 m'), else four times grid_size_moa_quarter. NaN if neither.
+    """
+    if not spec:
+        return math.nan
+    match = _DISTANCE_RE.search(str(spec.get("distance", "")))
+    if match:
+        meters = float(match.group(1)) * (_YARD_M if match.group(2).lower().startswith("y") else 1.0)
+        return meters * 1000.0 * math.tan(_MOA_RAD)
+    quarter = spec.get("grid_size_moa_quarter")
+    return float(quarter) * 4 if quarter else math.nan
+
+
+def normalize_name(name: Any) -> str:
+    """
+    Canonical form of a target name: lower case, units folded to 'y' / 'm'
+    and attached to their number, hyphens and filler words dropped, tokens
+    sorted. 'NRA SR-3 at 300 yards' and '300y sr3' both give '300y sr3'.
+    """
+    text = str(name).lower().replace("-", "").replace("@", " ")
+    text = _UNIT_RE.sub(lambda m: m.group(1) + ("y" if m.group(2).startswith("y") else "m"), text)
+    tokens = [t for t in _TOKEN_RE.findall(text) if t not in _STOP_WORDS]
+    return " ".join(sorted(tokens))
+
+
+def _short_name(name: Any) -> str:
+    """normalize_name without distance tokens such as '200y'."""
+    return " ".join(t for t in normalize_name(name).split() if not _DISTANCE_TOKEN_RE.match(t))
+
+
+def _name_index(targets, key_func) -> Dict[str, Optional["CompiledTarget"]]:
+    """Targets by key_func(name); a key shared by two targets maps to None (ambiguous)."""
+    index: Dict[str, Optional[CompiledTarget]] = {}
+    for target in targets:
+        key = key_func(target.name)
+        if key:
+            index[key] = None if key in index and index[key] is not target else target
+    return index
+
+
+def validate_spec(spec: Any) -> None:
+    """Raise TargetSpecError unless spec has a type and rings with positive diameters and points."""
+    if not isinstance(spec, dict):
+        raise TargetSpecError("spec is not an object")
+    if not isinstance(spec.get("type"), str) or not spec["type"].strip():
+        raise TargetSpecError("spec has no 'type' name")
+    rings = spec.get("rings")
+    if not isinstance(rings, list) or not rings:
+        raise TargetSpecError(f"{spec['type']}: 'rings' must be a non-empty list")
+    for ring in rings:
+        if not isinstance(ring, dict):
+            raise TargetSpecError(f"{spec['type']}: ring {ring!r} is not an object")
+        diameter = ring.get("diameter")
+        if not isinstance(diameter, (int, float)) or not diameter > 0:
+            raise TargetSpecError(f"{spec['type']}: ring {ring.get('ring')!r} needs a positive 'diameter'")
+        if not isinstance(ring.get("points", 0), (int, float)):
+            raise TargetSpecError(f"{spec['type']}: ring {ring.get('ring')!r} has non-numeric 'points'")
+    grid = spec.get("grid_size_moa_quarter")
+    if grid is not None and (not isinstance(grid, (int, float)) or grid <= 0):
+        raise TargetSpecError(f"{spec['type']}: 'grid_size_moa_quarter' must be a positive number")
+
+
+def compile_spec(spec: Dict[str, Any], source: str = "") -> CompiledTarget:
+    """Validate a spec and build its CompiledTarget."""
+    validate_spec(spec)
+    rings = sorted(spec["rings"], key=lambda r: r["diameter"])
+    table = RingTable(
+        radii=np.array([r["diameter"] / 2.0 for r in rings], dtype=np.float64),
+        points=np.array([r.get("points", 0) for r in rings], dtype=np.int8),
+        is_x=np.array([str(r.get("ring", "")).strip().upper() in ("X", "V") for r in rings], dtype=bool),
+    )
+    for array in table:
+        array.setflags(write=False)
+    return CompiledTarget(
+        name=spec["type"],
+        spec=spec,
+        rings=table,
+        draw_radii=tuple(r["diameter"] / 2.0 for r in reversed(rings)),
+        draw_colors=tuple(r.get("color", "#000000") for r in reversed(rings)),
+        grid_size_mm=spec.get("grid_size_moa_quarter"),
+        mm_per_moa=mm_per_moa(spec),
+        source=source,
+    )
+
+
+class TargetRegistry:
+    """
+    Compiled target specs by name, loaded on first use and reloaded when a
+    source file changes. Lookups accept exact names or normalized variants.
+    """
+
+    def __init__(self, spec_files: Optional[List[str]] = None, spec_dirs: Optional[List[str]] = None,
+                 check_seconds: float = RELOAD_CHECK_SECONDS):
+        if spec_files is None:
+            bundled = [os.path.join(_THIS_DIR, name) for name in SPEC_FILE_NAMES]
+            spec_files = [next((p for p in bundled if os.path.exists(p)), bundled[0])]
+        if spec_dirs is None:
+            spec_dirs = [d for d in os.environ.get(SPEC_DIRS_ENV, "").split(os.pathsep) if d]
+        self.spec_files = list(spec_files)
+        self.spec_dirs = list(spec_dirs)
+        self.check_seconds = check_seconds
+        # bumped on every load, so caches of drawn targets can tell specs changed
+        self.version = 0
+        self.errors: List[str] = []
+        self._targets: Dict[str, CompiledTarget] = {}
+        self._index: Dict[str, Optional[CompiledTarget]] = {}
+        self._resolved: Dict[Any, Optional[CompiledTarget]] = {}
+        self._signature = None
+        self._checked_at = -math.inf
+        self._lock = threading.Lock()
+
+    def _sources(self) -> List[str]:
+        sources = [p for p in self.spec_files if os.path.exists(p)]
+        for spec_dir in self.spec_dirs:
+            if os.path.isdir(spec_dir):
+                sources.extend(os.path.join(spec_dir, name) for name in sorted(os.listdir(spec_dir))
+                               if name.endswith(".json"))
+        return sources
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for path in self._sources():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self, signature: Tuple) -> None:
+        targets: Dict[str, CompiledTarget] = {}
+        errors = []
+        for path, _, _ in signature:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+            except (OSError, ValueError) as exc:
+                errors.append(f"{path}: {exc}")
+                continue
+            specs = raw.get("targets", []) if isinstance(raw, dict) else raw
+            if not isinstance(specs, list):
+                errors.append(f"{path}: expected a list of targets")
+                continue
+            for spec in specs:
+                try:
+                    target = compile_spec(spec, path)
+                except TargetSpecError as exc:
+                    errors.append(f"{path}: {exc}")
+                    continue
+                targets[target.name] = target
+
+        index = _name_index(targets.values(), normalize_name)
+        # the name without its distance ('sr', 'mr1') as a fallback key when unambiguous
+        for key, target in _name_index(targets.values(), _short_name).items():
+            index.setdefault(key, target)
+
+        for message in errors:
+            warnings.warn(f"target spec skipped: {message}", stacklevel=3)
+        self._targets, self._index, self._resolved = targets, index, {}
+        self.errors = errors
+        self._signature = signature
+        self.version += 1
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload the specs if a source file changed (checked at most every check_seconds)."""
+        now = time.monotonic()
+        if not force and self._signature is not None and now - self._checked_at < self.check_seconds:
+            return
+        with self._lock:
+            self._checked_at = now
+            signature = self._current_signature()
+            if force or signature != self._signature:
+                self._load(signature)
+
+    def get(self, name: Any) -> Optional[CompiledTarget]:
+        """CompiledTarget for a target name or a variant of it, or None."""
+        self.refresh()
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        except TypeError:
+            return None
+        target = self._targets.get(name) if isinstance(name, str) else None
+        if target is None and name is not None:
+            target = self._index.get(normalize_name(name))
+        self._resolved[name] = target
+        return target
+
+    def spec(self, name: Any) -> Optional[Dict[str, Any]]:
+        """The raw spec dict for a target name or variant, or None."""
+        target = self.get(name)
+        return target.spec if target else None
+
+    def names(self) -> List[str]:
+        """Names of all loaded targets."""
+        self.refresh()
+        return list(self._targets)
+
+
+_default_registry: Optional[TargetRegistry] = None
+
+
+def get_registry() -> TargetRegistry:
+    """Process-wide registry of the bundled specs and MRPC_TARGET_SPEC_DIRS."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = TargetRegistry()
+    return _default_registry
+
+
+def get_target(name: Any) -> Optional[CompiledTarget]:
+    """Shortcut for get_registry().get(name)."""
+    return get_registry().get(name)
@@ -0,0 +1,372 @@
+# trends.py
+"""
+Shooter trends across archived strings.
+
+Each string is reduced to one row of facts in one pass over the columnar
+shot store: date, match, record shots, points and Xs (bincount sums of the
+scores decoded at ingest), centroid, velocity and ES (group_stats.store_stats).
+Rows are kept per shooter_name (shooter and rifle) in date / match / arrival
+order. The trends are window computations over each shooter's rows, done
+for all shooters at once with cumulative sums:
+
+- points per shot and X rate over the last TREND_WINDOW strings,
+- the centroid over the same window and its drift from the shooter's first
+  window,
+- mean velocity over the window.
+
+Season totals per shooter (strings, shots, points, Xs, and the sums behind a
+least-squares velocity slope over time) are plain sums. Appending strings adds
+to them and recomputes the windows of the affected shooters only. A season
+query is a dict lookup and a date filter.
+
+Command line:
+    python trends.py ARCHIVE_DIR [--shooter NAME] [--window N]
+prints every shooter's season summary, or one shooter's strings.
+"""
+import argparse
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from group_stats import store_stats
+from shot_store import ShotStore, shot_scores
+
+# Strings in each rolling window
+TREND_WINDOW = 5
+# Per-string facts the trends are computed from
+FACT_COLUMNS = [
+    "unique_id", "shooter_name", "date", "match", "course", "shots", "points", "xs",
+    "centroid_x_mm", "centroid_y_mm", "velocity_shots", "velocity_mean_fps", "es_moa", "mean_radius_moa",
+]
+# Columns added by rolling_trends
+TREND_COLUMNS = [
+    "points_per_shot", "x_rate", "rolling_points_per_shot", "rolling_x_rate",
+    "rolling_centroid_x_mm", "rolling_centroid_y_mm", "centroid_drift_mm", "rolling_velocity_fps",
+]
+# Columns of TrendIndex.summary()
+SUMMARY_COLUMNS = [
+    "strings", "shots", "points_per_shot", "x_rate", "velocity_mean_fps",
+    "velocity_trend_fps_per_30d", "first_date", "last_date",
+]
+# Header date formats tried in order (ShotMarker writes 'Oct 14 2023')
+_DATE_FORMATS = ("%b %d %Y", "%Y-%m-%d", "%m/%d/%Y")
+# Additive per-shooter sums; t is the string's date in days
+_SUM_COLUMNS = ["strings", "shots", "points", "xs", "v_n", "v_sum", "v_t", "v_tt", "v_tv"]
+
+
+def parse_dates(values) -> np.ndarray:
+    """datetime64 dates of header date texts, NaT where no format matches."""
+    text = pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+    dates = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in _DATE_FORMATS:
+        missing = dates.isna().to_numpy()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+    return dates.to_numpy()
+
+
+def string_facts(store: ShotStore) -> pd.DataFrame:
+    """
+    One row of FACT_COLUMNS per string of a ShotStore, from its shared shot
+    table in one pass. Shots, points and Xs count scored record shots.
+    """
+    n = len(store)
+    if n == 0:
+        return pd.DataFrame(columns=FACT_COLUMNS)
+    strings, shots = store.strings, store.shots
+    counts = (strings["stop"] - strings["start"]).to_numpy()
+    group = np.repeat(np.arange(n), counts)
+    points, xs = shot_scores(shots)
+    record = points >= 0
+    if "tags" in shots.columns:
+        record &= (shots["tags"] != "sighter").to_numpy()
+    g = group[record]
+    stats = store_stats(store)
+
+    def text(col):
+        # object columns: pandas would otherwise infer Arrow strings, which are slow to slice and compare
+        return pd.Series(strings[col].fillna("").to_numpy(dtype=object), dtype=object)
+
+    return pd.DataFrame({
+        "unique_id": text("unique_id"),
+        "shooter_name": text("shooter_name"),
+        "date": parse_dates(strings["date"].to_numpy(dtype=object)),
+        "match": pd.to_numeric(strings["match"], errors="coerce").to_numpy(dtype=np.float64),
+        "course": text("course"),
+        "shots": np.bincount(g, minlength=n),
+        "points": np.bincount(g, points[record].astype(np.float64), n).astype(np.int64),
+        "xs": np.bincount(g, xs[record].astype(np.float64), n).astype(np.int64),
+        "centroid_x_mm": stats["centroid_x_mm"].to_numpy(),
+        "centroid_y_mm": stats["centroid_y_mm"].to_numpy(),
+        "velocity_shots": stats["velocity_shots"].to_numpy(),
+        "velocity_mean_fps": stats["velocity_mean_fps"].to_numpy(),
+        "es_moa": stats["es_moa"].to_numpy(),
+        "mean_radius_moa": stats["mean_radius_moa"].to_numpy(),
+    }, columns=FACT_COLUMNS)
+
+
+def sort_facts(facts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Facts grouped by shooter_name, each shooter's strings in date, match and
+    arrival ('seq') order; strings without a date or match come last.
+    """
+    date = facts["date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    date = np.where(pd.isna(facts["date"]).to_numpy(), np.iinfo(np.int64).max, date)
+    match = np.nan_to_num(facts["match"].to_numpy(dtype=np.float64), nan=np.inf)
+    shooter = pd.factorize(facts["shooter_name"], sort=True)[0]
+    seq = facts["seq"].to_numpy() if "seq" in facts.columns else np.arange(len(facts))
+    order = np.lexsort((seq, match, date, shooter))
+    return facts.iloc[order].reset_index(drop=True)
+
+
+def _window_sums(values: np.ndarray, group_start: np.ndarray, window: int) -> np.ndarray:
+    """Sum of each row's last `window` values within its group; groups are contiguous runs of rows."""
+    cs = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    row = np.arange(len(values))
+    return cs[row + 1] - cs[np.maximum(row + 1 - window, group_start)]
+
+
+def rolling_trends(facts: pd.DataFrame, window: int = TREND_WINDOW) -> pd.DataFrame:
+    """
+    Facts (in sort_facts order) with TREND_COLUMNS added. Window means are
+    weighted by shots, so short strings count for less; strings without
+    positions or velocities do not pull the centroid or velocity means.
+    """
+    facts = facts.copy()
+    n = len(facts)
+    names = facts["shooter_name"].to_numpy(dtype=object)
+    first = np.ones(n, dtype=bool)
+    first[1:] = names[1:] != names[:-1]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(n), 0)) if n else np.empty(0, dtype=np.intp)
+
+    def windowed(values, weights):
+        values = np.asarray(values, dtype=np.float64)
+        weights = np.where(np.isfinite(values), np.asarray(weights, dtype=np.float64), 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (_window_sums(np.where(weights > 0, values, 0.0) * weights, group_start, window)
+                    / _window_sums(weights, group_start, window))
+
+    shots = facts["shots"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        facts["points_per_shot"] = facts["points"].to_numpy() / shots
+        facts["x_rate"] = facts["xs"].to_numpy() / shots
+    facts["rolling_points_per_shot"] = windowed(facts["points_per_shot"], shots)
+    facts["rolling_x_rate"] = windowed(facts["x_rate"], shots)
+    cx = windowed(facts["centroid_x_mm"], shots)
+    cy = windowed(facts["centroid_y_mm"], shots)
+    facts["rolling_centroid_x_mm"] = cx
+    facts["rolling_centroid_y_mm"] = cy
+    facts["centroid_drift_mm"] = np.hypot(cx - cx[group_start], cy - cy[group_start])
+    facts["rolling_velocity_fps"] = windowed(facts["velocity_mean_fps"], facts["velocity_shots"])
+    return facts
+
+
+def _shooter_sums(facts: pd.DataFrame) -> pd.DataFrame:
+    """_SUM_COLUMNS plus first/last date per shooter_name."""
+    v = facts["velocity_mean_fps"].to_numpy(dtype=np.float64)
+    t = facts["date"].to_numpy(dtype="datetime64[D]").astype(np.float64)
+    t[pd.isna(facts["date"]).to_numpy()] = np.nan
+    used = np.isfinite(v) & np.isfinite(t)
+    v, t = np.where(used, v, 0.0), np.where(used, t, 0.0)
+    parts = pd.DataFrame({
+        "shooter_name": facts["shooter_name"].to_numpy(dtype=object),
+        "strings": 1, "shots": facts["shots"].to_numpy(), "points": facts["points"].to_numpy(),
+        "xs": facts["xs"].to_numpy(), "v_n": used.astype(np.float64), "v_sum": v,
+        "v_t": t, "v_tt": t * t, "v_tv": t * v,
+    })
+    grouped = parts.groupby("shooter_name", sort=False)
+    sums = grouped[_SUM_COLUMNS].sum()
+    dates = facts.groupby("shooter_name", sort=False)["date"]
+    sums["first_date"] = dates.min()
+    sums["last_date"] = dates.max()
+    return sums
+
+
+def _merge_sums(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    if old is None or len(old) == 0:
+        return new
+    merged = old[_SUM_COLUMNS].add(new[_SUM_COLUMNS], fill_value=0)
+    merged["first_date"] = pd.concat([old["first_date"], new["first_date"]]).groupby(level=0).min()
+    merged["last_date"] = pd.concat([old["last_date"], new["last_date"]]).groupby(level=0).max()
+    return merged
+
+
+class TrendIndex:
+    """
+    Trends of every string appended so far in one table, each shooter's rows
+    contiguous, with season totals kept up to date as strings are added.
+    Strings are de-duplicated on unique_id, so appending the same store twice
+    changes nothing. Thread-safe: append publishes the table, its shooter
+    rows and dates as one tuple, so readers never pair a new one with an old.
+    """
+
+    def __init__(self, window: int = TREND_WINDOW):
+        self.window = window
+        self.version = 0
+        # (table, shooter_name -> [start, stop) rows of the table, dates of
+        # the rows), replaced in one assignment
+        self._view: Tuple[Optional[pd.DataFrame], Dict[str, tuple], np.ndarray] = (
+            None, {}, np.empty(0, dtype="datetime64[ns]"))
+        self._sums: Optional[pd.DataFrame] = None
+        self._known: set = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def append(self, store: ShotStore) -> int:
+        """
+        Add the strings of a ShotStore not seen yet; returns how many were added.
+        Only the rows of shooters with new strings are sorted and have their
+        windows recomputed; the other shooters' rows are kept as they are.
+        """
+        facts = string_facts(store)
+        if len(facts) == 0:
+            return 0
+        with self._lock:
+            ids = facts["unique_id"].to_numpy(dtype=object)
+            # set lookups for the new strings only, not a scan of everything known
+            fresh = np.array([uid not in self._known for uid in ids], dtype=bool)
+            fresh &= ~pd.Series(ids).duplicated().to_numpy()
+            facts = facts[fresh].copy()
+            if len(facts) == 0:
+                return 0
+            facts["seq"] = np.arange(self._seq, self._seq + len(facts))
+            self._seq += len(facts)
+            self._known.update(facts["unique_id"])
+            self._sums = _merge_sums(self._sums, _shooter_sums(facts))
+
+            table = self._view[0]
+            if table is None:
+                table = rolling_trends(sort_facts(facts), self.window)
+            else:
+                touched = table["shooter_name"].isin(facts["shooter_name"].unique()).to_numpy()
+                combined = pd.concat([table.loc[touched, FACT_COLUMNS + ["seq"]], facts], ignore_index=True)
+                recomputed = rolling_trends(sort_facts(combined), self.window)
+                # every shooter is either wholly kept or wholly recomputed, so each
+                # one's rows stay contiguous without sorting the whole table
+                table = pd.concat([table[~touched], recomputed], ignore_index=True)
+            names = table["shooter_name"].to_numpy(dtype=object)
+            edges = np.flatnonzero(names[1:] != names[:-1]) + 1
+            starts, stops = np.r_[0, edges], np.r_[edges, len(table)]
+            rows = {names[a]: (int(a), int(b)) for a, b in zip(starts, stops)}
+            self._view = (table, rows, table["date"].to_numpy(dtype="datetime64[ns]"))
+            self.version += 1
+            return len(facts)
+
+    def shooters(self) -> List[str]:
+        """shooter_names with at least one string, sorted."""
+        return sorted(self._view[1])
+
+    def season(self, shooter_name: str, start: Any = None, end: Any = None) -> pd.DataFrame:
+        """
+        One shooter's strings with their facts and trends, in date / match
+        order, optionally limited to dates in [start, end]. Empty if unknown.
+        """
+        table, shooter_rows, table_dates = self._view
+        rows = shooter_rows.get(shooter_name)
+        if rows is None:
+            return pd.DataFrame(columns=FACT_COLUMNS + ["seq"] + TREND_COLUMNS)
+        block = table.iloc[rows[0]:rows[1]]
+        if start is None and end is None:
+            return block
+        dates = table_dates[rows[0]:rows[1]]
+        keep = np.ones(len(block), dtype=bool)
+        if start is not None:
+            keep &= dates >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            keep &= dates <= np.datetime64(pd.Timestamp(end))
+        return block[keep]
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row of SUMMARY_COLUMNS per shooter from the running totals. The
+        velocity trend is the least-squares slope of string mean velocity
+        against date, in fps per 30 days.
+        """
+        sums = self._sums
+        if sums is None or len(sums) == 0:
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+        n = sums["v_n"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = ((n * sums["v_tv"] - sums["v_t"] * sums["v_sum"])
+                     / (n * sums["v_tt"] - sums["v_t"] ** 2)).to_numpy()
+            # one date only: no slope
+            slope = np.where(np.isfinite(slope), slope, np.nan)
+            summary = pd.DataFrame({
+                "strings": sums["strings"].astype(np.int64),
+                "shots": sums["shots"].astype(np.int64),
+                "points_per_shot": sums["points"] / sums["shots"],
+                "x_rate": sums["xs"] / sums["shots"],
+                "velocity_mean_fps": sums["v_sum"] / sums["v_n"],
+                "velocity_trend_fps_per_30d": slope * 30.0,
+                "first_date": sums["first_date"],
+                "last_date": sums["last_date"],
+            }, index=sums.index, columns=SUMMARY_COLUMNS)
+        summary.index.name = "shooter_name"
+        return summary.sort_index()
+
+
+_default_index: Optional[TrendIndex] = None
+_default_root: Optional[str] = None
+_default_lock = threading.Lock()
+
+
+def get_trend_index(build: bool = True) -> Optional[TrendIndex]:
+    """
+    Process-wide TrendIndex over the archive (see archive.get_archive), built
+    from it on first use; None when there is no archive, or when build is
+    False and it has not been built yet. Callers append the stores they
+    archive, so the index follows the archive without reloading it.
+    """
+    global _default_index, _default_root
+    from archive import get_archive
+
+    archive = get_archive()
+    if archive is None:
+        return None
+    with _default_lock:
+        if _default_index is None or _default_root != archive.root:
+            if not build:
+                return None
+            index = TrendIndex()
+            index.append(archive.load_store())
+            _default_index, _default_root = index, archive.root
+        return _default_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shooter trends across a Parquet shot archive.")
+    parser.add_argument("archive_dir", help="archive directory (see archive.py)")
+    parser.add_argument("--shooter", help="print this shooter_name's strings and trends")
+    parser.add_argument("--window", type=int, default=TREND_WINDOW, help="strings per rolling window")
+    args = parser.parse_args(argv)
+
+    from archive import ShotArchive
+
+    t0 = time.perf_counter()
+    store = ShotArchive(args.archive_dir).load_store()
+    t1 = time.perf_counter()
+    index = TrendIndex(args.window)
+    index.append(store)
+    t2 = time.perf_counter()
+    print(f"{len(index)} strings of {len(index.shooters())} shooters: archive loaded in {t1 - t0:.2f} s, "
+          f"trends built in {(t2 - t1) * 1000:.0f} ms")
+    with pd.option_context("display.max_rows", 500, "display.width", 200):
+        if args.shooter:
+            t0 = time.perf_counter()
+            season = index.season(args.shooter)
+            elapsed = time.perf_counter() - t0
+            print(season.drop(columns=["unique_id", "seq"]).to_string(index=False))
+            print(f"{len(season)} strings in {elapsed * 1000:.3f} ms")
+        else:
+            print(index.summary().to_string())
+
+
+if __name__ == "__main__":
+    main()